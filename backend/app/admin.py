@@ -0,0 +1,72 @@
+"""
+Administrative endpoints for bulk leaderboard export and import and for
+the number of server bots.
+
+They are only available when ADMIN_TOKEN is set, and every request must
+carry it in the `X-Admin-Token` header.
+"""
+import hmac
+import os
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from .bot_scheduler import bot_scheduler
+from .db_config import DBSession, get_db
+from .leaderboard_io import MEDIA_TYPES, LeaderboardImportError, export_leaderboard_async, import_leaderboard_async
+from .models import GameMode
+
+
+# Token required by the admin endpoints; they are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Dependency refusing requests without the admin token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.get("/leaderboard/export", dependencies=[Depends(require_admin)])
+async def export_leaderboard(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    mode: Optional[GameMode] = None,
+    db: DBSession = Depends(get_db)
+):
+    """Stream every leaderboard entry as NDJSON or CSV."""
+    return StreamingResponse(
+        export_leaderboard_async(db, format, mode),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="leaderboard.{format}"'}
+    )
+
+
+@router.post("/leaderboard/import", dependencies=[Depends(require_admin)])
+async def import_leaderboard(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: DBSession = Depends(get_db)
+):
+    """
+    Add leaderboard entries from an NDJSON or CSV request body.
+
+    Entries whose id already exists are skipped. If any record is invalid
+    nothing is imported.
+    """
+    try:
+        count = await import_leaderboard_async(db, request.stream(), format)
+    except LeaderboardImportError as e:
+        raise HTTPException(status_code=400, detail=f"Nothing was imported: {e}")
+    return {"message": "Import complete", "records": count}
+
+
+@router.put("/bots", dependencies=[Depends(require_admin)])
+async def set_bot_count(count: int = Query(ge=0, le=100000)):
+    """Start or stop server bots until `count` are running on this worker."""
+    bot_scheduler.resize(count)
+    return {"bots": len(bot_scheduler.bots), "tickRate": bot_scheduler.tick_rate}
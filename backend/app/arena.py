@@ -0,0 +1,109 @@
+import asyncio
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+
+from .arena_engine import ArenaFullError
+from .database import get_user_rank_async
+from .db_config import DBSession, get_db
+from .live_games import Subscription
+from .matchmaking import Seat, matchmaker, skill_tier
+from .models import ArenaSummary, Direction, GameMode
+from .sessions import session_user
+
+router = APIRouter(prefix="/arena", tags=["arena"])
+
+
+@router.get("/active", response_model=List[ArenaSummary])
+async def get_active_arenas():
+    """Get the arenas hosted by every worker."""
+    return matchmaker.summaries()
+
+
+async def send_states(websocket: WebSocket, subscription: Subscription, seat: Optional[Seat] = None):
+    """Forward arena states until the arena closes or, for a player, their snake dies."""
+    while True:
+        frame = await subscription.get()
+        if frame is None:
+            return
+        await websocket.send_text(frame)
+        if seat is not None and not seat.alive and subscription.queue.empty():
+            return
+
+
+async def receive_turns(websocket: WebSocket, seat: Seat):
+    """Queue the player's turns, sent as {"direction": "UP"}, for the next tick."""
+    while True:
+        message = await websocket.receive_json()
+        matchmaker.steer(seat, Direction(message["direction"]))
+
+
+@router.websocket("/play")
+async def play(websocket: WebSocket, mode: GameMode = GameMode.walls, db: DBSession = Depends(get_db)):
+    """
+    Play in a multiplayer arena of the given mode.
+
+    Players are matched by the skill tier of their best score in the mode.
+    The server replies once with the arena and snake IDs and the tier, then
+    sends the arena's state as an ArenaState document now and after every
+    tick until the player's snake dies.
+    """
+    user = session_user(websocket)
+    if not user:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Not logged in")
+        return
+
+    await websocket.accept()
+    tier = skill_tier(*await get_user_rank_async(db, user.id, mode))
+    try:
+        seat = await matchmaker.join(user, mode, tier)
+    except ArenaFullError:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="No room in any arena")
+        return
+
+    subscription = seat.channel.subscribe()
+    sender = receiver = None
+    try:
+        await websocket.send_json({"arenaId": seat.arena_id, "snakeId": seat.snake_id, "tier": tier})
+        await websocket.send_text(seat.document)
+        sender = asyncio.create_task(send_states(websocket, subscription, seat))
+        receiver = asyncio.create_task(receive_turns(websocket, seat))
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        if receiver.done():
+            error = receiver.exception()
+            if isinstance(error, (KeyError, TypeError, ValueError)):
+                await websocket.close(code=status.WS_1007_INVALID_FRAME_PAYLOAD_DATA, reason="Invalid turn")
+        elif sender.exception() is None:
+            await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in (sender, receiver):
+            if task is not None:
+                task.cancel()
+        seat.channel.unsubscribe(subscription)
+        matchmaker.leave(seat)
+
+
+@router.websocket("/watch/{arena_id}")
+async def watch(websocket: WebSocket, arena_id: str):
+    """Stream an arena's state every tick until it closes."""
+    await websocket.accept()
+    watched = matchmaker.watch(arena_id)
+    if watched is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Arena not found")
+        return
+
+    channel, document = watched
+    subscription = channel.subscribe()
+    try:
+        # An arena on another worker is first seen at its next tick
+        if document is not None:
+            await websocket.send_text(document)
+        await send_states(websocket, subscription)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        channel.unsubscribe(subscription)
+        matchmaker.unwatch(arena_id)
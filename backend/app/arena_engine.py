@@ -0,0 +1,372 @@
+"""
+Authoritative multiplayer arena: many snakes on one shared grid.
+
+An arena follows the single-player rules of `engine.py` for its `GameMode`
+(walls end the snake or the head wraps around), on a larger grid with several
+pieces of food. Every tick all snakes move at once:
+
+* each snake takes the last direction its player sent since the previous
+  tick, ignoring a turn back onto itself
+* a snake dies if its new head leaves the grid or lands on any segment,
+  its own or another snake's, including tails about to move away
+* snakes whose heads reach the same cell die together
+* survivors then move; eating grows the snake by one and scores 10 points,
+  and eaten food is replaced on a random free cell
+
+Collisions are found with an occupancy grid, one byte per cell, so a tick
+costs O(snakes) lookups whatever the snakes' lengths. Free cells are kept in a
+dense list with a reverse index, as in `SnakeEngine`, so spawning and food
+placement pick a random free cell in O(1).
+"""
+import json
+import random
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .engine import NO_CELL, OPPOSITE_DIRECTION, POINTS_PER_FOOD, build_next_cell
+from .models import ArenaState, ArenaSummary, Direction, GameMode, User
+
+
+# Width and height of an arena grid
+ARENA_SIZE = 40
+
+# Snakes an arena holds, bots included
+ARENA_MAX_SNAKES = 16
+
+# Food kept on the grid at all times
+ARENA_FOOD = 5
+
+INITIAL_LENGTH = 3
+
+# Random head cells tried before giving up on spawning a snake
+SPAWN_ATTEMPTS = 32
+
+# Moves in the order the arena bot tries them
+DIRECTIONS = (Direction.UP, Direction.DOWN, Direction.LEFT, Direction.RIGHT)
+
+_NEXT_CELLS: Dict[tuple, dict] = {}
+
+
+class ArenaFullError(Exception):
+    """Raised when a snake cannot be added to an arena."""
+
+
+def next_cell_table(mode: GameMode, size: int) -> dict:
+    """The shared move table for arenas of a mode and size."""
+    key = (mode, size)
+    table = _NEXT_CELLS.get(key)
+    if table is None:
+        table = _NEXT_CELLS[key] = build_next_cell(mode, size)
+    return table
+
+
+class ArenaSnake:
+    """One snake in an arena, played by a user or by the arena bot."""
+
+    __slots__ = ("id", "user", "bot", "direction", "turn", "body", "score", "alive", "next")
+
+    def __init__(self, user: User, bot: bool = False):
+        self.id = str(uuid.uuid4())
+        self.user = user
+        self.bot = bot
+        self.direction = Direction.RIGHT
+        # Direction sent since the last tick, applied at the next one
+        self.turn: Optional[Direction] = None
+        # Cells from head (left) to tail (right)
+        self.body: Deque[int] = deque()
+        self.score = 0
+        self.alive = False
+        self.next = NO_CELL
+
+
+class Arena:
+    """A shared grid stepped for all of its snakes at once."""
+
+    def __init__(
+        self,
+        mode: GameMode,
+        size: int = ARENA_SIZE,
+        max_snakes: int = ARENA_MAX_SNAKES,
+        food_count: int = ARENA_FOOD,
+        seed: Optional[int] = None,
+        tier: int = 0
+    ):
+        self.id = str(uuid.uuid4())
+        self.mode = mode
+        # Skill tier of the players matchmaking puts here
+        self.tier = tier
+        self.size = size
+        self.max_snakes = max_snakes
+        self.food_count = food_count
+        self.tick_count = 0
+        self.snakes: Dict[str, ArenaSnake] = {}
+        self.food: List[int] = []
+        self.rng = random.Random(seed)
+        self._next_cell = next_cell_table(mode, size)
+        cell_count = size * size
+        self.occupied = bytearray(cell_count)
+        # Cells holding neither a snake nor food, with each cell's slot in the list
+        self.free = list(range(cell_count))
+        self.free_index = list(range(cell_count))
+        # Cell index -> position as sent to clients
+        self._positions = [{"x": cell % size, "y": cell // size} for cell in range(cell_count)]
+        self._place_food()
+
+    @property
+    def players(self) -> int:
+        return sum(not snake.bot for snake in self.snakes.values())
+
+    @property
+    def bots(self) -> int:
+        return sum(snake.bot for snake in self.snakes.values())
+
+    def join(self, user: User, bot: bool = False) -> ArenaSnake:
+        """Add a snake at a random free spot."""
+        if len(self.snakes) >= self.max_snakes:
+            raise ArenaFullError("Arena is full")
+        snake = ArenaSnake(user, bot)
+        if not self._spawn(snake):
+            raise ArenaFullError("No room to spawn")
+        self.snakes[snake.id] = snake
+        return snake
+
+    def place(self, user: User, body: List[Tuple[int, int]], direction: Direction, bot: bool = False) -> ArenaSnake:
+        """Add a snake on the given (x, y) cells, head first, if they are free."""
+        cells = [y * self.size + x for x, y in body]
+        if any(self.occupied[cell] or cell in self.food for cell in cells):
+            raise ArenaFullError("Cells are taken")
+        snake = ArenaSnake(user, bot)
+        for cell in cells:
+            self._occupy(cell)
+        snake.body = deque(cells)
+        snake.direction = direction
+        snake.alive = True
+        self.snakes[snake.id] = snake
+        return snake
+
+    def leave(self, snake: ArenaSnake):
+        """Remove a snake and free its cells."""
+        if self.snakes.pop(snake.id, None) is not None and snake.alive:
+            self._clear(snake)
+
+    def respawn(self, snake: ArenaSnake) -> bool:
+        """Put a dead snake back at a new spot, with its score reset."""
+        snake.score = 0
+        snake.turn = None
+        return self._spawn(snake)
+
+    def steer(self, snake: ArenaSnake, direction: Direction):
+        """Queue a turn for the next tick; the last one sent before the tick wins."""
+        snake.turn = direction
+
+    def tick(self) -> List[ArenaSnake]:
+        """Step every living snake at once; returns the snakes that died."""
+        self.tick_count += 1
+        next_cell = self._next_cell
+        occupied = self.occupied
+        alive = [snake for snake in self.snakes.values() if snake.alive]
+
+        # Where every head goes, and how many heads go there
+        targets: Dict[int, int] = {}
+        for snake in alive:
+            if snake.bot:
+                snake.turn = self.bot_direction(snake)
+            turn = snake.turn
+            if turn is not None:
+                if turn != OPPOSITE_DIRECTION[snake.direction]:
+                    snake.direction = turn
+                snake.turn = None
+            cell = next_cell[snake.direction][snake.body[0]]
+            snake.next = cell
+            targets[cell] = targets.get(cell, 0) + 1
+
+        # Judge every move against the grid before anything moves
+        died = [
+            snake for snake in alive
+            if snake.next == NO_CELL or occupied[snake.next] or targets[snake.next] > 1
+        ]
+        for snake in died:
+            snake.alive = False
+            self._clear(snake)
+
+        eaten = 0
+        food = self.food
+        for snake in alive:
+            if not snake.alive:
+                continue
+            cell = snake.next
+            if cell in food:
+                # The food's cell is already off the free list
+                food.remove(cell)
+                occupied[cell] = 1
+                snake.body.appendleft(cell)
+                snake.score += POINTS_PER_FOOD
+                eaten += 1
+            else:
+                self._occupy(cell)
+                snake.body.appendleft(cell)
+                self._vacate(snake.body.pop())
+        if eaten:
+            self._place_food()
+        return died
+
+    def bot_direction(self, snake: ArenaSnake) -> Direction:
+        """Greedy move toward the nearest food that does not hit anything this tick."""
+        head = snake.body[0]
+        size = self.size
+        wrap = self.mode == GameMode.pass_through
+        best = None
+        for direction in DIRECTIONS:
+            if direction == OPPOSITE_DIRECTION[snake.direction]:
+                continue
+            cell = self._next_cell[direction][head]
+            if cell == NO_CELL or self.occupied[cell]:
+                continue
+            x, y = cell % size, cell // size
+            distance = size * 2
+            for food in self.food:
+                dx, dy = abs(x - food % size), abs(y - food // size)
+                if wrap:
+                    dx, dy = min(dx, size - dx), min(dy, size - dy)
+                distance = min(distance, dx + dy)
+            if best is None or distance < best[0]:
+                best = (distance, direction)
+        return snake.direction if best is None else best[1]
+
+    def to_state(self) -> ArenaState:
+        return ArenaState.model_validate_json(self.document())
+
+    def document(self) -> str:
+        """The current state as an ArenaState JSON document, built without validation."""
+        positions = self._positions
+        return json.dumps({
+            "id": self.id,
+            "mode": self.mode.value,
+            "tick": self.tick_count,
+            "size": self.size,
+            "snakes": [
+                {
+                    "id": snake.id,
+                    "username": snake.user.username,
+                    "body": [positions[cell] for cell in snake.body] if snake.alive else [],
+                    "direction": snake.direction.value,
+                    "score": snake.score,
+                    "alive": snake.alive,
+                    "bot": snake.bot,
+                }
+                for snake in self.snakes.values()
+            ],
+            "food": [positions[cell] for cell in self.food],
+        }, separators=(",", ":"))
+
+    def summary(self) -> ArenaSummary:
+        return ArenaSummary(
+            id=self.id, mode=self.mode, tier=self.tier, tick=self.tick_count,
+            players=self.players, bots=self.bots, capacity=self.max_snakes
+        )
+
+    def snapshot(self) -> dict:
+        """Everything needed to carry on this arena in another process."""
+        return {
+            "id": self.id,
+            "mode": self.mode.value,
+            "tier": self.tier,
+            "size": self.size,
+            "max_snakes": self.max_snakes,
+            "food_count": self.food_count,
+            "tick": self.tick_count,
+            "food": self.food,
+            "snakes": [
+                {
+                    "id": snake.id,
+                    "user": snake.user.model_dump(),
+                    "bot": snake.bot,
+                    "direction": snake.direction.value,
+                    "body": list(snake.body),
+                    "score": snake.score,
+                    "alive": snake.alive,
+                }
+                for snake in self.snakes.values()
+            ],
+        }
+
+    @classmethod
+    def restore(cls, snapshot: dict) -> "Arena":
+        """Rebuild an arena from `snapshot`, keeping its ID, snakes and food."""
+        arena = cls(
+            GameMode(snapshot["mode"]), snapshot["size"], snapshot["max_snakes"],
+            food_count=0, tier=snapshot["tier"]
+        )
+        arena.id = snapshot["id"]
+        arena.food_count = snapshot["food_count"]
+        arena.tick_count = snapshot["tick"]
+        for data in snapshot["snakes"]:
+            snake = ArenaSnake(User.model_validate(data["user"]), data["bot"])
+            snake.id = data["id"]
+            snake.direction = Direction(data["direction"])
+            snake.score = data["score"]
+            snake.alive = data["alive"]
+            for cell in data["body"]:
+                arena._occupy(cell)
+            snake.body = deque(data["body"])
+            arena.snakes[snake.id] = snake
+        for cell in snapshot["food"]:
+            arena._take(cell)
+            arena.food.append(cell)
+        arena._place_food()
+        return arena
+
+    def _spawn(self, snake: ArenaSnake) -> bool:
+        """Place a straight snake whose body and next two cells ahead are free."""
+        for _ in range(SPAWN_ATTEMPTS):
+            if not self.free:
+                return False
+            head = self.free[self.rng.randrange(len(self.free))]
+            direction = self.rng.choice(DIRECTIONS)
+            behind = self._next_cell[OPPOSITE_DIRECTION[direction]]
+            ahead = self._next_cell[direction]
+            body = [head]
+            while len(body) < INITIAL_LENGTH and body[-1] != NO_CELL:
+                body.append(behind[body[-1]])
+            cells = body + [ahead[head], ahead[ahead[head]] if ahead[head] != NO_CELL else NO_CELL]
+            if any(cell == NO_CELL or self.occupied[cell] for cell in cells):
+                continue
+            if len(set(body)) < INITIAL_LENGTH or any(cell in self.food for cell in body):
+                continue
+            for cell in body:
+                self._occupy(cell)
+            snake.body = deque(body)
+            snake.direction = direction
+            snake.alive = True
+            return True
+        return False
+
+    def _clear(self, snake: ArenaSnake):
+        for cell in snake.body:
+            self._vacate(cell)
+        snake.body.clear()
+
+    def _place_food(self):
+        while len(self.food) < self.food_count and self.free:
+            cell = self.free[self.rng.randrange(len(self.free))]
+            self._take(cell)
+            self.food.append(cell)
+
+    def _occupy(self, cell: int):
+        self.occupied[cell] = 1
+        self._take(cell)
+
+    def _vacate(self, cell: int):
+        self.occupied[cell] = 0
+        self.free_index[cell] = len(self.free)
+        self.free.append(cell)
+
+    def _take(self, cell: int):
+        # Swap the last free cell into this cell's slot
+        index = self.free_index[cell]
+        last = self.free.pop()
+        if last != cell:
+            self.free[index] = last
+            self.free_index[last] = index
+        self.free_index[cell] = NO_CELL
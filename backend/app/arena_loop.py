@@ -0,0 +1,228 @@
+"""
+Game loop hosting the multiplayer arenas of this worker.
+
+One task steps every arena every ARENA_TICK_INTERVAL seconds and sends each
+arena's new state, as one JSON document, to its players and spectators
+through a broadcast channel. Turns players send between ticks are batched on
+their snakes and applied together at the next tick.
+
+Players are placed in an arena of their `GameMode` and skill tier with room,
+or of a neighbouring tier, and a new arena is opened when none has room. New
+arenas start with ARENA_BOTS bot snakes, which make way for players when the
+arena fills up and come back ARENA_RESPAWN_TICKS after dying. An arena closes
+when its last player leaves. `matchmaking` spreads arenas over the workers
+and moves them between workers through `release` and `adopt`.
+"""
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .arena_engine import Arena, ArenaFullError, ArenaSnake
+from .live_games import BroadcastChannel
+from .models import ArenaSummary, GameMode, User
+from .tick_loop import BROWSER_TICK_INTERVAL, TickLoop
+
+
+# Seconds between arena ticks
+ARENA_TICK_INTERVAL = float(os.getenv("ARENA_TICK_INTERVAL", str(BROWSER_TICK_INTERVAL)))
+
+# Bot snakes added to every new arena
+ARENA_BOTS = int(os.getenv("ARENA_BOTS", "0"))
+
+# Ticks a bot waits after dying before it spawns again
+ARENA_RESPAWN_TICKS = 10
+
+# Called after an arena's tick with its document, if one was built, and the snakes that died
+Relay = Callable[[Arena, Optional[str], List[ArenaSnake]], None]
+
+
+def choose_arena(arenas: Iterable[ArenaSummary], mode: GameMode, tier: int) -> Optional[ArenaSummary]:
+    """
+    The arena a player of `mode` and skill `tier` should join, if any has room.
+
+    Arenas of the player's own tier come first, then those one tier away;
+    among equals the one with the most players, to fill arenas up.
+    """
+    best = None
+    best_key = None
+    for arena in arenas:
+        distance = abs(arena.tier - tier)
+        if arena.mode != mode or arena.players >= arena.capacity or distance > 1:
+            continue
+        key = (distance, -arena.players)
+        if best_key is None or key < best_key:
+            best, best_key = arena, key
+    return best
+
+
+class ArenaManager:
+    """All arenas hosted by this process and the loop that steps them."""
+
+    def __init__(
+        self,
+        interval: float = ARENA_TICK_INTERVAL,
+        bots: int = ARENA_BOTS,
+        clock: Callable[[], float] = time.perf_counter
+    ):
+        self.bots = bots
+        self.arenas: Dict[str, Arena] = {}
+        self.channels: Dict[str, BroadcastChannel] = {}
+        # Arenas whose states are also sent to other workers through `relay`
+        self.relayed: Set[str] = set()
+        self.relay: Optional[Relay] = None
+        self.on_close: Optional[Callable[[Arena], None]] = None
+        self.loop = TickLoop(self.tick, interval, "arena", "Time spent stepping every arena in one tick.", clock)
+        # Snake ID -> (arena, dead bot, tick of the arena it spawns again at)
+        self._respawns: Dict[str, Tuple[Arena, ArenaSnake, int]] = {}
+        self._next_bot = 0
+
+    @property
+    def interval(self) -> float:
+        return self.loop.interval
+
+    @interval.setter
+    def interval(self, interval: float):
+        self.loop.interval = interval
+
+    @property
+    def load(self) -> float:
+        """Moving average of the share of the tick interval spent stepping arenas."""
+        return self.loop.load
+
+    @load.setter
+    def load(self, load: float):
+        self.loop.load = load
+
+    def create(self, mode: GameMode, tier: int = 0) -> Arena:
+        """Open a new arena, with the configured number of bots."""
+        arena = Arena(mode, tier=tier)
+        self.arenas[arena.id] = arena
+        self.channels[arena.id] = BroadcastChannel()
+        for _ in range(min(self.bots, arena.max_snakes - 1)):
+            self._next_bot += 1
+            arena.join(User(id=f"arena-bot-{self._next_bot}", username=f"Bot {self._next_bot}", email=""), bot=True)
+        return arena
+
+    def join(
+        self,
+        user: User,
+        mode: GameMode,
+        tier: int = 0,
+        arena_id: Optional[str] = None
+    ) -> Tuple[Arena, ArenaSnake]:
+        """
+        Place a player in an arena, opening one if none has room.
+
+        With `arena_id` the player joins that arena if it still has room;
+        otherwise the best local arena for the mode and tier is chosen.
+        """
+        arena = self.arenas.get(arena_id) if arena_id else None
+        if arena is None:
+            summary = choose_arena(self.summaries(), mode, tier)
+            arena = self.arenas[summary.id] if summary else None
+        if arena is not None and arena.players < arena.max_snakes:
+            if len(arena.snakes) >= arena.max_snakes:
+                self._remove_bot(arena)
+            try:
+                return arena, arena.join(user)
+            except ArenaFullError:
+                pass
+        arena = self.create(mode, tier)
+        return arena, arena.join(user)
+
+    def leave(self, arena: Arena, snake: ArenaSnake):
+        """Take a player's snake out, closing the arena if no players are left."""
+        arena.leave(snake)
+        if arena.players == 0:
+            self.close(arena)
+
+    def close(self, arena: Arena):
+        if self.arenas.get(arena.id) is not arena:
+            return
+        self.release(arena).close()
+        if self.on_close is not None:
+            self.on_close(arena)
+
+    def release(self, arena: Arena) -> BroadcastChannel:
+        """Stop hosting an arena without closing its channel, which is returned."""
+        del self.arenas[arena.id]
+        self.relayed.discard(arena.id)
+        for snake_id, (owner, _, _) in list(self._respawns.items()):
+            if owner is arena:
+                del self._respawns[snake_id]
+        return self.channels.pop(arena.id)
+
+    def adopt(self, arena: Arena, channel: Optional[BroadcastChannel] = None):
+        """Host an arena that was running elsewhere, keeping an existing channel's subscribers."""
+        self.arenas[arena.id] = arena
+        self.channels[arena.id] = channel or BroadcastChannel()
+        for snake in arena.snakes.values():
+            if snake.bot and not snake.alive:
+                self._respawns[snake.id] = (arena, snake, arena.tick_count + ARENA_RESPAWN_TICKS)
+
+    def get(self, arena_id: str) -> Optional[Arena]:
+        return self.arenas.get(arena_id)
+
+    def summaries(self) -> List[ArenaSummary]:
+        return [arena.summary() for arena in self.arenas.values()]
+
+    def tick(self):
+        """Step every arena once and send the new states."""
+        for arena in list(self.arenas.values()):
+            died = arena.tick()
+            for snake in died:
+                if snake.bot:
+                    self._respawns[snake.id] = (arena, snake, arena.tick_count + ARENA_RESPAWN_TICKS)
+            channel = self.channels[arena.id]
+            document = None
+            if channel.subscribers or arena.id in self.relayed:
+                document = arena.document()
+                channel.send(document)
+            if self.relay is not None:
+                self.relay(arena, document, died)
+        if self._respawns:
+            self._respawn_bots()
+
+    def clear(self):
+        for arena in list(self.arenas.values()):
+            self.close(arena)
+
+    async def start(self):
+        """Start the arena loop on the running event loop."""
+        await self.loop.start()
+
+    async def stop(self):
+        """Stop the loop and close every arena."""
+        await self.loop.stop()
+        self.clear()
+
+    def expose(self) -> str:
+        """Arena gauges and tick durations in the Prometheus text format."""
+        snakes = sum(len(arena.snakes) for arena in self.arenas.values())
+        lines = [
+            "# HELP arenas_running Multiplayer arenas hosted by this worker.",
+            "# TYPE arenas_running gauge",
+            f"arenas_running {len(self.arenas)}",
+            "# HELP arena_snakes Snakes in this worker's arenas, bots included.",
+            "# TYPE arena_snakes gauge",
+            f"arena_snakes {snakes}",
+        ]
+        return "\n".join(lines + self.loop.expose()) + "\n"
+
+    def _respawn_bots(self):
+        for snake_id, (arena, snake, due) in list(self._respawns.items()):
+            if snake_id not in arena.snakes:
+                del self._respawns[snake_id]
+            elif arena.tick_count >= due and arena.respawn(snake):
+                del self._respawns[snake_id]
+
+    def _remove_bot(self, arena: Arena):
+        for snake in arena.snakes.values():
+            if snake.bot:
+                arena.leave(snake)
+                self._respawns.pop(snake.id, None)
+                return
+
+
+# Process-wide arenas started with the app
+arena_manager = ArenaManager()
@@ -1,62 +1,58 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from .models import User, LoginRequest, SignupRequest
+from fastapi import APIRouter, HTTPException, Depends, Response
+from .models import User, UserSession, LoginRequest, SignupRequest
 from .database import (
-    get_user_by_email,
-    get_user_by_username,
-    create_user,
-    verify_password,
-    set_current_user_session,
-    get_current_user_session,
+    get_user_by_email_async,
+    get_user_by_username_async,
+    create_user_async,
+    verify_password_async,
     db_user_to_user
 )
-from .db_config import get_db
+from .db_config import DBSession, get_db
+from .rate_limit import admit_request, limit_auth
+from .sessions import end_session, require_user, start_session
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/login", response_model=User)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+@router.post("/login", response_model=UserSession, dependencies=[Depends(limit_auth), Depends(admit_request)])
+async def login(request: LoginRequest, response: Response, db: DBSession = Depends(get_db)):
     """Login with email and password."""
-    db_user = verify_password(db, request.email, request.password)
+    db_user = await verify_password_async(db, request.email, request.password)
     if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     user = db_user_to_user(db_user)
-    set_current_user_session(user)
-    return user
+    token = start_session(response, user)
+    return UserSession(**user.model_dump(), token=token)
 
 
-@router.post("/signup", response_model=User)
-async def signup(request: SignupRequest, db: Session = Depends(get_db)):
+@router.post("/signup", response_model=UserSession, dependencies=[Depends(limit_auth), Depends(admit_request)])
+async def signup(request: SignupRequest, response: Response, db: DBSession = Depends(get_db)):
     """Create a new user account."""
     # Check if email already exists
-    if get_user_by_email(db, request.email):
+    if await get_user_by_email_async(db, request.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Check if username already exists
-    if get_user_by_username(db, request.username):
+    if await get_user_by_username_async(db, request.username):
         raise HTTPException(status_code=400, detail="Username already taken")
     
     # Create new user
-    db_user = create_user(db, request.username, request.email, request.password)
+    db_user = await create_user_async(db, request.username, request.email, request.password)
     user = db_user_to_user(db_user)
-    set_current_user_session(user)
-    return user
+    token = start_session(response, user)
+    return UserSession(**user.model_dump(), token=token)
 
 
 @router.post("/logout")
-async def logout():
+async def logout(response: Response):
     """Logout the current user."""
-    set_current_user_session(None)
+    end_session(response)
     return {"message": "Successful logout"}
 
 
 @router.get("/me", response_model=User)
-async def get_current_user():
+async def get_current_user(user: User = Depends(require_user)):
     """Get the currently logged-in user."""
-    user = get_current_user_session()
-    if user:
-        return user
-    raise HTTPException(status_code=401, detail="Not logged in")
+    return user
 
@@ -0,0 +1,304 @@
+"""
+Vectorized batch simulator for evaluating bots over many games at once.
+
+Holds N games as NumPy arrays and steps them in lockstep: collisions, food,
+growth and food placement are each one array operation over every game still
+playing. The layout mirrors `SnakeEngine` (a ring buffer body, an occupancy
+grid and a swap-remove free-cell list per game, and a Mulberry32 generator per
+game), so game i seeded with s plays out exactly like `SnakeEngine(mode, s)`
+given the same turns.
+
+A policy is any callable taking the simulator and the indices of the games
+still playing and returning one direction index per game, or -1 to keep going
+straight. `greedy_policy` is a vectorized port of the greedy bot in `bot.py`.
+
+Requires NumPy, which is an optional dependency (`uv sync --extra sim`).
+"""
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .bot import DIRECTIONS, v8_sort
+from .engine import (
+    CELL_COUNT, GRID_SIZE, INITIAL_BODY, INITIAL_DIRECTION, MOVES, NEXT_CELL, NO_CELL,
+    OPPOSITE_DIRECTION, POINTS_PER_FOOD, to_cell
+)
+from .models import GameMode
+
+
+Policy = Callable[["BatchSimulator", np.ndarray], np.ndarray]
+
+# Directions are indices into DIRECTIONS (UP, DOWN, LEFT, RIGHT)
+DX = np.array([MOVES[d][0] for d in DIRECTIONS], dtype=np.int16)
+DY = np.array([MOVES[d][1] for d in DIRECTIONS], dtype=np.int16)
+OPPOSITE = np.array([DIRECTIONS.index(OPPOSITE_DIRECTION[d]) for d in DIRECTIONS], dtype=np.int8)
+
+# The three moves the bot considers for each current direction, in bot order
+CANDIDATES = np.array(
+    [[c for c in range(4) if c != OPPOSITE[d]] for d in range(4)], dtype=np.int8
+)
+
+CELL_X = np.arange(CELL_COUNT, dtype=np.int16) % GRID_SIZE
+CELL_Y = np.arange(CELL_COUNT, dtype=np.int16) // GRID_SIZE
+
+# Occupancy grids have one extra column that is never set; lookups of cells
+# off the grid are pointed at it
+PAD_CELL = CELL_COUNT
+
+
+def _build_ring_cells() -> np.ndarray:
+    """
+    For every cell, the cells at Manhattan distance 1 (first 4 columns) and 2
+    (last 8), with PAD_CELL for those off the grid. Probed for the bot's
+    safety score.
+    """
+    offsets = [(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2) if abs(dx) + abs(dy) == 1]
+    offsets += [(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3) if abs(dx) + abs(dy) == 2]
+    table = np.full((CELL_COUNT + 1, len(offsets)), PAD_CELL, dtype=np.int16)
+    for cell in range(CELL_COUNT):
+        for i, (dx, dy) in enumerate(offsets):
+            x = cell % GRID_SIZE + dx
+            y = cell // GRID_SIZE + dy
+            if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE:
+                table[cell, i] = y * GRID_SIZE + x
+    return table
+
+
+RING_CELLS = _build_ring_cells()
+
+
+def _next_cell_table(mode: GameMode) -> np.ndarray:
+    table = np.array([NEXT_CELL[mode][d] for d in DIRECTIONS], dtype=np.int32)
+    table[table == NO_CELL] = -1
+    return table.astype(np.int16)
+
+
+def _build_winner_table() -> np.ndarray:
+    """
+    Precompute which candidate the greedy bot's sort puts first.
+
+    Indexed by the validity of the three candidates and the sign of the
+    comparator for each pair; -1 means no move is valid.
+    """
+    table = np.full(8 * 27, -1, dtype=np.int8)
+    for valid in range(8):
+        for signs in range(27):
+            sign = {(0, 1): signs // 9 - 1, (0, 2): signs // 3 % 3 - 1, (1, 2): signs % 3 - 1}
+
+            def compare(a, b, sign=sign):
+                return sign[(a, b)] if a < b else -sign[(b, a)]
+
+            moves = [c for c in range(3) if valid >> c & 1]
+            if moves:
+                table[valid * 27 + signs] = v8_sort(moves, compare)[0]
+    return table
+
+
+WINNER = _build_winner_table()
+
+
+def mulberry32(state: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Advance an array of Mulberry32 states; returns the new states and outputs."""
+    a = state + np.uint32(0x6D2B79F5)
+    t = (a ^ (a >> np.uint32(15))) * (a | np.uint32(1))
+    t = (t + (t ^ (t >> np.uint32(7))) * (t | np.uint32(61))) ^ t
+    return a, t ^ (t >> np.uint32(14))
+
+
+class BatchSimulator:
+    """N single-player snake games stepped together."""
+
+    def __init__(self, mode: GameMode, seeds: Sequence[int]):
+        self.mode = mode
+        self.wrap = mode == GameMode.pass_through
+        self.next_cell = _next_cell_table(mode)
+        n = len(seeds)
+        self.size = n
+
+        self.body = np.zeros((n, CELL_COUNT), dtype=np.int16)
+        self.occupied = np.zeros((n, CELL_COUNT + 1), dtype=bool)
+        self.free = np.zeros((n, CELL_COUNT), dtype=np.int16)
+        self.free_index = np.zeros((n, CELL_COUNT), dtype=np.int16)
+        self.free_count = np.zeros(n, dtype=np.int32)
+        self.head = np.zeros(n, dtype=np.int32)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.food = np.zeros(n, dtype=np.int16)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.ticks = np.zeros(n, dtype=np.int32)
+        self.playing = np.zeros(n, dtype=bool)
+        self.rng = np.zeros(n, dtype=np.uint32)
+        self.reset(seeds)
+
+    def reset(self, seeds: Sequence[int]):
+        """Start every game over with new seeds, reusing the arrays."""
+        self.rng[:] = np.asarray(seeds, dtype=np.int64) & 0xFFFFFFFF
+        self.body[:] = 0
+        self.occupied[:] = False
+        self.free[:] = np.arange(CELL_COUNT, dtype=np.int16)
+        self.free_index[:] = np.arange(CELL_COUNT, dtype=np.int16)
+        self.free_count[:] = CELL_COUNT
+        self.head[:] = 0
+        self.length[:] = 0
+        self.direction[:] = DIRECTIONS.index(INITIAL_DIRECTION)
+        self.food[:] = -1
+        self.score[:] = 0
+        self.ticks[:] = 0
+        self.playing[:] = True
+
+        rows = np.arange(self.size)
+        for x, y in reversed(INITIAL_BODY):
+            self._push_head(rows, np.full(self.size, to_cell(x, y), dtype=np.int16))
+        self._place_food(rows)
+
+    def active(self) -> np.ndarray:
+        """Indices of the games still playing."""
+        return np.flatnonzero(self.playing)
+
+    def head_cells(self, rows: np.ndarray) -> np.ndarray:
+        return self.body[rows, self.head[rows]]
+
+    def turn(self, rows: np.ndarray, directions: np.ndarray):
+        """Turn games, ignoring -1 and turns back onto the snake."""
+        directions = np.asarray(directions, dtype=np.int8)
+        keep = (directions >= 0) & (directions != OPPOSITE[self.direction[rows]])
+        self.direction[rows[keep]] = directions[keep]
+
+    def step(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Advance the given games (by default all playing games) by one tick.
+
+        Returns the indices of the games still playing afterwards.
+        """
+        if rows is None:
+            rows = self.active()
+        self.ticks[rows] += 1
+
+        new_head = self.next_cell[self.direction[rows], self.head_cells(rows)]
+        crashed = new_head < 0
+        crashed |= self.occupied[rows, np.where(crashed, PAD_CELL, new_head)]
+        self.playing[rows[crashed]] = False
+
+        moved = ~crashed
+        rows = rows[moved]
+        new_head = new_head[moved]
+        ate = new_head == self.food[rows]
+        self._push_head(rows, new_head)
+
+        eaters = rows[ate]
+        self.score[eaters] += POINTS_PER_FOOD
+        self._place_food(eaters)
+        self._pop_tail(rows[~ate])
+        return rows[self.playing[rows]]
+
+    def run(self, policy: Optional[Policy] = None, max_ticks: int = 10000) -> np.ndarray:
+        """Play every game to the end (or max_ticks) and return the scores."""
+        policy = policy or greedy_policy
+        rows = self.active()
+        for _ in range(max_ticks):
+            if not len(rows):
+                break
+            self.turn(rows, policy(self, rows))
+            rows = self.step(rows)
+        return self.score
+
+    def _push_head(self, rows: np.ndarray, cells: np.ndarray):
+        head = (self.head[rows] - 1) % CELL_COUNT
+        self.head[rows] = head
+        self.body[rows, head] = cells
+        self.length[rows] += 1
+        self.occupied[rows, cells] = True
+
+        # Swap the last free cell into this cell's slot
+        index = self.free_index[rows, cells]
+        self.free_count[rows] -= 1
+        last = self.free[rows, self.free_count[rows]]
+        self.free[rows, index] = last
+        self.free_index[rows, last] = index
+        self.free_index[rows, cells] = -1
+
+    def _pop_tail(self, rows: np.ndarray):
+        tail = (self.head[rows] + self.length[rows] - 1) % CELL_COUNT
+        cells = self.body[rows, tail]
+        self.length[rows] -= 1
+        self.occupied[rows, cells] = False
+
+        count = self.free_count[rows]
+        self.free[rows, count] = cells
+        self.free_index[rows, cells] = count
+        self.free_count[rows] += 1
+
+    def _place_food(self, rows: np.ndarray):
+        full = self.free_count[rows] == 0
+        self.playing[rows[full]] = False
+        rows = rows[~full]
+        self.rng[rows], draws = mulberry32(self.rng[rows])
+        picks = (draws.astype(np.uint64) * self.free_count[rows].astype(np.uint64)) >> np.uint64(32)
+        self.food[rows] = self.free[rows, picks.astype(np.int64)]
+
+
+def greedy_policy(sim: BatchSimulator, rows: np.ndarray) -> np.ndarray:
+    """The greedy bot from `bot.py`, evaluated for all the given games at once."""
+    head = sim.head_cells(rows)
+    head_x = (head % GRID_SIZE)[:, None]
+    head_y = (head // GRID_SIZE)[:, None]
+    food_x = (sim.food[rows] % GRID_SIZE)[:, None]
+    food_y = (sim.food[rows] // GRID_SIZE)[:, None]
+    candidates = CANDIDATES[sim.direction[rows]]
+    x = head_x + DX[candidates]
+    y = head_y + DY[candidates]
+
+    if sim.wrap:
+        x %= GRID_SIZE
+        y %= GRID_SIZE
+        cells = y * GRID_SIZE + x
+    else:
+        inside = (x >= 0) & (x < GRID_SIZE) & (y >= 0) & (y < GRID_SIZE)
+        cells = np.where(inside, y * GRID_SIZE + x, PAD_CELL)
+    valid = ~sim.occupied[rows[:, None], cells]
+    if not sim.wrap:
+        valid &= inside
+
+    distance_x = np.abs(x - food_x)
+    distance_y = np.abs(y - food_y)
+    if sim.wrap:
+        distance_x = np.minimum(distance_x, GRID_SIZE - distance_x)
+        distance_y = np.minimum(distance_y, GRID_SIZE - distance_y)
+    distance = distance_x + distance_y
+
+    safety = _safety(sim, rows, head, cells, x, y, valid)
+
+    key = valid[:, 0] * 27 + valid[:, 1] * 54 + valid[:, 2] * 108
+    for weight, (a, b) in ((9, (0, 1)), (3, (0, 2)), (1, (1, 2))):
+        delta = distance[:, a] - distance[:, b]
+        order = np.where(np.abs(delta) > 2, delta, safety[:, b] - safety[:, a])
+        key += weight * (np.sign(order) + 1)
+    winner = WINNER[key]
+
+    chosen = candidates[np.arange(len(rows)), np.maximum(winner, 0)]
+    return np.where(winner >= 0, chosen, -1).astype(np.int8)
+
+
+def _safety(sim: BatchSimulator, rows, head, cells, x, y, valid) -> np.ndarray:
+    """
+    Manhattan distance from each candidate to the nearest segment behind the head.
+
+    Almost always a segment sits within distance 2 (the one right behind the
+    head does unless the snake just wrapped), so the cells at distance 1 and 2
+    are probed first and only the rest fall back to scanning the whole grid.
+    """
+    # The head does not count; hide it while probing
+    sim.occupied[rows, head] = False
+    probes = sim.occupied[rows[:, None, None], RING_CELLS[cells]]
+    near = probes[:, :, :4].any(axis=2)
+    far = probes[:, :, 4:].any(axis=2)
+    safety = np.where(near, 1, 2).astype(np.int16)
+
+    pending = valid & ~near & ~far
+    if pending.any():
+        game, candidate = np.nonzero(pending)
+        body = sim.occupied[rows[game], :CELL_COUNT]
+        spread = np.abs(CELL_X - x[game, candidate][:, None]) + np.abs(CELL_Y - y[game, candidate][:, None])
+        safety[game, candidate] = np.where(body, spread, CELL_COUNT).min(axis=1)
+    sim.occupied[rows, head] = True
+    return safety
@@ -0,0 +1,104 @@
+"""
+Greedy snake bot, ported from the frontend's `botLogic.ts`.
+
+The bot considers every move except reversing, drops moves that hit a wall or
+the snake, and ranks the rest by Manhattan distance to the food (wrapped in
+pass-through mode), preferring the move farther from its own body when two
+distances are within 2 of each other. Two moves from the same head never
+differ by more than 2 in distance, so in practice the safety score decides.
+
+That comparator is not a consistent ordering, so which move wins depends on
+the exact steps of the sort. `v8_sort` reproduces V8's `Array.prototype.sort`
+for short arrays so the port picks the same move as the browser.
+"""
+from typing import Callable, List, Sequence, TypeVar
+
+from .engine import GRID_SIZE, MOVES, OPPOSITE_DIRECTION, SnakeEngine
+from .models import Direction, GameMode
+
+
+T = TypeVar("T")
+
+# Moves in the order the bot tries them
+DIRECTIONS = (Direction.UP, Direction.DOWN, Direction.LEFT, Direction.RIGHT)
+
+
+def v8_sort(items: Sequence[T], compare: Callable[[T, T], int]) -> List[T]:
+    """
+    Sort like V8's TimSort does for arrays shorter than its minimum run.
+
+    The leading run is found (and reversed if strictly descending), then the
+    remaining items are binary-inserted one by one.
+    """
+    result = list(items)
+    n = len(result)
+    if n < 2:
+        return result
+
+    run = 2
+    descending = compare(result[1], result[0]) < 0
+    while run < n:
+        order = compare(result[run], result[run - 1])
+        if (order >= 0) if descending else (order < 0):
+            break
+        run += 1
+    if descending:
+        result[:run] = result[run - 1::-1]
+
+    for start in range(run, n):
+        pivot = result[start]
+        left, right = 0, start
+        while left < right:
+            mid = left + ((right - left) >> 1)
+            if compare(pivot, result[mid]) < 0:
+                right = mid
+            else:
+                left = mid + 1
+        result[left + 1:start + 1] = result[left:start]
+        result[left] = pivot
+    return result
+
+
+def compare_moves(a, b) -> int:
+    """Order (direction, distance, safety) moves the way `botLogic.ts` does."""
+    if abs(a[1] - b[1]) > 2:
+        return a[1] - b[1]
+    return b[2] - a[2]
+
+
+def greedy_direction(engine: SnakeEngine) -> Direction:
+    """Pick the greedy bot's next direction for a game in progress."""
+    head = engine.head_cell
+    head_x, head_y = head % GRID_SIZE, head // GRID_SIZE
+    food_x, food_y = engine.food % GRID_SIZE, engine.food // GRID_SIZE
+    segments = [(cell % GRID_SIZE, cell // GRID_SIZE) for cell in engine.cells()[1:]]
+    wrap = engine.mode == GameMode.pass_through
+
+    moves = []
+    for direction in DIRECTIONS:
+        if direction == OPPOSITE_DIRECTION[engine.direction]:
+            continue
+
+        dx, dy = MOVES[direction]
+        x, y = head_x + dx, head_y + dy
+        if wrap:
+            x %= GRID_SIZE
+            y %= GRID_SIZE
+        elif not (0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE):
+            continue
+        if engine.occupied[y * GRID_SIZE + x]:
+            continue
+
+        distance_x = abs(x - food_x)
+        distance_y = abs(y - food_y)
+        if wrap:
+            distance_x = min(distance_x, GRID_SIZE - distance_x)
+            distance_y = min(distance_y, GRID_SIZE - distance_y)
+
+        # Distance to the nearest segment behind the head, never wrapped
+        safety = min(abs(x - sx) + abs(y - sy) for sx, sy in segments)
+        moves.append((direction, distance_x + distance_y, safety))
+
+    if not moves:
+        return engine.direction
+    return v8_sort(moves, compare_moves)[0][0]
@@ -0,0 +1,209 @@
+"""
+Server-hosted bot snakes, stepped by a fixed-tick scheduler.
+
+Each bot plays its own `SnakeEngine` with the greedy bot from `bot.py` and is
+registered as a live game, so it is listed in /spectator/active and can be
+watched like a human player, from this worker or, over the message bus, any
+other. Frames are built with `FrameCodec.encode_delta` from the known move,
+so a bot tick never builds a GameState model.
+
+Every BOT_TICK_INTERVAL seconds the scheduler steps bots round robin until
+BOT_TICK_BUDGET_MS of the tick has been spent, then hands the event loop back
+to request handling until the next tick. When more bots are running than fit
+in the budget, the ones not reached wait for the next tick, so every bot's
+tick rate drops by the same amount instead of requests queueing behind
+them. A tick that starts late is not made up for. A bot whose game ends
+starts a new one after BOT_RESPAWN_TICKS of its own ticks.
+"""
+import os
+import random
+import time
+from typing import Callable, List, Optional
+
+from .bot import greedy_direction
+from .engine import CELL_COUNT, GRID_SIZE, NO_CELL, SnakeEngine
+from .frame_codec import FrameCodec, pack_cell, pack_meta
+from .live_games import GameRegistry, LiveGame, game_registry
+from .models import GameMode, GameStatus, User
+from .tick_loop import BROWSER_TICK_INTERVAL, TickLoop
+
+
+# Bots started with the server
+BOT_COUNT = int(os.getenv("BOT_COUNT", "0"))
+
+# Seconds between scheduler ticks
+BOT_TICK_INTERVAL = float(os.getenv("BOT_TICK_INTERVAL", str(BROWSER_TICK_INTERVAL)))
+
+# Milliseconds of each tick the scheduler may spend stepping bots
+BOT_TICK_BUDGET_MS = float(os.getenv("BOT_TICK_BUDGET_MS", "20"))
+
+# Ticks a bot waits after its game ends before starting the next one
+BOT_RESPAWN_TICKS = 10
+
+# Engine cell index -> cell as packed on the wire
+_PACKED_CELLS = [pack_cell(cell % GRID_SIZE, cell // GRID_SIZE) for cell in range(CELL_COUNT)]
+
+
+class Bot:
+    """A bot player and the game it is currently playing."""
+
+    __slots__ = ("user", "engine", "game", "respawn_in")
+
+    def __init__(self, user: User, mode: GameMode):
+        self.user = user
+        self.engine = SnakeEngine(mode)
+        self.game: Optional[LiveGame] = None
+        self.respawn_in = 0
+
+
+class BotScheduler:
+    """Steps every bot on a fixed tick within a CPU budget per tick."""
+
+    def __init__(
+        self,
+        registry: GameRegistry = game_registry,
+        interval: float = BOT_TICK_INTERVAL,
+        budget_ms: float = BOT_TICK_BUDGET_MS,
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.perf_counter
+    ):
+        self.registry = registry
+        self.budget_ms = budget_ms
+        self.clock = clock
+        self.bots: List[Bot] = []
+        self.ticks = 0
+        self.steps = 0
+        # Share of the bots stepped in the last tick
+        self.coverage = 1.0
+        self.loop = TickLoop(self.tick, interval, "bot", "Time spent stepping bots in one scheduler tick.", clock)
+        self._rng = random.Random(seed)
+        self._next_id = 0
+        self._cursor = 0
+
+    @property
+    def interval(self) -> float:
+        return self.loop.interval
+
+    @interval.setter
+    def interval(self, interval: float):
+        self.loop.interval = interval
+
+    @property
+    def tick_rate(self) -> float:
+        """Ticks per second each bot currently gets."""
+        return self.coverage / self.interval
+
+    def add(self, count: int) -> List[Bot]:
+        """Start `count` more bots, alternating between the game modes."""
+        modes = list(GameMode)
+        added = []
+        for _ in range(count):
+            self._next_id += 1
+            user = User(id=f"bot-{self._next_id}", username=f"Bot {self._next_id}", email="")
+            bot = Bot(user, modes[self._next_id % len(modes)])
+            self._spawn(bot)
+            added.append(bot)
+        self.bots.extend(added)
+        return added
+
+    def remove(self, count: int):
+        """Stop the `count` most recently added bots."""
+        for _ in range(min(count, len(self.bots))):
+            bot = self.bots.pop()
+            if bot.game is not None:
+                self.registry.end(bot.game)
+        if self._cursor >= len(self.bots):
+            self._cursor = 0
+
+    def resize(self, count: int):
+        """Add or stop bots until `count` are running."""
+        if count > len(self.bots):
+            self.add(count - len(self.bots))
+        else:
+            self.remove(len(self.bots) - count)
+
+    def tick(self) -> int:
+        """Step bots round robin until the budget is spent; returns how many were stepped."""
+        bots = self.bots
+        total = len(bots)
+        if not total:
+            return 0
+        start = self.clock()
+        deadline = start + self.budget_ms / 1000
+        stepped = 0
+        cursor = self._cursor
+        while stepped < total:
+            self._step(bots[cursor])
+            stepped += 1
+            cursor += 1
+            if cursor == total:
+                cursor = 0
+            if self.clock() >= deadline:
+                break
+        self._cursor = cursor
+        self.ticks += 1
+        self.steps += stepped
+        self.coverage = stepped / total
+        return stepped
+
+    async def start(self, count: int = BOT_COUNT):
+        """Start `count` bots and the tick loop on the running event loop."""
+        self.resize(count)
+        await self.loop.start()
+
+    async def stop(self):
+        """Stop the tick loop and end every bot's game."""
+        await self.loop.stop()
+        self.remove(len(self.bots))
+
+    def expose(self) -> str:
+        """Scheduler gauges and tick durations in the Prometheus text format."""
+        lines = [
+            "# HELP bots_running Bot snakes hosted by this worker.",
+            "# TYPE bots_running gauge",
+            f"bots_running {len(self.bots)}",
+            "# HELP bot_tick_rate Ticks per second each bot currently gets.",
+            "# TYPE bot_tick_rate gauge",
+            f"bot_tick_rate {self.tick_rate if self.bots else 0.0}",
+        ]
+        return "\n".join(lines + self.loop.expose()) + "\n"
+
+    def _spawn(self, bot: Bot):
+        engine = bot.engine
+        engine.reset(self._rng.getrandbits(32))
+        engine.start()
+        keyframe = FrameCodec().encode(engine.to_game_state())
+        bot.game = self.registry.start(bot.user, keyframe)
+
+    def _step(self, bot: Bot):
+        game = bot.game
+        if game is None:
+            bot.respawn_in -= 1
+            if bot.respawn_in <= 0:
+                self._spawn(bot)
+            return
+
+        engine = bot.engine
+        engine.change_direction(greedy_direction(engine))
+        head, length = engine.head, engine.length
+        engine.step()
+        if engine.head != head or engine.length != length:
+            heads = (_PACKED_CELLS[engine.head_cell],)
+            # The tail stays put on the tick the snake eats
+            dropped = 0 if engine.length > length else 1
+        else:
+            # Crashed without moving
+            heads, dropped = (), 0
+        food = _PACKED_CELLS[engine.food] if engine.food != NO_CELL else game.codec.food
+        meta = pack_meta(engine.mode, engine.status, engine.direction)
+        frame = game.push_move(heads, dropped, engine.score, food, meta)
+        self.registry.broadcast(game, frame)
+
+        if engine.status == GameStatus.game_over:
+            self.registry.end(game)
+            bot.game = None
+            bot.respawn_in = BOT_RESPAWN_TICKS
+
+
+# Process-wide scheduler started with the app
+bot_scheduler = BotScheduler()
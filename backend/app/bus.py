@@ -0,0 +1,215 @@
+"""
+Pub/sub bus shared by the workers serving the API.
+
+Each uvicorn worker keeps its own ranked index, response cache and registry
+of live games. The bus lets a worker tell the others about scores it
+recorded and frames of games it hosts, so every worker serves the same
+leaderboard and can stream any game without polling the database.
+
+A message is a topic and an opaque payload, delivered on each receiving
+worker's event loop to the handler subscribed to the topic. Workers never
+receive their own messages; they have already applied the change. Delivery
+is best effort: a worker that is not running, or too far behind to accept
+more, misses the message.
+
+* `LocalBus` connects buses in one process through a `LocalHub`. Alone it
+  is the single-worker default, where there is nobody to tell; several on
+  one hub stand in for separate workers in tests.
+* `UnixSocketBus` gives each worker a Unix datagram socket in a shared
+  directory and sends every message to the other sockets there, which
+  covers all workers on a node.
+"""
+import asyncio
+import os
+import socket
+import tempfile
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Set
+
+
+# How workers share events: "local" (this process only) or "unix"
+MESSAGE_BUS = os.getenv("MESSAGE_BUS", "local")
+
+# Directory of worker sockets for the unix bus; workers using the same one see each other
+MESSAGE_BUS_DIR = os.getenv("MESSAGE_BUS_DIR", os.path.join(tempfile.gettempdir(), "snake-arena-bus"))
+
+# Seconds the unix bus reuses its list of other workers before looking again
+PEER_REFRESH_INTERVAL = 1.0
+
+# Largest message the unix bus receives
+MAX_MESSAGE_SIZE = 256 * 1024
+
+Handler = Callable[[bytes], None]
+
+
+class MessageBus(ABC):
+    """Publishes messages to the other workers and dispatches theirs."""
+
+    def __init__(self):
+        self.handlers: Dict[str, Handler] = {}
+        self.dropped = 0
+
+    def subscribe(self, topic: str, handler: Handler):
+        """Handle messages on a topic, replacing any previous handler."""
+        self.handlers[topic] = handler
+
+    async def start(self):
+        """Start receiving messages on the running event loop."""
+
+    async def stop(self):
+        """Stop receiving messages."""
+
+    @abstractmethod
+    def publish(self, topic: str, payload: bytes):
+        """Send a message to every other worker without waiting. Safe from any thread."""
+
+    @abstractmethod
+    def peer_count(self) -> int:
+        """How many other workers a message published now would reach."""
+
+    def dispatch(self, topic: str, payload: bytes):
+        """Run the handler for a received message."""
+        handler = self.handlers.get(topic)
+        if handler is None:
+            return
+        try:
+            handler(payload)
+        except Exception as e:
+            print(f"Message bus handler for {topic} failed: {e}")
+
+
+class LocalHub:
+    """Connects the local buses that stand for one group of workers."""
+
+    def __init__(self):
+        self.members: Set["LocalBus"] = set()
+
+
+class LocalBus(MessageBus):
+    """A bus connected to others in the same process through a hub."""
+
+    def __init__(self, hub: Optional[LocalHub] = None):
+        super().__init__()
+        self.hub = hub or LocalHub()
+        self.hub.members.add(self)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self._loop = None
+
+    def publish(self, topic: str, payload: bytes):
+        for member in list(self.hub.members):
+            if member is not self:
+                member._deliver(topic, payload)
+
+    def peer_count(self) -> int:
+        return len(self.hub.members) - 1
+
+    def _deliver(self, topic: str, payload: bytes):
+        # A started bus handles messages on its loop, like a separate
+        # worker would; one that was never started handles them right away
+        loop = self._loop
+        if loop is None:
+            self.dispatch(topic, payload)
+            return
+        try:
+            loop.call_soon_threadsafe(self.dispatch, topic, payload)
+        except RuntimeError:
+            self.dropped += 1
+
+
+class UnixSocketBus(MessageBus):
+    """A bus between the processes that share a directory of Unix datagram sockets."""
+
+    def __init__(self, directory: str = MESSAGE_BUS_DIR):
+        super().__init__()
+        self.directory = Path(directory)
+        self.path = self.directory / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock"
+        self._sock: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = Lock()
+        self._peers: List[str] = []
+        self._peers_listed = 0.0
+
+    async def start(self):
+        if self._sock is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(str(self.path))
+        sock.setblocking(False)
+        self._sock = sock
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._receive)
+
+    async def stop(self):
+        sock, self._sock = self._sock, None
+        if sock is None:
+            return
+        self._loop.remove_reader(sock.fileno())
+        sock.close()
+        self.path.unlink(missing_ok=True)
+
+    def publish(self, topic: str, payload: bytes):
+        sock = self._sock
+        if sock is None:
+            return
+        message = topic.encode() + b"\0" + payload
+        for peer in self.peers():
+            try:
+                sock.sendto(message, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker exited without removing its socket
+                self._forget(peer)
+            except OSError:
+                # Receiver's queue is full or the message is too large
+                self.dropped += 1
+
+    def peer_count(self) -> int:
+        return len(self.peers())
+
+    def peers(self) -> List[str]:
+        """Socket paths of the other workers, listed at most once per refresh interval."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._peers_listed >= PEER_REFRESH_INTERVAL:
+                self._peers = [
+                    str(path) for path in self.directory.glob("*.sock") if path != self.path
+                ]
+                self._peers_listed = now
+            return list(self._peers)
+
+    def _forget(self, peer: str):
+        Path(peer).unlink(missing_ok=True)
+        with self._lock:
+            if peer in self._peers:
+                self._peers.remove(peer)
+
+    def _receive(self):
+        while self._sock is not None:
+            try:
+                message = self._sock.recv(MAX_MESSAGE_SIZE)
+            except BlockingIOError:
+                return
+            topic, _, payload = message.partition(b"\0")
+            self.dispatch(topic.decode(), payload)
+
+
+def create_bus(kind: str = MESSAGE_BUS) -> MessageBus:
+    """Create the bus selected by configuration."""
+    if kind == "unix":
+        return UnixSocketBus()
+    if kind == "local":
+        return LocalBus()
+    raise ValueError(f"Unknown message bus: {kind}")
+
+
+# Process-wide bus used by the API
+message_bus = create_bus()
@@ -2,29 +2,25 @@
 Database operations for the Snake Arena application.
 Provides CRUD operations for users and leaderboard entries using SQLAlchemy.
 """
-from typing import List, Optional
+import asyncio
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import delete, desc, func, insert, select
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 
 from .models import User, LeaderboardEntry, GameMode
-from .db_models import DBUser, DBLeaderboardEntry
-
-
-# Session Management (in-memory for now, can be replaced with JWT tokens later)
-current_user: Optional[User] = None
-
-
-def get_current_user_session() -> Optional[User]:
-    """Get the currently logged-in user from session."""
-    return current_user
-
-
-def set_current_user_session(user: Optional[User]):
-    """Set the currently logged-in user in session."""
-    global current_user
-    current_user = user
+from .db_models import DBUser, DBLeaderboardEntry, DBBestScore
+from .db_config import DBSession
+from .passwords import check_password, hash_password, needs_rehash, password_hasher
+from .leaderboard_events import score_recorded
+from .leaderboard_index import leaderboard_index, make_index_item
+from .metrics import timed_function
+from .response_cache import leaderboard_cache
+from .write_behind import leaderboard_writer, merge_pending
 
 
 # Database Operations
@@ -38,28 +34,20 @@ def seed_database(db: Session):
     
     print("Seeding database with initial data...")
     
-    # Create mock users (for demo purposes, using simple hashed passwords)
-    from hashlib import sha256
+    # Create mock users (for demo purposes, all with the password "password123")
     mock_users = [
-        DBUser(id="1", username="player1", email="player1@example.com", 
-               password_hash=sha256("password123".encode()).hexdigest()),
-        DBUser(id="2", username="speedrunner", email="speedrunner@example.com",
-               password_hash=sha256("password123".encode()).hexdigest()),
-        DBUser(id="3", username="snakemaster", email="snakemaster@example.com",
-               password_hash=sha256("password123".encode()).hexdigest()),
-        DBUser(id="4", username="gamer99", email="gamer99@example.com",
-               password_hash=sha256("password123".encode()).hexdigest()),
-        DBUser(id="5", username="prosnake", email="prosnake@example.com",
-               password_hash=sha256("password123".encode()).hexdigest()),
-        DBUser(id="6", username="ninja", email="ninja@example.com",
-               password_hash=sha256("password123".encode()).hexdigest()),
-        DBUser(id="7", username="champion", email="champion@example.com",
-               password_hash=sha256("password123".encode()).hexdigest()),
-        DBUser(id="8", username="rookie", email="rookie@example.com",
-               password_hash=sha256("password123".encode()).hexdigest()),
+        DBUser(id="1", username="player1", email="player1@example.com"),
+        DBUser(id="2", username="speedrunner", email="speedrunner@example.com"),
+        DBUser(id="3", username="snakemaster", email="snakemaster@example.com"),
+        DBUser(id="4", username="gamer99", email="gamer99@example.com"),
+        DBUser(id="5", username="prosnake", email="prosnake@example.com"),
+        DBUser(id="6", username="ninja", email="ninja@example.com"),
+        DBUser(id="7", username="champion", email="champion@example.com"),
+        DBUser(id="8", username="rookie", email="rookie@example.com"),
     ]
     
     for user in mock_users:
+        user.password_hash = hash_password("password123")
         db.add(user)
     
     # Create mock leaderboard entries
@@ -79,6 +67,8 @@ def seed_database(db: Session):
     for entry in mock_leaderboard:
         db.add(entry)
     
+    db.flush()
+    rebuild_best_scores(db)
     db.commit()
     print("Database seeded successfully!")
 
@@ -102,9 +92,12 @@ def get_user_by_id(db: Session, user_id: str) -> Optional[DBUser]:
 
 def create_user(db: Session, username: str, email: str, password: str) -> DBUser:
     """Create a new user."""
-    from hashlib import sha256
+    return add_user(db, username, email, hash_password(password))
+
+
+def add_user(db: Session, username: str, email: str, password_hash: str) -> DBUser:
+    """Create a new user whose password is already hashed."""
     user_id = str(uuid.uuid4())
-    password_hash = sha256(password.encode()).hexdigest()
     
     db_user = DBUser(
         id=user_id,
@@ -119,16 +112,21 @@ def create_user(db: Session, username: str, email: str, password: str) -> DBUser
 
 
 def verify_password(db: Session, email: str, password: str) -> Optional[DBUser]:
-    """Verify user credentials and return user if valid."""
-    from hashlib import sha256
+    """Verify user credentials and return user if valid, upgrading an outdated hash."""
     user = get_user_by_email(db, email)
-    if not user:
+    if not user or not check_password(password, user.password_hash):
         return None
     
-    password_hash = sha256(password.encode()).hexdigest()
-    if user.password_hash == password_hash:
-        return user
-    return None
+    if needs_rehash(user.password_hash):
+        update_password_hash(db, user, hash_password(password))
+    return user
+
+
+def update_password_hash(db: Session, user: DBUser, password_hash: str):
+    """Replace a user's stored password hash."""
+    user.password_hash = password_hash
+    db.commit()
+    db.refresh(user)
 
 
 # Leaderboard Operations
@@ -140,38 +138,298 @@ def get_leaderboard(db: Session, mode: Optional[GameMode] = None, limit: int = 1
     if mode:
         query = query.filter(DBLeaderboardEntry.mode == mode)
     
-    return query.order_by(desc(DBLeaderboardEntry.score)).limit(limit).all()
+    return query.order_by(
+        desc(DBLeaderboardEntry.score), DBLeaderboardEntry.created_at, DBLeaderboardEntry.id
+    ).limit(limit).all()
 
 
 def create_leaderboard_entry(db: Session, user_id: str, username: str, score: int, mode: GameMode) -> DBLeaderboardEntry:
-    """Create a new leaderboard entry."""
-    entry_id = str(uuid.uuid4())
-    
-    db_entry = DBLeaderboardEntry(
-        id=entry_id,
-        user_id=user_id,
-        username=username,
-        score=score,
-        mode=mode
-    )
+    """Create a new leaderboard entry and raise the user's best score in the same transaction."""
+    row = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "username": username,
+        "score": score,
+        "mode": mode,
+        "created_at": datetime.now(timezone.utc),
+    }
+    db_entry = DBLeaderboardEntry(**row)
     db.add(db_entry)
+    upsert_best_scores(db, [row])
     db.commit()
     db.refresh(db_entry)
+    score_recorded(db_leaderboard_to_leaderboard(db_entry), db_entry.created_at)
     return db_entry
 
 
+def load_leaderboard_index(db: Session):
+    """
+    Load every leaderboard entry, including queued ones, into the in-memory ranked index.
+
+    No lock is held while the table is read, since an AsyncSession hands the
+    event loop back between fetches. Scores queued before the read and
+    scores recorded during it are merged in afterwards instead.
+    """
+    with leaderboard_index.loading():
+        pending = leaderboard_writer.pending_items()
+        items = [
+            make_index_item(db_leaderboard_to_leaderboard(row), row.created_at)
+            for row in db.query(DBLeaderboardEntry).yield_per(10000)
+        ]
+        leaderboard_index.load(merge_pending(items, pending))
+    leaderboard_cache.invalidate()
+
+
+def ensure_leaderboard_index(db: Session):
+    """Load the ranked index on first use if startup did not load it."""
+    if not leaderboard_index.loaded:
+        load_leaderboard_index(db)
+
+
+# Best Score Operations
+
+def upsert_best_scores(db: Session, rows: List[dict]):
+    """
+    Raise players' best scores to those of newly inserted leaderboard rows.
+    
+    Rows are the column dicts of the inserted entries. Runs in the caller's
+    transaction, so the best scores commit together with the entries.
+    """
+    best: Dict[Tuple[str, GameMode], dict] = {}
+    for row in rows:
+        key = (row["user_id"], row["mode"])
+        if key not in best or row["score"] > best[key]["score"]:
+            best[key] = row
+    if not best:
+        return
+    
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(DBBestScore).values([
+        {
+            "user_id": row["user_id"],
+            "mode": row["mode"],
+            "username": row["username"],
+            "score": row["score"],
+            "entry_id": row["id"],
+            "achieved_at": row["created_at"],
+        }
+        for row in best.values()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[DBBestScore.user_id, DBBestScore.mode],
+        set_={
+            "username": statement.excluded.username,
+            "score": statement.excluded.score,
+            "entry_id": statement.excluded.entry_id,
+            "achieved_at": statement.excluded.achieved_at,
+        },
+        where=statement.excluded.score > DBBestScore.score
+    )
+    db.execute(statement)
+
+
+def rebuild_best_scores(db: Session):
+    """Recompute every best score from the leaderboard table, in the caller's transaction."""
+    ranked = select(
+        DBLeaderboardEntry.user_id,
+        DBLeaderboardEntry.mode,
+        DBLeaderboardEntry.username,
+        DBLeaderboardEntry.score,
+        DBLeaderboardEntry.id,
+        DBLeaderboardEntry.created_at,
+        func.row_number().over(
+            partition_by=(DBLeaderboardEntry.user_id, DBLeaderboardEntry.mode),
+            order_by=(desc(DBLeaderboardEntry.score), DBLeaderboardEntry.created_at, DBLeaderboardEntry.id)
+        ).label("position")
+    ).subquery()
+    
+    db.execute(delete(DBBestScore))
+    db.execute(insert(DBBestScore).from_select(
+        ["user_id", "mode", "username", "score", "entry_id", "achieved_at"],
+        select(
+            ranked.c.user_id,
+            ranked.c.mode,
+            ranked.c.username,
+            ranked.c.score,
+            ranked.c.id,
+            ranked.c.created_at
+        ).where(ranked.c.position == 1)
+    ))
+
+
 def get_user_best_score(db: Session, user_id: str, mode: GameMode) -> Optional[int]:
-    """Get the user's best score for a specific game mode."""
-    entry = db.query(DBLeaderboardEntry).filter(
-        DBLeaderboardEntry.user_id == user_id,
-        DBLeaderboardEntry.mode == mode
-    ).order_by(desc(DBLeaderboardEntry.score)).first()
+    """Get the user's best score for a specific game mode, including queued scores."""
+    # Pending scores are read before the table so a batch committing in
+    # between is seen in at least one of them
+    pending = [
+        entry.score for entry, row in leaderboard_writer.pending_rows()
+        if row["user_id"] == user_id and entry.mode == mode
+    ]
+    best = db.get(DBBestScore, (user_id, mode))
+    scores = pending + ([best.score] if best else [])
+    return max(scores) if scores else None
+
+
+def get_user_rank(db: Session, user_id: str, mode: GameMode) -> Tuple[Optional[int], int]:
+    """
+    Get the rank of the user's best score in a mode and the number of ranked entries.
+
+    The rank is None if the user has no score in the mode. Ends the
+    transaction afterwards, since the caller may hold the session for as long
+    as a WebSocket stays open.
+    """
+    ensure_leaderboard_index(db)
+    best = get_user_best_score(db, user_id, mode)
+    db.rollback()
+    rank = None if best is None else leaderboard_index.rank_of(best, mode)
+    return rank, leaderboard_index.count(mode)
+
+
+def get_unique_leaderboard(db: Session, mode: Optional[GameMode] = None, limit: int = 100) -> List[LeaderboardEntry]:
+    """
+    Get the top players, each shown once with their best score.
+    
+    Without a mode a player's best across all modes is used. Scores queued
+    by the write-behind writer are included.
+    """
+    pending = [
+        (make_index_item(entry, row["created_at"]), row["user_id"])
+        for entry, row in leaderboard_writer.pending_rows()
+        if mode is None or entry.mode == mode
+    ]
+    
+    query = db.query(DBBestScore)
+    if mode:
+        query = query.filter(DBBestScore.mode == mode)
+    # A player has at most one row per mode, so this many rows always
+    # holds `limit` distinct players
+    rows = query.order_by(
+        desc(DBBestScore.score), DBBestScore.achieved_at, DBBestScore.entry_id
+    ).limit(limit * (1 if mode else len(GameMode)) + len(pending)).all()
+    
+    candidates = pending + [(make_index_item(db_best_score_to_leaderboard(row), row.achieved_at), row.user_id) for row in rows]
+    candidates.sort(key=lambda candidate: candidate[0][:3])
     
-    return entry.score if entry else None
+    seen = set()
+    entries = []
+    for item, user_id in candidates:
+        if user_id in seen:
+            continue
+        seen.add(user_id)
+        entries.append(item[3])
+        if len(entries) == limit:
+            break
+    return entries
+
+
+# Async Operations
+#
+# Each CRUD function above has an `_async` counterpart for request handlers.
+# They take either kind of session: with an AsyncSession the synchronous
+# function runs through `run_sync`, so every round trip to the database
+# awaits on the event loop instead of blocking it; with a plain Session they
+# simply call the function. Password hashing never runs on the event loop:
+# the user functions hash in `password_hasher`'s pool first.
+
+# One per event loop: waiters for the first index load on this worker
+_index_load_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+async def _run(db: DBSession, operation: Callable[..., Any], *args, **kwargs) -> Any:
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(operation, *args, **kwargs)
+    return operation(db, *args, **kwargs)
+
+
+async def seed_database_async(db: DBSession):
+    """Seed the database with initial data if empty."""
+    return await _run(db, seed_database)
+
+
+async def get_user_by_email_async(db: DBSession, email: str) -> Optional[DBUser]:
+    """Get a user by email address."""
+    return await _run(db, get_user_by_email, email)
+
+
+async def get_user_by_username_async(db: DBSession, username: str) -> Optional[DBUser]:
+    """Get a user by username."""
+    return await _run(db, get_user_by_username, username)
+
+
+async def get_user_by_id_async(db: DBSession, user_id: str) -> Optional[DBUser]:
+    """Get a user by ID."""
+    return await _run(db, get_user_by_id, user_id)
+
+
+async def create_user_async(db: DBSession, username: str, email: str, password: str) -> DBUser:
+    """Create a new user, hashing the password in the hashing pool."""
+    password_hash = await password_hasher.hash(password)
+    return await _run(db, add_user, username, email, password_hash)
+
+
+async def verify_password_async(db: DBSession, email: str, password: str) -> Optional[DBUser]:
+    """Verify user credentials in the hashing pool and return user if valid, upgrading an outdated hash."""
+    user = await get_user_by_email_async(db, email)
+    if not await password_hasher.check(password, user.password_hash if user else None):
+        return None
+    
+    if needs_rehash(user.password_hash):
+        await _run(db, update_password_hash, user, await password_hasher.hash(password))
+    return user
+
+
+async def get_leaderboard_async(db: DBSession, mode: Optional[GameMode] = None, limit: int = 100) -> List[DBLeaderboardEntry]:
+    """Get leaderboard entries, optionally filtered by game mode."""
+    return await _run(db, get_leaderboard, mode, limit)
+
+
+async def create_leaderboard_entry_async(db: DBSession, user_id: str, username: str, score: int, mode: GameMode) -> DBLeaderboardEntry:
+    """Create a new leaderboard entry."""
+    return await _run(db, create_leaderboard_entry, user_id, username, score, mode)
+
+
+async def load_leaderboard_index_async(db: DBSession):
+    """Load every leaderboard entry into the in-memory ranked index."""
+    return await _run(db, load_leaderboard_index)
+
+
+async def ensure_leaderboard_index_async(db: DBSession):
+    """
+    Load the ranked index on first use if startup did not load it.
+
+    Requests arriving while it loads wait for that load instead of each
+    reading the whole table again.
+    """
+    if leaderboard_index.loaded:
+        return
+    loop = asyncio.get_running_loop()
+    lock = _index_load_locks.get(loop)
+    if lock is None:
+        lock = _index_load_locks[loop] = asyncio.Lock()
+    async with lock:
+        if not leaderboard_index.loaded:
+            await load_leaderboard_index_async(db)
+
+
+async def get_user_best_score_async(db: DBSession, user_id: str, mode: GameMode) -> Optional[int]:
+    """Get the user's best score for a specific game mode, including queued scores."""
+    return await _run(db, get_user_best_score, user_id, mode)
+
+
+async def get_user_rank_async(db: DBSession, user_id: str, mode: GameMode) -> Tuple[Optional[int], int]:
+    """Get the rank of the user's best score in a mode and the number of ranked entries."""
+    await ensure_leaderboard_index_async(db)
+    return await _run(db, get_user_rank, user_id, mode)
+
+
+async def get_unique_leaderboard_async(db: DBSession, mode: Optional[GameMode] = None, limit: int = 100) -> List[LeaderboardEntry]:
+    """Get the top players, each shown once with their best score."""
+    return await _run(db, get_unique_leaderboard, mode, limit)
 
 
 # Helper function to convert DB models to Pydantic models
 
+@timed_function("convert")
 def db_user_to_user(db_user: DBUser) -> User:
     """Convert database user to Pydantic User model."""
     return User(
@@ -181,6 +439,7 @@ def db_user_to_user(db_user: DBUser) -> User:
     )
 
 
+@timed_function("convert")
 def db_leaderboard_to_leaderboard(db_entry: DBLeaderboardEntry) -> LeaderboardEntry:
     """Convert database leaderboard entry to Pydantic LeaderboardEntry model."""
     return LeaderboardEntry(
@@ -190,3 +449,15 @@ def db_leaderboard_to_leaderboard(db_entry: DBLeaderboardEntry) -> LeaderboardEn
         mode=db_entry.mode,
         date=db_entry.created_at.strftime("%Y-%m-%d") if db_entry.created_at else ""
     )
+
+
+@timed_function("convert")
+def db_best_score_to_leaderboard(db_best: DBBestScore) -> LeaderboardEntry:
+    """Convert a best score row to a Pydantic LeaderboardEntry for the entry it came from."""
+    return LeaderboardEntry(
+        id=db_best.entry_id,
+        username=db_best.username,
+        score=db_best.score,
+        mode=db_best.mode,
+        date=db_best.achieved_at.strftime("%Y-%m-%d") if db_best.achieved_at else ""
+    )
@@ -1,17 +1,32 @@
 """
 Database configuration and session management for SQLAlchemy.
 Supports both PostgreSQL (production) and SQLite (development/testing).
+
+Engines are created on first use, so importing the app opens no database
+driver and connects to nothing.
+
+With ASYNC_DATABASE=true, request handlers get an AsyncSession on an async
+engine (asyncpg for PostgreSQL, aiosqlite for SQLite) so queries do not block
+the event loop. Startup work such as migrating and seeding always uses the
+synchronous engine.
 """
 import os
-from sqlalchemy import create_engine
+import sys
+from sqlalchemy import Engine, create_engine, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
-from dotenv import load_dotenv
+from typing import AsyncGenerator, Optional, Union
 
-from .db_models import Base
+# Startup mode: "development" migrates and seeds the database at startup and
+# reads .env; "production" only checks that the schema is current
+STARTUP_MODE = os.getenv("STARTUP_MODE", "development").lower()
+PRODUCTION = STARTUP_MODE == "production"
 
-# Load environment variables
-load_dotenv()
+if not PRODUCTION:
+    # Load environment variables; production hosts set them directly
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -19,47 +34,179 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 # If no DATABASE_URL is set, default to SQLite
 if not DATABASE_URL:
     DATABASE_URL = "sqlite:///./snake_arena.db"
-    print(f"Using SQLite database: {DATABASE_URL}")
-else:
-    print(f"Using database: {DATABASE_URL.split('@')[0]}@...")  # Don't log credentials
-
-# Create engine with appropriate settings
-if DATABASE_URL.startswith("sqlite"):
-    # SQLite specific settings
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},  # Needed for SQLite
-        echo=False  # Set to True for SQL debugging
-    )
-else:
-    # PostgreSQL settings
-    engine = create_engine(
-        DATABASE_URL,
-        echo=False,  # Set to True for SQL debugging
-        pool_pre_ping=True,  # Verify connections before using them
-        pool_size=5,
-        max_overflow=10
-    )
-
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+_engine: Optional[Engine] = None
+
+
+def get_engine() -> Engine:
+    """The synchronous engine, created on first use."""
+    global _engine
+    if _engine is not None:
+        return _engine
+    if DATABASE_URL.startswith("sqlite"):
+        print(f"Using SQLite database: {DATABASE_URL}", file=sys.stderr)
+        # SQLite specific settings
+        _engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},  # Needed for SQLite
+            echo=False  # Set to True for SQL debugging
+        )
+    else:
+        print(f"Using database: {DATABASE_URL.split('@')[0]}@...", file=sys.stderr)  # Don't log credentials
+        # PostgreSQL settings
+        _engine = create_engine(
+            DATABASE_URL,
+            echo=False,  # Set to True for SQL debugging
+            pool_pre_ping=True,  # Verify connections before using them
+            pool_size=5,
+            max_overflow=10
+        )
+    return _engine
+
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+
+def SessionLocal() -> Session:
+    """Open a session on the synchronous engine."""
+    return _session_factory(bind=get_engine())
+
+
+# Either kind of session handed to request handlers
+DBSession = Union[Session, AsyncSession]
+
+
+def to_async_url(url: str) -> str:
+    """Swap the driver in a database URL for its asyncio counterpart."""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+# Serve requests with AsyncSession instead of Session
+ASYNC_DATABASE = os.getenv("ASYNC_DATABASE", "false").lower() == "true"
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """The AsyncSession factory, creating the async engine on first use."""
+    global async_engine, AsyncSessionLocal
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal
+    if ASYNC_DATABASE_URL.startswith("sqlite"):
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
+    else:
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            echo=False,
+            pool_pre_ping=True,
+            pool_size=5,
+            max_overflow=10
+        )
+    # Objects stay usable after commit without a lazy refresh on the loop
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return AsyncSessionLocal
+
+
+# Alembic configuration for the migrations in backend/migrations
+ALEMBIC_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# Latest migration in backend/migrations; update it with every new migration
+SCHEMA_REVISION = "0003"
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised when the database schema is not at SCHEMA_REVISION."""
+
+
+def verify_schema(bind: Optional[Engine] = None):
+    """
+    Check that the database is migrated to SCHEMA_REVISION.
+    
+    A single query against `alembic_version`, without loading Alembic, for
+    production startups where migrations run as a separate deploy step.
+    """
+    bind = bind or get_engine()
+    with bind.connect() as connection:
+        try:
+            current = connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except DBAPIError:
+            # No alembic_version table: never migrated
+            current = None
+    if current != SCHEMA_REVISION:
+        raise SchemaVersionError(
+            f"Database schema is at revision {current or 'none'}, expected {SCHEMA_REVISION}; "
+            "run `alembic upgrade head` before starting the server"
+        )
+
+
+def migrate_database(bind: Optional[Engine] = None):
+    """
+    Upgrade the schema to the latest Alembic revision.
+    
+    Databases whose tables were made by `create_all` before migrations
+    existed are first stamped with the revision their tables match.
+    """
+    from alembic import command
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    
+    bind = bind or get_engine()
+    config = Config(ALEMBIC_CONFIG)
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+    with bind.begin() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+        if current == heads:
+            return
+        
+        config.attributes["connection"] = connection
+        if not current:
+            tables = inspect(connection).get_table_names()
+            if "best_scores" in tables:
+                command.stamp(config, "0002")
+            elif "leaderboard" in tables:
+                command.stamp(config, "0001")
+        command.upgrade(config, "head")
+    print("Database migrated to the latest revision")
 
 
 def init_db():
-    """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
+    """Initialize database tables by running any pending migrations."""
+    migrate_database()
     print("Database tables created successfully")
 
 
-def get_db() -> Generator[Session, None, None]:
+async def close_db():
+    """Release pooled async connections on shutdown."""
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+async def get_db() -> AsyncGenerator[DBSession, None]:
     """
     Dependency function for FastAPI endpoints to get database session.
     
+    Yields an AsyncSession when ASYNC_DATABASE is enabled and a Session
+    otherwise; the `*_async` functions in `database` accept either.
+    
     Usage in endpoints:
         @app.get("/users")
-        def get_users(db: Session = Depends(get_db)):
+        async def get_users(db: DBSession = Depends(get_db)):
             ...
     """
+    if ASYNC_DATABASE:
+        async with get_async_sessionmaker()() as db:
+            yield db
+        return
+
     db = SessionLocal()
     try:
         yield db
@@ -1,7 +1,7 @@
 """
 SQLAlchemy database models for the Snake Arena application.
 """
-from sqlalchemy import Column, String, Integer, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, DateTime, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from .models import GameMode
@@ -26,11 +26,39 @@ class DBLeaderboardEntry(Base):
     __tablename__ = "leaderboard"
 
     id = Column(String, primary_key=True)
-    user_id = Column(String, nullable=False, index=True)
+    user_id = Column(String, nullable=False)
     username = Column(String, nullable=False)
     score = Column(Integer, nullable=False)
-    mode = Column(SQLEnum(GameMode), nullable=False, index=True)
+    mode = Column(SQLEnum(GameMode), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Match the leaderboard's sort order (score descending, then oldest, then
+    # id) so top-N and rank queries read an index range instead of sorting
+    __table_args__ = (
+        Index("ix_leaderboard_mode_score", mode, score.desc(), created_at, id),
+        Index("ix_leaderboard_score", score.desc(), created_at, id),
+        Index("ix_leaderboard_user_mode_score", user_id, mode, score.desc()),
+    )
+
     def __repr__(self):
         return f"<LeaderboardEntry(username={self.username}, score={self.score}, mode={self.mode})>"
+
+
+class DBBestScore(Base):
+    """Each player's best score per game mode, maintained as scores are inserted."""
+    __tablename__ = "best_scores"
+
+    user_id = Column(String, primary_key=True)
+    mode = Column(SQLEnum(GameMode), primary_key=True)
+    username = Column(String, nullable=False)
+    score = Column(Integer, nullable=False)
+    entry_id = Column(String, nullable=False)
+    achieved_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_best_scores_mode_score", mode, score.desc(), achieved_at, entry_id),
+        Index("ix_best_scores_score", score.desc(), achieved_at, entry_id),
+    )
+
+    def __repr__(self):
+        return f"<BestScore(username={self.username}, score={self.score}, mode={self.mode})>"
@@ -0,0 +1,255 @@
+"""
+Authoritative server-side snake simulation.
+
+Reproduces the rules in the frontend's `gameLogic.ts` for both game modes:
+
+* the snake starts at (10, 10), (9, 10), (8, 10) heading right
+* a direction change to the exact opposite direction is ignored
+* in walls mode leaving the grid ends the game; in pass-through mode the
+  head wraps around to the other side
+* the new head may not land on any current segment, including the tail
+  that is about to move away
+* eating food grows the snake by one and scores 10 points, and new food is
+  placed on a random cell not covered by the snake
+
+The state is array-backed so a tick does no allocation: the body is a ring
+buffer of cell indices (y * GRID_SIZE + x), a 400-byte bitmap marks occupied
+cells, and free cells are kept in a dense list with a reverse index so food
+placement picks a random free cell in O(1).
+
+Food placement draws from `Mulberry32`, a small 32-bit generator that is
+trivial to port to JavaScript. Given the same seed and inputs, a client
+that keeps the same free-cell list (initially cells 0..399 in order; occupying
+a cell swaps the last free cell into its slot, freeing a cell appends it)
+places food on exactly the same cells as the server.
+"""
+from array import array
+from typing import List
+
+from .models import Direction, GameMode, GameState, GameStatus, Position, Snake
+
+
+GRID_SIZE = 20
+CELL_COUNT = GRID_SIZE * GRID_SIZE
+POINTS_PER_FOOD = 10
+
+INITIAL_BODY = [(10, 10), (9, 10), (8, 10)]
+INITIAL_DIRECTION = Direction.RIGHT
+
+OPPOSITE_DIRECTION = {
+    Direction.UP: Direction.DOWN,
+    Direction.DOWN: Direction.UP,
+    Direction.LEFT: Direction.RIGHT,
+    Direction.RIGHT: Direction.LEFT,
+}
+
+MOVES = {
+    Direction.UP: (0, -1),
+    Direction.DOWN: (0, 1),
+    Direction.LEFT: (-1, 0),
+    Direction.RIGHT: (1, 0),
+}
+
+# Marks a cell with no entry in the free list, and an out-of-bounds move
+NO_CELL = 0xFFFF
+
+_MASK32 = 0xFFFFFFFF
+
+_ALL_CELLS = array("H", range(CELL_COUNT))
+_EMPTY_BODY = array("H", [0] * CELL_COUNT)
+_EMPTY_BITMAP = bytes(CELL_COUNT)
+
+
+def build_next_cell(mode: GameMode, size: int = GRID_SIZE):
+    """Precompute the cell reached from every cell of a size x size grid in every direction."""
+    table = {}
+    for direction, (dx, dy) in MOVES.items():
+        cells = array("H", [NO_CELL] * (size * size))
+        for cell in range(size * size):
+            x = cell % size + dx
+            y = cell // size + dy
+            if mode == GameMode.pass_through:
+                x %= size
+                y %= size
+            elif not (0 <= x < size and 0 <= y < size):
+                continue
+            cells[cell] = y * size + x
+        table[direction] = cells
+    return table
+
+
+NEXT_CELL = {mode: build_next_cell(mode) for mode in (GameMode.walls, GameMode.pass_through)}
+
+
+def to_cell(x: int, y: int) -> int:
+    return y * GRID_SIZE + x
+
+
+def to_position(cell: int) -> Position:
+    return Position(x=cell % GRID_SIZE, y=cell // GRID_SIZE)
+
+
+class Mulberry32:
+    """
+    Mulberry32 pseudo-random generator.
+
+    Matches the common JavaScript implementation bit for bit, so a seed
+    yields the same sequence on the server and in the browser.
+    """
+
+    __slots__ = ("state",)
+
+    def __init__(self, seed: int):
+        self.state = seed & _MASK32
+
+    def next_uint32(self) -> int:
+        self.state = a = (self.state + 0x6D2B79F5) & _MASK32
+        t = ((a ^ (a >> 15)) * (a | 1)) & _MASK32
+        t = ((t + (((t ^ (t >> 7)) * (t | 61)) & _MASK32)) & _MASK32) ^ t
+        return t ^ (t >> 14)
+
+    def random(self) -> float:
+        """A float in [0, 1), like Math.random()."""
+        return self.next_uint32() / 4294967296
+
+    def below(self, n: int) -> int:
+        """An integer in [0, n), computed as Math.floor(random() * n)."""
+        return self.next_uint32() * n >> 32
+
+
+class SnakeEngine:
+    """A single-player snake game stepped on the server."""
+
+    __slots__ = (
+        "mode", "rng", "direction", "status", "score", "food",
+        "body", "head", "length", "occupied", "free", "free_index", "free_count",
+        "_next_cell",
+    )
+
+    def __init__(self, mode: GameMode, seed: int = 0):
+        self.mode = mode
+        self.rng = Mulberry32(seed)
+        self._next_cell = NEXT_CELL[mode]
+        self.body = array("H", _EMPTY_BODY)
+        self.occupied = bytearray(CELL_COUNT)
+        self.free = array("H", _ALL_CELLS)
+        self.free_index = array("H", _ALL_CELLS)
+        self.reset(seed)
+
+    def reset(self, seed: int = 0):
+        """Start over with a new game, reusing the existing buffers."""
+        self.rng.state = seed & _MASK32
+        self.occupied[:] = _EMPTY_BITMAP
+        self.free[:] = _ALL_CELLS
+        self.free_index[:] = _ALL_CELLS
+        self.free_count = CELL_COUNT
+        self.head = 0
+        self.length = 0
+        self.direction = INITIAL_DIRECTION
+        self.status = GameStatus.idle
+        self.score = 0
+        self.food = NO_CELL
+
+        # Tail first so the head ends up at the front of the ring buffer
+        for x, y in reversed(INITIAL_BODY):
+            self._push_head(to_cell(x, y))
+        self._place_food()
+
+    def start(self):
+        self.status = GameStatus.playing
+
+    def change_direction(self, direction: Direction):
+        """Turn the snake, ignoring a turn back onto itself."""
+        if OPPOSITE_DIRECTION[self.direction] != direction:
+            self.direction = direction
+
+    def step(self) -> bool:
+        """
+        Advance the game by one tick.
+
+        Returns whether the game is still running afterwards.
+        """
+        if self.status != GameStatus.playing:
+            return False
+
+        new_head = self._next_cell[self.direction][self.body[self.head]]
+        if new_head == NO_CELL or self.occupied[new_head]:
+            self.status = GameStatus.game_over
+            return False
+
+        ate_food = new_head == self.food
+        self._push_head(new_head)
+        if ate_food:
+            self.score += POINTS_PER_FOOD
+            self._place_food()
+        else:
+            self._pop_tail()
+        return self.status == GameStatus.playing
+
+    @property
+    def head_cell(self) -> int:
+        return self.body[self.head]
+
+    @property
+    def tail_cell(self) -> int:
+        return self.body[(self.head + self.length - 1) % CELL_COUNT]
+
+    def cells(self) -> List[int]:
+        """Body cells from head to tail."""
+        return [self.body[(self.head + i) % CELL_COUNT] for i in range(self.length)]
+
+    def to_game_state(self) -> GameState:
+        return GameState(
+            snake=Snake(
+                body=[to_position(cell) for cell in self.cells()],
+                direction=self.direction
+            ),
+            food=to_position(self.food),
+            score=self.score,
+            status=self.status,
+            mode=self.mode
+        )
+
+    @classmethod
+    def from_game_state(cls, state: GameState, seed: int = 0) -> "SnakeEngine":
+        """Build an engine positioned at an existing game state on the grid."""
+        engine = cls(state.mode, seed)
+        for _ in range(engine.length):
+            engine._pop_tail()
+        for segment in reversed(state.snake.body):
+            engine._push_head(to_cell(segment.x, segment.y))
+        engine.food = to_cell(state.food.x, state.food.y)
+        engine.direction = state.snake.direction
+        engine.status = state.status
+        engine.score = state.score
+        return engine
+
+    def _push_head(self, cell: int):
+        self.head = (self.head - 1) % CELL_COUNT
+        self.body[self.head] = cell
+        self.length += 1
+        self.occupied[cell] = 1
+
+        # Swap the last free cell into this cell's slot
+        index = self.free_index[cell]
+        self.free_count -= 1
+        last = self.free[self.free_count]
+        self.free[index] = last
+        self.free_index[last] = index
+        self.free_index[cell] = NO_CELL
+
+    def _pop_tail(self):
+        cell = self.body[(self.head + self.length - 1) % CELL_COUNT]
+        self.length -= 1
+        self.occupied[cell] = 0
+
+        self.free[self.free_count] = cell
+        self.free_index[cell] = self.free_count
+        self.free_count += 1
+
+    def _place_food(self):
+        if self.free_count == 0:
+            # The snake fills the whole grid; there is nowhere left to go
+            self.status = GameStatus.game_over
+            return
+        self.food = self.free[self.rng.below(self.free_count)]
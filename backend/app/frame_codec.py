@@ -0,0 +1,277 @@
+"""
+Compact binary wire format for streaming GameState frames.
+
+A stream is a sequence of frames, each stamped with a 16-bit sequence number:
+
+* Keyframes carry the whole state.
+* Deltas carry only what changed since the previous frame: the cells added at
+  the head, how many cells were dropped from the tail, and the score and food
+  when they changed.
+
+Positions are packed as two bytes (x, y), so a normal tick costs a handful of
+bytes instead of re-sending every segment as a JSON object. Layout
+(big-endian):
+
+    keyframe: 'K' seq:u16 meta:u8 score:u32 food:u16 length:u16 body:u16*length
+    delta:    'D' seq:u16 meta:u8 flags:u8 dropped:u8 heads:u16*n [score:u32] [food:u16]
+
+`meta` packs mode, status and direction; the low nibble of `flags` holds the
+number of head cells and the high bits mark a changed score or food.
+"""
+import struct
+from collections import deque
+from itertools import islice
+from typing import Deque, List, Optional, Sequence
+
+from .models import Direction, GameMode, GameState, GameStatus, Position, Snake
+
+
+KEYFRAME = ord("K")
+DELTA = ord("D")
+
+# Emit a keyframe at least this often so a stream can be joined or recovered
+KEYFRAME_INTERVAL = 50
+
+# Deltas describing more head cells or dropped tail cells fall back to keyframes
+MAX_HEAD_CELLS = 15
+MAX_DROPPED_CELLS = 255
+
+_SCORE_CHANGED = 0x10
+_FOOD_CHANGED = 0x20
+
+_MODES = list(GameMode)
+_STATUSES = list(GameStatus)
+_DIRECTIONS = list(Direction)
+
+_KEYFRAME_HEADER = struct.Struct(">BHBIHH")
+_DELTA_HEADER = struct.Struct(">BHBBB")
+_SIMPLE_DELTA = struct.Struct(">BHBBBH")
+_SCORE = struct.Struct(">I")
+_CELL = struct.Struct(">H")
+
+
+class FrameCodecError(ValueError):
+    """Raised when a frame cannot be encoded or does not apply to the stream."""
+
+
+def pack_meta(mode: GameMode, status: GameStatus, direction: Direction) -> int:
+    """Pack mode, status and direction into a frame's metadata byte."""
+    return _MODES.index(mode) << 4 | _STATUSES.index(status) << 2 | _DIRECTIONS.index(direction)
+
+
+def pack_cell(x: int, y: int) -> int:
+    """Pack a grid position into the 16-bit cell value used on the wire."""
+    if not (0 <= x <= 0xFF and 0 <= y <= 0xFF):
+        raise FrameCodecError(f"Position out of range: ({x}, {y})")
+    return x << 8 | y
+
+
+def _cell(position: Position) -> int:
+    return pack_cell(position.x, position.y)
+
+
+def _position(cell: int) -> Position:
+    return Position(x=cell >> 8, y=cell & 0xFF)
+
+
+class FrameCodec:
+    """
+    One end of a frame stream.
+
+    The same class is used on both sides: the sender turns successive game
+    states into frames with `encode`, the receiver feeds those frames to
+    `decode` to rebuild the states. A codec that only relays frames can use
+    `decode` to track the stream and `keyframe` to let new receivers join.
+    """
+
+    def __init__(self, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.seq: Optional[int] = None
+        self.meta = 0
+        self.score = 0
+        self.food = 0
+        self.body: Deque[int] = deque()
+        self._since_keyframe = 0
+
+    def encode(self, state: GameState) -> bytes:
+        """Encode the next state of the stream as a delta or keyframe."""
+        meta = pack_meta(state.mode, state.status, state.snake.direction)
+        if state.score < 0 or state.score > 0xFFFFFFFF:
+            raise FrameCodecError(f"Score out of range: {state.score}")
+        food = _cell(state.food)
+        cells = [_cell(segment) for segment in state.snake.body]
+
+        seq = 0 if self.seq is None else (self.seq + 1) & 0xFFFF
+        delta = None
+        if self.seq is not None and self._since_keyframe + 1 < self.keyframe_interval:
+            delta = self._diff(seq, meta, state.score, food, cells)
+        if delta is None:
+            self._set(seq, meta, state.score, food, cells)
+            return self.keyframe()
+
+        self._apply_delta(delta)
+        return delta
+
+    def encode_delta(self, heads: Sequence[int], dropped: int, score: int, food: int, meta: int) -> bytes:
+        """
+        Encode the next frame from a known move instead of a full state.
+
+        For producers that already know what changed, such as a server-side
+        game engine: `heads` are the packed cells added at the head (newest
+        first) and `dropped` the number of cells removed from the tail. Costs
+        the same regardless of the snake's length.
+        """
+        if self.seq is None:
+            raise FrameCodecError("Stream has no state yet")
+        if dropped > len(self.body):
+            raise FrameCodecError("Cannot drop more cells than the body has")
+        if self._since_keyframe + 1 >= self.keyframe_interval \
+                or len(heads) > MAX_HEAD_CELLS or dropped > MAX_DROPPED_CELLS:
+            body = self.body
+            for _ in range(dropped):
+                body.pop()
+            body.extendleft(reversed(heads))
+            self._set((self.seq + 1) & 0xFFFF, meta, score, food, body)
+            return self.keyframe()
+
+        seq = (self.seq + 1) & 0xFFFF
+        delta = self._build_delta(seq, meta, heads, dropped, score, food)
+        body = self.body
+        for _ in range(dropped):
+            body.pop()
+        body.extendleft(reversed(heads))
+        self.seq = seq
+        self.meta = meta
+        self.score = score
+        self.food = food
+        self._since_keyframe += 1
+        return delta
+
+    def keyframe(self) -> bytes:
+        """Encode the current state of the stream as a keyframe."""
+        if self.seq is None:
+            raise FrameCodecError("Stream has no state yet")
+        length = len(self.body)
+        return _KEYFRAME_HEADER.pack(
+            KEYFRAME, self.seq, self.meta, self.score, self.food, length
+        ) + struct.pack(f">{length}H", *self.body)
+
+    def decode(self, frame: bytes) -> None:
+        """Apply a received frame to the stream."""
+        if not frame:
+            raise FrameCodecError("Empty frame")
+        try:
+            if frame[0] == KEYFRAME:
+                _, seq, meta, score, food, length = _KEYFRAME_HEADER.unpack_from(frame)
+                if len(frame) != _KEYFRAME_HEADER.size + 2 * length:
+                    raise FrameCodecError("Keyframe length mismatch")
+                self._check_meta(meta)
+                body = struct.unpack_from(f">{length}H", frame, _KEYFRAME_HEADER.size)
+                self._set(seq, meta, score, food, body)
+            elif frame[0] == DELTA:
+                self._apply_delta(frame)
+            else:
+                raise FrameCodecError(f"Unknown frame type: {frame[0]}")
+        except struct.error as exc:
+            raise FrameCodecError(f"Truncated frame: {exc}") from exc
+
+    @property
+    def status(self) -> GameStatus:
+        """Game status of the current state, without rebuilding the model."""
+        return _STATUSES[self.meta >> 2 & 0x03]
+
+    def to_game_state(self) -> GameState:
+        """Rebuild the current state of the stream as a GameState model."""
+        if self.seq is None:
+            raise FrameCodecError("Stream has no state yet")
+        return GameState(
+            snake=Snake(
+                body=[_position(cell) for cell in self.body],
+                direction=_DIRECTIONS[self.meta & 0x03]
+            ),
+            food=_position(self.food),
+            score=self.score,
+            status=self.status,
+            mode=_MODES[self.meta >> 4 & 0x03]
+        )
+
+    def _set(self, seq: int, meta: int, score: int, food: int, body):
+        self.seq = seq
+        self.meta = meta
+        self.score = score
+        self.food = food
+        self.body = deque(body)
+        self._since_keyframe = 0
+
+    def _diff(self, seq: int, meta: int, score: int, food: int, cells: List[int]) -> Optional[bytes]:
+        """Build a delta turning the current body into `cells`, if one exists."""
+        previous = self.body
+        if not previous or not cells:
+            return None
+        for heads in range(min(len(cells) - 1, MAX_HEAD_CELLS) + 1):
+            kept = len(cells) - heads
+            dropped = len(previous) - kept
+            if dropped < 0 or dropped > MAX_DROPPED_CELLS:
+                continue
+            if cells[heads] != previous[0] or cells[-1] != previous[kept - 1]:
+                continue
+            if list(islice(previous, kept)) != cells[heads:]:
+                continue
+            return self._build_delta(seq, meta, cells[:heads], dropped, score, food)
+        return None
+
+    def _build_delta(self, seq: int, meta: int, heads: Sequence[int], dropped: int,
+                     score: int, food: int) -> bytes:
+        if len(heads) == 1 and score == self.score and food == self.food:
+            # Fast path for the common tick: one new head, nothing else changed
+            return _SIMPLE_DELTA.pack(DELTA, seq, meta, 1, dropped, heads[0])
+        flags = len(heads)
+        tail = b""
+        if score != self.score:
+            flags |= _SCORE_CHANGED
+            tail += _SCORE.pack(score)
+        if food != self.food:
+            flags |= _FOOD_CHANGED
+            tail += _CELL.pack(food)
+        return _DELTA_HEADER.pack(DELTA, seq, meta, flags, dropped) + struct.pack(
+            f">{len(heads)}H", *heads
+        ) + tail
+
+    def _apply_delta(self, frame: bytes):
+        if self.seq is None:
+            raise FrameCodecError("Delta received before any keyframe")
+        _, seq, meta, flags, dropped = _DELTA_HEADER.unpack_from(frame)
+        if seq != (self.seq + 1) & 0xFFFF:
+            raise FrameCodecError(f"Expected frame {(self.seq + 1) & 0xFFFF}, got {seq}")
+        self._check_meta(meta)
+
+        heads = flags & 0x0F
+        offset = _DELTA_HEADER.size
+        new_heads = struct.unpack_from(f">{heads}H", frame, offset)
+        offset += 2 * heads
+        score = self.score
+        if flags & _SCORE_CHANGED:
+            score, = _SCORE.unpack_from(frame, offset)
+            offset += _SCORE.size
+        food = self.food
+        if flags & _FOOD_CHANGED:
+            food, = _CELL.unpack_from(frame, offset)
+            offset += _CELL.size
+        if offset != len(frame):
+            raise FrameCodecError("Delta length mismatch")
+        if dropped > len(self.body) or heads + len(self.body) - dropped < 1:
+            raise FrameCodecError("Delta does not apply to the current body")
+
+        for _ in range(dropped):
+            self.body.pop()
+        self.body.extendleft(reversed(new_heads))
+        self.seq = seq
+        self.meta = meta
+        self.score = score
+        self.food = food
+        self._since_keyframe += 1
+
+    @staticmethod
+    def _check_meta(meta: int):
+        if meta >> 4 >= len(_MODES):
+            raise FrameCodecError(f"Invalid frame metadata: {meta:#04x}")
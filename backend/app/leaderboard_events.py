@@ -0,0 +1,177 @@
+"""
+Leaderboard changes shared between workers over the message bus.
+
+Recording a score updates this worker's ranked index and response cache,
+then publishes the entry so every other worker adds it to its index and
+drops its cached responses too. When the write-behind writer commits a
+batch, the other workers are told to drop their cached responses again,
+since the per-player best scores they read from the table have changed.
+Scores the writer gave up on are taken out of every worker's index again.
+After a bulk import they rebuild their ranked index from the table in a
+worker thread, and the old index keeps serving reads until the new one is
+ready.
+"""
+import asyncio
+import json
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .bus import MessageBus, message_bus
+from .db_config import SessionLocal
+from .leaderboard_index import leaderboard_index, make_index_item
+from .models import LeaderboardEntry
+from .response_cache import leaderboard_cache
+
+
+SCORE_SUBMITTED = "score-submitted"
+SCORES_WRITTEN = "scores-written"
+SCORES_DROPPED = "scores-dropped"
+LEADERBOARD_RELOADED = "leaderboard-reloaded"
+
+
+def score_recorded(entry: LeaderboardEntry, created_at: Optional[datetime]):
+    """Rank a new entry in this worker and announce it to the others."""
+    leaderboard_index.add(entry, created_at)
+    leaderboard_cache.invalidate()
+    message_bus.publish(SCORE_SUBMITTED, encode_score(entry, created_at))
+
+
+def encode_score(entry: LeaderboardEntry, created_at: Optional[datetime]) -> bytes:
+    return json.dumps({
+        "entry": entry.model_dump(mode="json"),
+        "createdAt": created_at.isoformat() if created_at else None,
+    }).encode()
+
+
+def scores_written():
+    """Tell the other workers that queued scores reached the database."""
+    message_bus.publish(SCORES_WRITTEN, b"")
+
+
+def scores_dropped(entries: List[Tuple[LeaderboardEntry, Optional[datetime]]]):
+    """Unrank acknowledged entries that were never written, here and in the other workers."""
+    leaderboard_index.remove(make_index_item(entry, created_at) for entry, created_at in entries)
+    leaderboard_cache.invalidate()
+    message_bus.publish(SCORES_DROPPED, b"[" + b",".join(
+        encode_score(entry, created_at) for entry, created_at in entries
+    ) + b"]")
+
+
+def leaderboard_reloaded():
+    """Tell the other workers that the table changed in bulk."""
+    message_bus.publish(LEADERBOARD_RELOADED, b"")
+
+
+async def announce_reload() -> int:
+    """
+    Tell the running workers about a bulk change made by a process that
+    does not serve the API, such as the command-line import.
+
+    Returns how many workers were told; with none, they keep serving their
+    old index until they restart.
+    """
+    await message_bus.start()
+    try:
+        dropped = message_bus.dropped
+        leaderboard_reloaded()
+        return message_bus.peer_count() - (message_bus.dropped - dropped)
+    finally:
+        await message_bus.stop()
+
+
+def decode_score(message: dict) -> Tuple[LeaderboardEntry, Optional[datetime]]:
+    created_at = message["createdAt"]
+    return (
+        LeaderboardEntry.model_validate(message["entry"]),
+        datetime.fromisoformat(created_at) if created_at else None
+    )
+
+
+def receive_score(payload: bytes):
+    leaderboard_index.add(*decode_score(json.loads(payload)))
+    leaderboard_cache.invalidate()
+
+
+def receive_scores_dropped(payload: bytes):
+    leaderboard_index.remove(make_index_item(*decode_score(message)) for message in json.loads(payload))
+    leaderboard_cache.invalidate()
+
+
+def receive_scores_written(payload: bytes):
+    leaderboard_cache.invalidate()
+
+
+def receive_leaderboard_reloaded(payload: bytes):
+    leaderboard_cache.invalidate()
+    # An index that was never loaded reads the table on first use anyway
+    if leaderboard_index.loaded:
+        index_rebuilder.request()
+
+
+class IndexRebuilder:
+    """Rebuilds the ranked index from the table off the event loop, one rebuild at a time."""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self.rebuilds = 0
+        self._task: Optional[asyncio.Task] = None
+        self._again = False
+
+    def request(self):
+        """Start a rebuild, or another one after the current one if it may have read the table too early."""
+        if self._task is not None and not self._task.done():
+            self._again = True
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        except RuntimeError:
+            # No event loop to rebuild in the background from: reload on the next read
+            leaderboard_index.clear()
+
+    async def wait(self):
+        """Wait for the rebuild in progress, if any."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        self._again = True
+        while self._again:
+            self._again = False
+            try:
+                await asyncio.to_thread(self._rebuild)
+            except Exception as e:
+                print(f"Rebuilding the leaderboard index failed, reloading on the next read: {e}")
+                leaderboard_index.clear()
+                return
+
+    def _rebuild(self):
+        from .database import load_leaderboard_index
+        db = self.session_factory()
+        try:
+            load_leaderboard_index(db)
+        finally:
+            db.close()
+        self.rebuilds += 1
+
+
+# Process-wide rebuilder for imports done by other workers
+index_rebuilder = IndexRebuilder()
+
+
+def subscribe(bus: MessageBus = message_bus):
+    """Apply leaderboard changes published by other workers."""
+    bus.subscribe(SCORE_SUBMITTED, receive_score)
+    bus.subscribe(SCORES_WRITTEN, receive_scores_written)
+    bus.subscribe(SCORES_DROPPED, receive_scores_dropped)
+    bus.subscribe(LEADERBOARD_RELOADED, receive_leaderboard_reloaded)
@@ -0,0 +1,334 @@
+"""
+In-memory ranked leaderboard index.
+
+Keeps every leaderboard entry in a sorted container per game mode (plus one
+combined view across modes), so top-N reads and "rank of score X" queries are
+answered from process memory instead of running ORDER BY on the leaderboard
+table for every request.
+
+Pages are read by position or by keyset cursor on (score, created_at, id);
+both are a bisection plus a slice of the sorted container, so a page deep in
+the leaderboard costs the same as the first one.
+
+Daily and weekly leaderboards (UTC, weeks starting Monday) are kept the same
+way in one bucket per window holding only the current day's or week's
+entries. New scores are added to the buckets they fall in, and a bucket is
+dropped wholesale once its window rolls over, so no read ever scans by date.
+"""
+import base64
+import binascii
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import islice
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+from .models import LeaderboardEntry, LeaderboardPage, LeaderboardWindow, GameMode
+
+
+# (-score, created_at timestamp, entry id, entry)
+# Entries sort by score descending, then oldest first, then by id, which keeps
+# the ordering total and stable across reloads.
+IndexItem = Tuple[int, float, str, LeaderboardEntry]
+
+# The sort key of an item, which page cursors encode
+CursorKey = Tuple[int, float, str]
+
+
+def _timestamp(created_at: Optional[datetime]) -> float:
+    """Convert a created_at value to a sortable UTC timestamp."""
+    if created_at is None:
+        return 0.0
+    if created_at.tzinfo is None:
+        # SQLite hands back naive datetimes holding UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+def make_index_item(entry: LeaderboardEntry, created_at: Optional[datetime]) -> IndexItem:
+    """Build the sort key tuple stored in the index for an entry."""
+    return (-entry.score, _timestamp(created_at), entry.id, entry)
+
+
+# Per-mode sorted lists, plus the combined list under None
+ModeLists = Dict[Optional[GameMode], SortedList]
+
+# Windows kept in expiring buckets rather than for all time
+BUCKETED_WINDOWS = (LeaderboardWindow.daily, LeaderboardWindow.weekly)
+
+SECONDS_PER_DAY = 86400
+
+
+def window_bucket(window: LeaderboardWindow, timestamp: float) -> int:
+    """Number of the UTC day or week (from Monday) a timestamp falls in."""
+    day = int(timestamp // SECONDS_PER_DAY)
+    if window == LeaderboardWindow.weekly:
+        # Day 0, 1970-01-01, was a Thursday
+        return (day + 3) // 7
+    return day
+
+
+def _mode_lists(items: Iterable[IndexItem] = ()) -> ModeLists:
+    """Sort items into one list per game mode and one for all modes."""
+    by_mode: Dict[Optional[GameMode], List[IndexItem]] = {mode: [] for mode in GameMode}
+    everything: List[IndexItem] = []
+    for item in items:
+        by_mode[item[3].mode].append(item)
+        everything.append(item)
+
+    lists: ModeLists = {mode: SortedList(mode_items) for mode, mode_items in by_mode.items()}
+    lists[None] = SortedList(everything)
+    return lists
+
+
+def encode_cursor(item: IndexItem) -> str:
+    """Encode an item's sort key as an opaque page cursor."""
+    # JSON writes floats with repr, which round-trips the timestamp exactly
+    raw = json.dumps([-item[0], item[1], item[2]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> CursorKey:
+    """Decode a page cursor, raising ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, timestamp, entry_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not (isinstance(score, int) and isinstance(timestamp, (int, float)) and isinstance(entry_id, str)):
+        raise ValueError("Invalid cursor")
+    return (-score, float(timestamp), entry_id)
+
+
+def _page(items: SortedList, start: int, stop: int) -> LeaderboardPage:
+    """Build the page of items from position `start` up to `stop`."""
+    start = max(start, 0)
+    page = list(items.islice(start, max(start, stop)))
+    total = len(items)
+    return LeaderboardPage(
+        start=start + 1,
+        total=total,
+        entries=[item[3] for item in page],
+        next_cursor=encode_cursor(page[-1]) if page and start + len(page) < total else None
+    )
+
+
+class LeaderboardIndex:
+    """Per-mode sorted leaderboard held in process memory, for all time and per window."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._lock = Lock()
+        self._lists: ModeLists = {}
+        # Current bucket number and its lists for each bucketed window
+        self._buckets: Dict[LeaderboardWindow, Tuple[int, ModeLists]] = {}
+        self.clock = clock
+        self.loaded = False
+        # Loads reading the table right now, and entries added meanwhile
+        self._loads = 0
+        self._added: Dict[str, IndexItem] = {}
+        self.clear()
+
+    def clear(self):
+        """Drop all entries and mark the index as not loaded."""
+        with self._lock:
+            self._lists = _mode_lists()
+            self._buckets = {window: (-1, _mode_lists()) for window in BUCKETED_WINDOWS}
+            self.loaded = False
+
+    @contextmanager
+    def loading(self):
+        """
+        Wrap reading entries from the table and loading them.
+
+        Entries added meanwhile are kept and merged into what is loaded,
+        since the read may have missed them.
+        """
+        with self._lock:
+            self._loads += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._loads -= 1
+                if self._loads == 0:
+                    self._added = {}
+
+    def load(self, items: Iterable[IndexItem]):
+        """
+        Replace the index contents with the given items.
+
+        The current contents keep serving reads until the new ones are
+        built. Entries added during a `loading` block are merged in.
+        """
+        everything = list(items)
+        now = self.clock()
+        lists = _mode_lists(everything)
+        buckets = {}
+        for window in BUCKETED_WINDOWS:
+            bucket = window_bucket(window, now)
+            buckets[window] = (bucket, _mode_lists(
+                item for item in everything if window_bucket(window, item[1]) == bucket
+            ))
+
+        with self._lock:
+            self._lists = lists
+            self._buckets = buckets
+            self.loaded = True
+            for item in self._added.values():
+                self._insert(item)
+
+    def current_bucket(self, window: LeaderboardWindow) -> int:
+        """Number of the day or week a window currently covers, 0 for all time."""
+        if window == LeaderboardWindow.all_time:
+            return 0
+        return window_bucket(window, self.clock())
+
+    def _window_lists(self, window: LeaderboardWindow) -> ModeLists:
+        """Get a window's lists, first expiring its bucket if the window rolled over. Needs the lock."""
+        if window == LeaderboardWindow.all_time:
+            return self._lists
+        bucket = window_bucket(window, self.clock())
+        current, lists = self._buckets[window]
+        if current != bucket:
+            lists = _mode_lists()
+            self._buckets[window] = (bucket, lists)
+        return lists
+
+    def add(self, entry: LeaderboardEntry, created_at: Optional[datetime]):
+        """
+        Insert a newly created entry.
+
+        Until the index has been loaded the entry is only kept for a load
+        in progress; otherwise the initial load picks it up from the
+        database. Ignored if the entry is already in the index, as happens
+        when another worker's score arrives after a load that read it from
+        the database.
+        """
+        item = make_index_item(entry, created_at)
+        with self._lock:
+            if self._loads:
+                self._added[entry.id] = item
+            if self.loaded:
+                self._insert(item)
+
+    def remove(self, items: Iterable[IndexItem]):
+        """Take entries out of the index, wherever they are ranked."""
+        with self._lock:
+            for item in items:
+                self._added.pop(item[2], None)
+                lists = [self._lists]
+                for window in BUCKETED_WINDOWS:
+                    lists.append(self._window_lists(window))
+                for mode_lists in lists:
+                    for mode in (item[3].mode, None):
+                        ranked = mode_lists[mode]
+                        position = ranked.bisect_left(item[:3])
+                        if position < len(ranked) and ranked[position][2] == item[2]:
+                            del ranked[position]
+
+    def _insert(self, item: IndexItem):
+        """Add an item unless its entry is indexed already. Needs the lock."""
+        everything = self._lists[None]
+        position = everything.bisect_left(item[:3])
+        if position < len(everything) and everything[position][2] == item[2]:
+            return
+        mode = item[3].mode
+        self._lists[mode].add(item)
+        self._lists[None].add(item)
+        for window in BUCKETED_WINDOWS:
+            lists = self._window_lists(window)
+            # A score from an earlier day or week has already expired
+            if window_bucket(window, item[1]) == self._buckets[window][0]:
+                lists[mode].add(item)
+                lists[None].add(item)
+
+    def top(
+        self,
+        mode: Optional[GameMode] = None,
+        limit: int = 100,
+        window: LeaderboardWindow = LeaderboardWindow.all_time
+    ) -> List[LeaderboardEntry]:
+        """Get the best `limit` entries, optionally filtered by game mode."""
+        with self._lock:
+            return [item[3] for item in islice(self._window_lists(window)[mode], limit)]
+
+    def rank_of(
+        self,
+        score: int,
+        mode: Optional[GameMode] = None,
+        window: LeaderboardWindow = LeaderboardWindow.all_time
+    ) -> int:
+        """
+        Get the 1-based rank a score would hold on the leaderboard.
+
+        Equal scores share a rank, so this is one plus the number of entries
+        with a strictly higher score.
+        """
+        with self._lock:
+            return self._window_lists(window)[mode].bisect_left((-score,)) + 1
+
+    def page(
+        self,
+        start: int = 0,
+        limit: int = 50,
+        mode: Optional[GameMode] = None,
+        window: LeaderboardWindow = LeaderboardWindow.all_time
+    ) -> LeaderboardPage:
+        """Get `limit` entries starting at 0-based position `start`."""
+        with self._lock:
+            return _page(self._window_lists(window)[mode], start, start + limit)
+
+    def page_after(
+        self,
+        key: CursorKey,
+        limit: int = 50,
+        mode: Optional[GameMode] = None,
+        window: LeaderboardWindow = LeaderboardWindow.all_time
+    ) -> LeaderboardPage:
+        """Get `limit` entries that sort after the cursor key."""
+        score, timestamp, entry_id = key
+        with self._lock:
+            items = self._window_lists(window)[mode]
+            # The smallest key above (score, timestamp, entry_id): any greater
+            # id either extends it or differs by a larger character
+            start = items.bisect_left((score, timestamp, entry_id + "\0"))
+            return _page(items, start, start + limit)
+
+    def around(
+        self,
+        before: int,
+        after: int,
+        position: Optional[int] = None,
+        score: Optional[int] = None,
+        mode: Optional[GameMode] = None,
+        window: LeaderboardWindow = LeaderboardWindow.all_time
+    ) -> LeaderboardPage:
+        """
+        Get the entries around a 0-based position or around a score.
+
+        Returns up to `before` entries ahead of the position and `after`
+        entries from it on. For a score the position is where it would rank,
+        after every strictly higher score.
+        """
+        with self._lock:
+            items = self._window_lists(window)[mode]
+            if position is None:
+                position = items.bisect_left((-score,))
+            return _page(items, position - before, position + after)
+
+    def count(
+        self,
+        mode: Optional[GameMode] = None,
+        window: LeaderboardWindow = LeaderboardWindow.all_time
+    ) -> int:
+        """Get the number of indexed entries, optionally for one game mode."""
+        with self._lock:
+            return len(self._window_lists(window)[mode])
+
+
+# Process-wide index shared by all requests
+leaderboard_index = LeaderboardIndex()
@@ -0,0 +1,407 @@
+"""
+Streaming export and import of the leaderboard table.
+
+History is written as NDJSON (one JSON object per line) or CSV with a
+header row, with the columns id, user_id, username, score, mode and
+created_at (ISO 8601, UTC). Either way memory use does not grow with the
+table:
+
+* Export reads rows through a server-side cursor, EXPORT_BATCH_SIZE at a
+  time, and encodes each batch as one chunk of output.
+* Import parses records as their lines arrive and writes IMPORT_CHUNK_SIZE rows per
+  statement: a multi-row INSERT, or on PostgreSQL with psycopg2 a COPY into
+  a temporary table followed by one INSERT ... SELECT. Rows whose id already
+  exists are skipped, so re-importing a backup is harmless. The whole import
+  is one transaction; afterwards best scores are rebuilt, the ranked index
+  is reloaded and other workers are told to reload theirs.
+
+Run as a module for the command-line version, which streams between files
+(or stdin/stdout) and the configured database. It keeps no ranked index of
+its own, so after an import it only tells the running workers to reload
+theirs, which takes MESSAGE_BUS=unix; otherwise it says to restart them:
+
+    uv run python -m app.leaderboard_io export --format csv --output leaderboard.csv
+    uv run python -m app.leaderboard_io import --format csv leaderboard.csv
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import sys
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Deque, Iterable, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .db_config import DBSession, SessionLocal, migrate_database
+from .db_models import DBLeaderboardEntry
+from .database import load_leaderboard_index, rebuild_best_scores
+from .leaderboard_events import announce_reload, leaderboard_reloaded
+from .models import GameMode
+
+
+FORMATS = ("ndjson", "csv")
+
+COLUMNS = ("id", "user_id", "username", "score", "mode", "created_at")
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Rows fetched from the cursor at a time when exporting
+EXPORT_BATCH_SIZE = 10000
+
+# Rows written per statement when importing
+IMPORT_CHUNK_SIZE = 10000
+
+_table = DBLeaderboardEntry.__table__
+
+
+class LeaderboardImportError(ValueError):
+    """Raised when an imported record cannot be read."""
+
+
+def _isoformat(created_at: Optional[datetime]) -> str:
+    if created_at is None:
+        return ""
+    if created_at.tzinfo is None:
+        # SQLite hands back naive datetimes holding UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.isoformat()
+
+
+def export_statement(mode: Optional[GameMode] = None):
+    """Select the exported columns through a server-side cursor."""
+    statement = select(*(_table.c[column] for column in COLUMNS))
+    if mode:
+        statement = statement.where(_table.c.mode == mode)
+    return statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def header(fmt: str) -> bytes:
+    """What goes before the first row: the CSV header row, or nothing."""
+    return (",".join(COLUMNS) + "\r\n").encode() if fmt == "csv" else b""
+
+
+def encode_rows(rows, fmt: str) -> bytes:
+    """Encode a batch of exported rows as one chunk of output."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(
+            (row.id, row.user_id, row.username, row.score, row.mode.value, _isoformat(row.created_at))
+            for row in rows
+        )
+        return buffer.getvalue().encode()
+    return "".join(
+        json.dumps({
+            "id": row.id,
+            "user_id": row.user_id,
+            "username": row.username,
+            "score": row.score,
+            "mode": row.mode.value,
+            "created_at": _isoformat(row.created_at),
+        }) + "\n"
+        for row in rows
+    ).encode()
+
+
+def export_leaderboard(db: Session, fmt: str, mode: Optional[GameMode] = None) -> Iterator[bytes]:
+    """Stream the leaderboard table as chunks of NDJSON or CSV."""
+    yield header(fmt)
+    for rows in db.execute(export_statement(mode)).partitions():
+        yield encode_rows(rows, fmt)
+
+
+async def export_leaderboard_async(db: DBSession, fmt: str, mode: Optional[GameMode] = None) -> AsyncIterator[bytes]:
+    """Stream the leaderboard table from either kind of session without blocking the event loop."""
+    yield header(fmt)
+    if isinstance(db, AsyncSession):
+        result = await db.stream(export_statement(mode))
+        async for rows in result.partitions():
+            yield encode_rows(rows, fmt)
+        return
+    result = await asyncio.to_thread(db.execute, export_statement(mode))
+    partitions = result.partitions()
+    while True:
+        rows = await asyncio.to_thread(next, partitions, None)
+        if rows is None:
+            break
+        yield encode_rows(rows, fmt)
+
+
+class RecordParser:
+    """
+    Turns lines of NDJSON or CSV into leaderboard rows.
+
+    CSV lines go through one `csv.reader`, fed a line at a time, so a quoted
+    field may span lines. The reader is only asked for a record once the
+    quotes seen so far are balanced, so it never runs out of lines mid-record.
+    """
+
+    def __init__(self, fmt: str):
+        if fmt not in FORMATS:
+            raise LeaderboardImportError(f"Unknown format: {fmt}")
+        self.fmt = fmt
+        self.columns: Optional[List[str]] = None
+        self.line_number = 0
+        self._lines: Deque[str] = deque()
+        self._reader = csv.reader(self._queued_lines())
+        self._in_quotes = False
+
+    def parse(self, line: str) -> Optional[dict]:
+        """Parse one line; returns None for blank lines, the CSV header and lines ending inside a quoted field."""
+        self.line_number += 1
+        try:
+            if self.fmt == "ndjson":
+                if not line.strip():
+                    return None
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            else:
+                values = self._read_csv(line)
+                if values is None:
+                    return None
+                if self.columns is None:
+                    missing = {"user_id", "username", "score", "mode"} - set(values)
+                    if missing:
+                        raise ValueError(f"header is missing {', '.join(sorted(missing))}")
+                    self.columns = values
+                    return None
+                record = dict(zip(self.columns, values))
+            return self._row(record)
+        except KeyError as e:
+            raise LeaderboardImportError(f"Line {self.line_number}: missing {e}") from e
+        except (ValueError, TypeError, csv.Error) as e:
+            raise LeaderboardImportError(f"Line {self.line_number}: {e}") from e
+
+    def finish(self):
+        """Check that the input did not end inside a quoted CSV field."""
+        if self._in_quotes:
+            raise LeaderboardImportError(f"Line {self.line_number}: quoted field never closed")
+
+    def _read_csv(self, line: str) -> Optional[List[str]]:
+        """Feed a line to the CSV reader; returns the values of the record it completes, if any."""
+        if not self._in_quotes and not line.strip():
+            return None
+        self._lines.append(line if line.endswith("\n") else line + "\n")
+        # Escaped quotes come in pairs, so an odd count opens or closes a field
+        if line.count('"') % 2:
+            self._in_quotes = not self._in_quotes
+        if self._in_quotes:
+            return None
+        return next(self._reader)
+
+    def _queued_lines(self) -> Iterator[str]:
+        while True:
+            yield self._lines.popleft()
+
+    @staticmethod
+    def _row(record: dict) -> dict:
+        created_at = record.get("created_at")
+        if created_at:
+            created_at = datetime.fromisoformat(created_at)
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+        else:
+            created_at = datetime.now(timezone.utc)
+        score = int(record["score"])
+        if score < 0:
+            raise ValueError("score must not be negative")
+        user_id, username = str(record["user_id"]), str(record["username"])
+        if not user_id or not username:
+            raise ValueError("user_id and username are required")
+        return {
+            "id": str(record.get("id") or uuid.uuid4()),
+            "user_id": user_id,
+            "username": username,
+            "score": score,
+            "mode": GameMode(record["mode"]),
+            "created_at": created_at,
+        }
+
+
+def _copy_rows(db: Session, rows: List[dict]):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        # COPY bypasses SQLAlchemy, so write the enum's stored form, its name
+        (row["id"], row["user_id"], row["username"], row["score"], row["mode"].name, row["created_at"].isoformat())
+        for row in rows
+    )
+    buffer.seek(0)
+    driver_connection = db.connection().connection.driver_connection
+    with driver_connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS leaderboard_import "
+            "(LIKE leaderboard INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        cursor.copy_expert(
+            f"COPY leaderboard_import ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        cursor.execute(
+            f"INSERT INTO leaderboard ({', '.join(COLUMNS)}) "
+            f"SELECT {', '.join(COLUMNS)} FROM leaderboard_import ON CONFLICT (id) DO NOTHING"
+        )
+        cursor.execute("TRUNCATE leaderboard_import")
+
+
+def insert_rows(db: Session, rows: List[dict]):
+    """Insert a chunk of parsed rows in the caller's transaction, skipping ids that exist."""
+    if not rows:
+        return
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql":
+        if bind.dialect.driver == "psycopg2":
+            _copy_rows(db, rows)
+            return
+        dialect_insert = postgresql.insert
+    else:
+        dialect_insert = sqlite.insert
+    db.execute(dialect_insert(_table).on_conflict_do_nothing(index_elements=["id"]), rows)
+
+
+def finish_import(db: Session):
+    """Bring best scores up to date and commit an import."""
+    rebuild_best_scores(db)
+    db.commit()
+
+
+def reload_leaderboard(db: Session):
+    """Rebuild this worker's ranked index from the table and have the other workers rebuild theirs."""
+    load_leaderboard_index(db)
+    leaderboard_reloaded()
+
+
+def import_leaderboard(
+    db: Session,
+    lines: Iterable[str],
+    fmt: str,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    reload: bool = True
+) -> int:
+    """
+    Import NDJSON or CSV lines into the leaderboard table; returns the number of records read.
+
+    With `reload` the ranked indexes are rebuilt afterwards. A process that
+    does not serve the API has no index worth rebuilding and passes False.
+    """
+    parser = RecordParser(fmt)
+    chunk: List[dict] = []
+    count = 0
+    try:
+        for line in lines:
+            row = parser.parse(line)
+            if row is None:
+                continue
+            chunk.append(row)
+            count += 1
+            if len(chunk) >= chunk_size:
+                insert_rows(db, chunk)
+                chunk = []
+        parser.finish()
+        insert_rows(db, chunk)
+        finish_import(db)
+    except BaseException:
+        db.rollback()
+        raise
+    if reload:
+        reload_leaderboard(db)
+    return count
+
+
+async def _run_blocking(db: DBSession, operation: Callable, *args):
+    # Imports hold the session for a long time, so keep them off the event loop
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(operation, *args)
+    return await asyncio.to_thread(operation, db, *args)
+
+
+async def import_leaderboard_async(
+    db: DBSession,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    chunk_size: int = IMPORT_CHUNK_SIZE
+) -> int:
+    """Import a stream of NDJSON or CSV bytes, such as a request body; returns the number of records read."""
+    parser = RecordParser(fmt)
+    rows: List[dict] = []
+    count = 0
+    pending = b""
+    try:
+        async for data in chunks:
+            *lines, pending = (pending + data).split(b"\n")
+            for line in lines:
+                row = parser.parse(line.decode() + "\n")
+                if row is None:
+                    continue
+                rows.append(row)
+                count += 1
+                if len(rows) >= chunk_size:
+                    await _run_blocking(db, insert_rows, rows)
+                    rows = []
+        row = parser.parse(pending.decode())
+        if row is not None:
+            rows.append(row)
+            count += 1
+        parser.finish()
+        await _run_blocking(db, insert_rows, rows)
+        await _run_blocking(db, finish_import)
+    except BaseException:
+        await _run_blocking(db, Session.rollback)
+        raise
+    await _run_blocking(db, reload_leaderboard)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import leaderboard history as NDJSON or CSV.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write the leaderboard table")
+    export_parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    export_parser.add_argument("--mode", type=GameMode, choices=list(GameMode))
+    export_parser.add_argument("--output", default="-", help="file to write (default: stdout)")
+
+    import_parser = commands.add_parser("import", help="add rows to the leaderboard table")
+    import_parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    import_parser.add_argument("input", nargs="?", default="-", help="file to read (default: stdin)")
+    args = parser.parse_args()
+
+    # Keep stdout for the export itself
+    with contextlib.redirect_stdout(sys.stderr):
+        migrate_database()
+    db = SessionLocal()
+    try:
+        if args.command == "export":
+            output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+            with output:
+                for chunk in export_leaderboard(db, args.format, args.mode):
+                    output.write(chunk)
+        else:
+            source = sys.stdin if args.input == "-" else open(args.input, newline="")
+            with source:
+                count = import_leaderboard(db, source, args.format, reload=False)
+            print(f"Imported {count} records", file=sys.stderr)
+            told = asyncio.run(announce_reload())
+            if told:
+                print(f"Running workers told to rebuild their leaderboard: {told}", file=sys.stderr)
+            else:
+                print(
+                    "No running workers could be told over the message bus; "
+                    "restart the API to rank the imported records",
+                    file=sys.stderr
+                )
+    except LeaderboardImportError as e:
+        sys.exit(f"Import failed, nothing was imported: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+In-process registry of live games and spectator fan-out.
+
+Each live game owns a broadcast channel. A frame is encoded once when the
+player pushes a new state and the same encoded payload is handed to every
+spectator, each through a small bounded queue. Spectators that fall behind
+lose their oldest queued frames instead of slowing down the player or the
+other spectators.
+
+Spectators either receive full GameState JSON documents or the compact binary
+frames from `frame_codec`. A binary spectator that falls behind cannot just
+skip deltas, so its backlog is replaced with a single keyframe instead.
+
+Games hosted by other workers are mirrored from the message bus: each worker
+publishes the start, frames and end of its games, and the others replay them
+into local copies that their own spectators can watch. A mirror that misses
+a frame skips deltas until the stream's next keyframe.
+"""
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from .bus import MessageBus, message_bus
+from .frame_codec import KEYFRAME, FrameCodec, FrameCodecError
+from .models import ActivePlayer, GameState, GameStatus, User
+
+
+# Frames buffered per spectator before the oldest ones are dropped
+SPECTATOR_QUEUE_SIZE = 8
+
+# Seconds without a frame after which a game mirrored from another worker is
+# dropped, in case that worker exited without ending it
+REMOTE_GAME_TIMEOUT = 120
+
+GAME_EVENTS = "game-events"
+
+_GAME_STARTED = b"S"
+_GAME_FRAME = b"F"
+_GAME_ENDED = b"E"
+
+Frame = Union[str, bytes]
+
+
+class Subscription:
+    """A single spectator's view of a broadcast channel."""
+
+    def __init__(self, binary: bool = False, max_queue: int = SPECTATOR_QUEUE_SIZE):
+        self.binary = binary
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def push(self, frame: Optional[Frame]):
+        """Queue a frame, dropping the oldest one if the spectator is behind."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+    def resync(self, keyframe: bytes):
+        """Replace everything still queued with a keyframe."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(keyframe)
+
+    async def get(self) -> Optional[Frame]:
+        """Wait for the next frame. Returns None once the channel is closed."""
+        return await self.queue.get()
+
+
+class BroadcastChannel:
+    """Fan-out of pre-encoded frames to any number of subscribers."""
+
+    def __init__(self, max_queue: int = SPECTATOR_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self.subscribers: Set[Subscription] = set()
+        self.closed = False
+
+    def subscribe(self, binary: bool = False) -> Subscription:
+        subscription = Subscription(binary, self.max_queue)
+        if self.closed:
+            subscription.push(None)
+        else:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def publish(
+        self,
+        frame: bytes,
+        keyframe: Callable[[], bytes],
+        document: Callable[[], str]
+    ):
+        """
+        Send one tick to every subscriber.
+
+        `frame` is the binary frame for the tick. The keyframe and JSON
+        document are only built if some subscriber needs them, and then only
+        once for all of them.
+        """
+        cached_keyframe = None
+        cached_document = None
+        for subscription in self.subscribers:
+            if subscription.binary:
+                if subscription.queue.full():
+                    if cached_keyframe is None:
+                        cached_keyframe = keyframe()
+                    subscription.resync(cached_keyframe)
+                else:
+                    subscription.push(frame)
+            else:
+                if cached_document is None:
+                    cached_document = document()
+                subscription.push(cached_document)
+
+    def send(self, frame: Frame):
+        """Send the same frame to every subscriber, whatever format it asked for."""
+        for subscription in self.subscribers:
+            subscription.push(frame)
+
+    def close(self):
+        """Signal end of stream to all subscribers."""
+        self.closed = True
+        for subscription in self.subscribers:
+            subscription.push(None)
+        self.subscribers.clear()
+
+
+class LiveGame:
+    """A game currently being played and streamed to spectators."""
+
+    def __init__(self, game_id: str, user: User):
+        self.id = game_id
+        self.user = user
+        self.codec = FrameCodec()
+        self.channel = BroadcastChannel()
+        self._raw: Optional[Dict[str, Any]] = None
+        self._state: Optional[GameState] = None
+        self._document: Optional[str] = None
+
+    @property
+    def state(self) -> GameState:
+        """The current state, rebuilt from the frame stream when needed."""
+        if self._state is None:
+            self._state = self.codec.to_game_state()
+        return self._state
+
+    @property
+    def document(self) -> str:
+        """The current state encoded as a JSON document."""
+        if self._document is None:
+            self._document = self.state.model_dump_json()
+        return self._document
+
+    def push_state(self, patch: Dict[str, Any]) -> bytes:
+        """
+        Apply a JSON state update and return the matching binary frame.
+
+        The patch may contain any subset of the GameState fields; missing
+        fields keep their previous values.
+        """
+        if self._raw is None and self.codec.seq is not None:
+            self._raw = self.state.model_dump(mode="json")
+        raw = {**(self._raw or {}), **patch}
+        state = GameState.model_validate(raw)
+        frame = self.codec.encode(state)
+        self._raw = raw
+        self._state = state
+        self._document = None
+        return frame
+
+    def push_move(self, heads: Sequence[int], dropped: int, score: int, food: int, meta: int) -> bytes:
+        """Apply a move made by a server-side engine and return its frame."""
+        frame = self.codec.encode_delta(heads, dropped, score, food, meta)
+        self._raw = None
+        self._state = None
+        self._document = None
+        return frame
+
+    def push_frame(self, frame: bytes) -> bytes:
+        """Apply a binary frame from the player and return it for relaying."""
+        self.codec.decode(frame)
+        self._raw = None
+        self._state = None
+        self._document = None
+        return frame
+
+    def to_active_player(self) -> ActivePlayer:
+        return ActivePlayer(
+            id=self.id,
+            username=self.user.username,
+            score=self.state.score,
+            mode=self.state.mode,
+            gameState=self.state
+        )
+
+
+class GameRegistry:
+    """All live games hosted by this process, plus mirrors of other workers' games."""
+
+    def __init__(self, bus: MessageBus = message_bus, clock: Callable[[], float] = time.monotonic):
+        self.bus = bus
+        self.clock = clock
+        self.games: Dict[str, LiveGame] = {}
+        # Game ID -> (mirrored game, time of its last frame)
+        self.remote: Dict[str, Tuple[LiveGame, float]] = {}
+
+    def start(self, user: User, message: Union[Dict[str, Any], bytes]) -> LiveGame:
+        """
+        Register a new live game from the player's first message.
+
+        The message must describe the whole state: a full GameState document
+        or a binary keyframe.
+        """
+        game = LiveGame(str(uuid.uuid4()), user)
+        if isinstance(message, bytes):
+            if message[:1] != bytes([KEYFRAME]):
+                raise FrameCodecError("A game must start with a keyframe")
+            game.push_frame(message)
+        else:
+            game.push_state(message)
+        self.games[game.id] = game
+        user = json.dumps(game.user.model_dump()).encode()
+        self._publish(_GAME_STARTED, game, user + b"\n" + game.codec.keyframe())
+        return game
+
+    def update(self, game: LiveGame, message: Union[Dict[str, Any], bytes]) -> GameStatus:
+        """Apply a state update pushed by the player and broadcast it."""
+        if isinstance(message, bytes):
+            frame = game.push_frame(message)
+        else:
+            frame = game.push_state(message)
+        self.broadcast(game, frame)
+        return game.codec.status
+
+    def broadcast(self, game: LiveGame, frame: bytes):
+        """Send a frame the game has already applied to its spectators and the other workers."""
+        game.channel.publish(frame, game.codec.keyframe, lambda: game.document)
+        self._publish(_GAME_FRAME, game, frame)
+
+    def end(self, game: LiveGame):
+        """Remove a finished game and disconnect its spectators."""
+        if self.games.pop(game.id, None) is not None:
+            self._publish(_GAME_ENDED, game, b"")
+        game.channel.close()
+
+    def get(self, game_id: str) -> Optional[LiveGame]:
+        game = self.games.get(game_id)
+        if game is None:
+            self._expire_remote()
+            remote = self.remote.get(game_id)
+            if remote is not None:
+                game = remote[0]
+        return game
+
+    def active_players(self) -> List[ActivePlayer]:
+        self._expire_remote()
+        games = list(self.games.values()) + [game for game, _ in self.remote.values()]
+        return [game.to_active_player() for game in games]
+
+    def clear(self):
+        for game in list(self.games.values()):
+            self.end(game)
+        for game, _ in self.remote.values():
+            game.channel.close()
+        self.remote.clear()
+
+    def _publish(self, event: bytes, game: LiveGame, body: bytes):
+        self.bus.publish(GAME_EVENTS, event + game.id.encode() + b"\n" + body)
+
+    def receive(self, payload: bytes):
+        """Apply a game event published by another worker to the local mirrors."""
+        header, _, body = payload.partition(b"\n")
+        event, game_id = header[:1], header[1:].decode()
+        if event == _GAME_STARTED:
+            user, _, keyframe = body.partition(b"\n")
+            game = LiveGame(game_id, User.model_validate_json(user))
+            game.push_frame(keyframe)
+            self.remote[game_id] = (game, self.clock())
+        elif event == _GAME_FRAME:
+            remote = self.remote.get(game_id)
+            if remote is None:
+                return
+            game = remote[0]
+            self.remote[game_id] = (game, self.clock())
+            try:
+                game.push_frame(body)
+            except FrameCodecError:
+                # A frame was lost; wait for the next keyframe
+                return
+            game.channel.publish(body, game.codec.keyframe, lambda: game.document)
+        elif event == _GAME_ENDED:
+            remote = self.remote.pop(game_id, None)
+            if remote is not None:
+                remote[0].channel.close()
+
+    def _expire_remote(self):
+        cutoff = self.clock() - REMOTE_GAME_TIMEOUT
+        for game_id, (game, last_frame) in list(self.remote.items()):
+            if last_frame < cutoff:
+                del self.remote[game_id]
+                game.channel.close()
+
+    def subscribe(self):
+        """Mirror the games other workers publish on the bus."""
+        self.bus.subscribe(GAME_EVENTS, self.receive)
+
+
+# Process-wide registry of live games
+game_registry = GameRegistry()
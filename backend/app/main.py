@@ -1,38 +1,87 @@
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.responses import Response
 from typing import List, Optional
 from contextlib import asynccontextmanager
 from pathlib import Path
+from pydantic import TypeAdapter
 
-from .models import LeaderboardEntry, SubmitScoreRequest, ActivePlayer, GameMode, GameState, Snake, Position, Direction, GameStatus
+from .models import LeaderboardEntry, LeaderboardPage, LeaderboardRank, LeaderboardWindow, User, SubmitReplayRequest, SubmitScoreRequest, GameMode
 from .database import (
-    get_current_user_session,
-    get_leaderboard as db_get_leaderboard,
-    create_leaderboard_entry,
+    create_leaderboard_entry_async,
     db_leaderboard_to_leaderboard,
+    ensure_leaderboard_index_async,
+    get_unique_leaderboard_async,
+    load_leaderboard_index,
     seed_database
 )
-from .db_config import get_db, init_db
+from .arena_loop import arena_manager
+from .bot_scheduler import bot_scheduler
+from .bus import message_bus
+from .leaderboard_events import index_rebuilder, subscribe as subscribe_leaderboard_events
+from .leaderboard_index import decode_cursor, leaderboard_index
+from .live_games import game_registry
+from .matchmaking import matchmaker
+from .metrics import METRICS_ENABLED, MetricsMiddleware, request_metrics, timed
+from .profiling import slow_request_profiler
+from .response_cache import cached_response
+from .rate_limit import admit_request, limit_scores
+from .sessions import require_user
+from .static_files import StaticFrontend
+from .passwords import password_hasher
+from .replay import REQUIRE_SCORE_REPLAY, ReplayError, ReplayUnavailable, replay_verifier
+from .write_behind import WRITE_BEHIND, leaderboard_writer
+from .db_config import PRODUCTION, DBSession, SessionLocal, close_db, get_db, init_db, verify_schema
+from .admin import router as admin_router
+from .arena import router as arena_router
 from .auth import router as auth_router
+from .spectator import router as spectator_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup."""
-    print("Initializing database...")
-    init_db()
+    """Initialize database on startup and close live games and workers on shutdown."""
+    if PRODUCTION:
+        # Migrations run as a deploy step; only make sure they did
+        verify_schema()
+    else:
+        print("Initializing database...")
+        init_db()
     
-    # Seed database with initial data
-    db = next(get_db())
+    db = SessionLocal()
     try:
-        seed_database(db)
+        if not PRODUCTION:
+            # Seed database with initial data
+            seed_database(db)
+        load_leaderboard_index(db)
     finally:
         db.close()
     
     print("Database initialization complete!")
+    if static_dir.exists():
+        static_frontend.load()
+    subscribe_leaderboard_events()
+    game_registry.subscribe()
+    matchmaker.subscribe()
+    await message_bus.start()
+    await bot_scheduler.start()
+    await arena_manager.start()
+    await matchmaker.start()
+    replay_verifier.start()
+    if WRITE_BEHIND:
+        await leaderboard_writer.start()
     yield
+    await bot_scheduler.stop()
+    await matchmaker.stop()
+    await arena_manager.stop()
+    game_registry.clear()
+    await index_rebuilder.stop()
+    replay_verifier.shutdown()
+    password_hasher.shutdown()
+    slow_request_profiler.shutdown()
+    # Write out every acknowledged score before the process exits
+    await leaderboard_writer.stop()
+    await message_bus.stop()
+    await close_db()
 
 
 app = FastAPI(
@@ -42,6 +91,18 @@ app = FastAPI(
 )
 
 app.include_router(auth_router)
+app.include_router(admin_router)
+app.include_router(arena_router)
+app.include_router(spectator_router)
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Request latency histograms, bot, arena and shard stats in the Prometheus text format."""
+        body = request_metrics.expose() + bot_scheduler.expose() + arena_manager.expose() + matchmaker.expose()
+        return Response(body, media_type="text/plain; version=0.0.4")
 
 
 @app.get("/api")
@@ -49,88 +110,178 @@ async def root():
     return {"message": "Welcome to Snake Arena API. Visit /docs for documentation."}
 
 
+# Serializes leaderboard entry lists straight to JSON bytes
+leaderboard_entries_json = TypeAdapter(List[LeaderboardEntry])
+
+
 @app.get("/leaderboard", response_model=List[LeaderboardEntry])
-async def get_leaderboard(mode: Optional[GameMode] = None, db: Session = Depends(get_db)):
-    """Get leaderboard entries, optionally filtered by game mode."""
-    db_entries = db_get_leaderboard(db, mode=mode)
-    return [db_leaderboard_to_leaderboard(entry) for entry in db_entries]
+async def get_leaderboard(
+    request: Request,
+    mode: Optional[GameMode] = None,
+    window: LeaderboardWindow = LeaderboardWindow.all_time,
+    unique: bool = False,
+    db: DBSession = Depends(get_db)
+):
+    """
+    Get leaderboard entries for today, this week or all time, optionally
+    filtered by game mode or limited to each player's best.
+
+    Responses carry an ETag; send it back in If-None-Match to get a 304
+    while the leaderboard is unchanged.
+    """
+    if unique and window != LeaderboardWindow.all_time:
+        raise HTTPException(status_code=400, detail="unique is only available for the all-time leaderboard")
+    await ensure_leaderboard_index_async(db)
+
+    async def build() -> bytes:
+        if unique:
+            entries = await get_unique_leaderboard_async(db, mode)
+        else:
+            entries = leaderboard_index.top(mode, window=window)
+        with timed("encode"):
+            return leaderboard_entries_json.dump_json(entries)
+
+    key = ("top", mode, window, leaderboard_index.current_bucket(window), unique)
+    return await cached_response(request, key, build)
+
+
+@app.get("/leaderboard/rank", response_model=LeaderboardRank)
+async def get_leaderboard_rank(
+    score: int,
+    mode: Optional[GameMode] = None,
+    window: LeaderboardWindow = LeaderboardWindow.all_time,
+    db: DBSession = Depends(get_db)
+):
+    """Get the rank a score would hold on the leaderboard."""
+    await ensure_leaderboard_index_async(db)
+    return LeaderboardRank(
+        score=score,
+        mode=mode,
+        window=window,
+        rank=leaderboard_index.rank_of(score, mode, window),
+        total=leaderboard_index.count(mode, window)
+    )
+
+
+@app.get("/leaderboard/page", response_model=LeaderboardPage)
+async def get_leaderboard_page(
+    request: Request,
+    mode: Optional[GameMode] = None,
+    window: LeaderboardWindow = LeaderboardWindow.all_time,
+    start: int = Query(1, ge=1),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    db: DBSession = Depends(get_db)
+):
+    """
+    Get a page of the leaderboard in rank order.
+
+    Jump to a position with `start` (1-based), or continue from a previous
+    page by passing its `next_cursor`, which takes precedence. Responses
+    carry an ETag like the main leaderboard.
+    """
+    await ensure_leaderboard_index_async(db)
+    if cursor is None:
+        async def build() -> bytes:
+            page = leaderboard_index.page(start - 1, limit, mode, window)
+            with timed("encode"):
+                return page.model_dump_json().encode()
+    else:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        async def build() -> bytes:
+            page = leaderboard_index.page_after(after, limit, mode, window)
+            with timed("encode"):
+                return page.model_dump_json().encode()
+
+    key = ("page", mode, window, leaderboard_index.current_bucket(window), cursor or start, limit)
+    return await cached_response(request, key, build)
+
+
+@app.get("/leaderboard/neighbors", response_model=LeaderboardPage)
+async def get_leaderboard_neighbors(
+    mode: Optional[GameMode] = None,
+    window: LeaderboardWindow = LeaderboardWindow.all_time,
+    rank: Optional[int] = Query(None, ge=1),
+    score: Optional[int] = None,
+    count: int = Query(5, ge=0, le=50),
+    db: DBSession = Depends(get_db)
+):
+    """
+    Get the entries around a leaderboard position or a score.
 
+    With `rank`, returns the entry at that 1-based position and `count`
+    entries on each side. With `score`, returns the `count` entries ranked
+    above it and the `count` entries from where it would rank on.
+    """
+    if (rank is None) == (score is None):
+        raise HTTPException(status_code=400, detail="Give either rank or score")
+    await ensure_leaderboard_index_async(db)
+    if rank is not None:
+        return leaderboard_index.around(count, count + 1, position=rank - 1, mode=mode, window=window)
+    return leaderboard_index.around(count, count, score=score, mode=mode, window=window)
 
-@app.post("/leaderboard")
-async def submit_score(request: SubmitScoreRequest, db: Session = Depends(get_db)):
+
+async def record_score(db: DBSession, user: User, score: int, mode: GameMode) -> LeaderboardEntry:
+    """Store a score directly or, in write-behind mode, queue it."""
+    if leaderboard_writer.running:
+        return await leaderboard_writer.submit(user.id, user.username, score, mode)
+    db_entry = await create_leaderboard_entry_async(
+        db,
+        user_id=user.id,
+        username=user.username,
+        score=score,
+        mode=mode
+    )
+    return db_leaderboard_to_leaderboard(db_entry)
+
+
+@app.post("/leaderboard", dependencies=[Depends(limit_scores), Depends(admit_request)])
+async def submit_score(
+    request: SubmitScoreRequest,
+    current_user: User = Depends(require_user),
+    db: DBSession = Depends(get_db)
+):
     """Submit a score to the leaderboard."""
-    current_user = get_current_user_session()
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not logged in")
+    if REQUIRE_SCORE_REPLAY:
+        raise HTTPException(status_code=403, detail="Scores must be submitted as replays")
     
     # Create leaderboard entry
-    db_entry = create_leaderboard_entry(
-        db,
-        user_id=current_user.id,
-        username=current_user.username,
-        score=request.score,
-        mode=request.mode
-    )
+    entry = await record_score(db, current_user, request.score, request.mode)
+    
+    return {"message": "Score submitted", "entry": entry}
+
+
+@app.post("/leaderboard/replay", dependencies=[Depends(limit_scores), Depends(admit_request)])
+async def submit_replay(
+    request: SubmitReplayRequest,
+    current_user: User = Depends(require_user),
+    db: DBSession = Depends(get_db)
+):
+    """Submit a game replay; the score is recorded only after re-simulating it."""
+    try:
+        score = await replay_verifier.verify(request.mode, request.seed, request.ticks, request.inputs)
+    except ReplayError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ReplayUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    entry = await record_score(db, current_user, score, request.mode)
     
-    return {"message": "Score submitted", "entry": db_leaderboard_to_leaderboard(db_entry)}
-
-
-@app.get("/spectator/active", response_model=List[ActivePlayer])
-async def get_active_players():
-    """Get list of currently active players (mock implementation)."""
-    # Return mock active players
-    # TODO: Implement real-time player tracking
-    return [
-        ActivePlayer(
-            id="1",
-            username="speedrunner",
-            score=120,
-            mode=GameMode.walls,
-            gameState=GameState(
-                snake=Snake(body=[Position(x=10, y=10)], direction=Direction.RIGHT),
-                food=Position(x=15, y=10),
-                score=120,
-                status=GameStatus.playing,
-                mode=GameMode.walls
-            )
-        ),
-        ActivePlayer(
-            id="2",
-            username="snakemaster",
-            score=180,
-            mode=GameMode.pass_through,
-            gameState=GameState(
-                snake=Snake(body=[Position(x=8, y=8)], direction=Direction.UP),
-                food=Position(x=8, y=3),
-                score=180,
-                status=GameStatus.playing,
-                mode=GameMode.pass_through
-            )
-        )
-    ]
-
-
-# Mount static files after all API routes
+    return {"message": "Score verified", "entry": entry}
+
+
+# Serve the frontend after all API routes
 # This ensures API routes take precedence over static file serving
 static_dir = Path(__file__).parent.parent / "static"
+static_frontend = StaticFrontend(static_dir)
 if static_dir.exists():
-    app.mount("/assets", StaticFiles(directory=str(static_dir / "assets")), name="assets")
-    
     # Catch-all route for client-side routing
     # This must be last to avoid catching API routes
     @app.get("/{full_path:path}")
-    async def serve_frontend(full_path: str):
+    async def serve_frontend(request: Request, full_path: str):
         """Serve the frontend application for all non-API routes."""
-        # If the request is for a static file, try to serve it
-        file_path = static_dir / full_path
-        if file_path.is_file():
-            return FileResponse(file_path)
-        
-        # Otherwise, serve index.html for client-side routing
-        index_path = static_dir / "index.html"
-        if index_path.exists():
-            return FileResponse(index_path)
-        
-        # If static files don't exist, return API-only message
-        raise HTTPException(status_code=404, detail="Frontend not built. API only mode.")
-
+        return static_frontend.response(request, full_path)
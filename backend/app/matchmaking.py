@@ -0,0 +1,459 @@
+"""
+Matchmaking and sharding of multiplayer arenas across worker processes.
+
+Each worker's `ArenaManager` is one shard. Shards report their arenas and
+load to each other over the message bus every SHARD_REPORT_INTERVAL seconds,
+so any worker can place a player:
+
+* by skill: a player's tier comes from the rank of their best score in the
+  mode (`skill_tier`), and they join an arena of their own tier, or one tier
+  away, with room
+* by load: when no arena has room, a new one is opened on the shard with the
+  fewest snakes among those that are not hot
+
+A player's WebSocket stays on the worker that accepted it. When the arena
+lives on another shard, the connection is routed there over the bus. The
+player's turns go to the owning shard, and the owner sends the arena's states
+to every worker with players or spectators in it. Those workers fan the
+states out to their local subscribers like their own arenas. Routing is by
+arena ID, so it keeps working when an arena moves.
+
+A shard that spends more than ARENA_HOT_LOAD of its tick interval stepping
+arenas is hot. It hands its busiest arena to the coolest shard: the arena is
+snapshotted, the other shard adopts it, and from then on its local players and
+spectators are routed there. Turns sent during the handoff may be lost, as
+may anything else on the best-effort bus.
+
+With a single worker (`MESSAGE_BUS=local`) every placement is local.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .arena_engine import Arena, ArenaSnake
+from .arena_loop import ArenaManager, arena_manager, choose_arena
+from .bus import MessageBus, message_bus
+from .live_games import BroadcastChannel
+from .models import ArenaSummary, Direction, GameMode, User
+
+
+# Seconds between a shard's reports of its arenas and load
+SHARD_REPORT_INTERVAL = float(os.getenv("SHARD_REPORT_INTERVAL", "1.0"))
+
+# Share of the tick interval a shard may spend stepping arenas before it hands arenas off
+ARENA_HOT_LOAD = float(os.getenv("ARENA_HOT_LOAD", "0.5"))
+
+# Reports a shard may miss before the others forget it
+SHARD_TIMEOUT_REPORTS = 3
+
+# Seconds a player waits for another shard to seat them before playing here instead
+JOIN_TIMEOUT = 2.0
+
+# Skill tiers, from 0 for the best players
+SKILL_TIERS = 4
+
+ARENA_EVENTS = "arena-events"
+
+_REPORT = b"L"
+_JOIN = b"J"
+_JOINED = b"A"
+_TURN = b"T"
+_LEAVE = b"X"
+_WATCH = b"W"
+_STATE = b"S"
+_DIED = b"D"
+_CLOSED = b"C"
+_MIGRATE = b"M"
+
+
+def skill_tier(rank: Optional[int], total: int) -> int:
+    """Tier of a player whose best score ranks `rank` of `total`: quarters from the top, unranked last."""
+    if rank is None or total <= 0:
+        return SKILL_TIERS - 1
+    return min(SKILL_TIERS - 1, (rank - 1) * SKILL_TIERS // total)
+
+
+class ShardReport(NamedTuple):
+    load: float
+    arenas: List[ArenaSummary]
+    # Arenas hosted elsewhere that the shard has players or spectators in
+    watching: List[str]
+    received: float
+
+
+class Seat:
+    """A player's snake, seen from the worker holding their WebSocket."""
+
+    __slots__ = ("arena_id", "snake_id", "channel", "alive", "document")
+
+    def __init__(self, arena_id: str, snake_id: str, channel: BroadcastChannel, document: str):
+        self.arena_id = arena_id
+        self.snake_id = snake_id
+        # Local arena's channel, or the feed of states from the owning shard
+        self.channel = channel
+        self.alive = True
+        # The arena's state when the player joined
+        self.document = document
+
+
+class Matchmaker:
+    """Places players in arenas across shards and routes their games to the owning shard."""
+
+    def __init__(
+        self,
+        manager: ArenaManager = arena_manager,
+        bus: MessageBus = message_bus,
+        interval: float = SHARD_REPORT_INTERVAL,
+        hot_load: float = ARENA_HOT_LOAD,
+        clock=time.monotonic
+    ):
+        self.shard = uuid.uuid4().hex[:12]
+        self.manager = manager
+        self.bus = bus
+        self.interval = interval
+        self.hot_load = hot_load
+        self.clock = clock
+        self.shards: Dict[str, ShardReport] = {}
+        # Arena ID -> states of an arena hosted elsewhere, for local subscribers
+        self.feeds: Dict[str, BroadcastChannel] = {}
+        # Snake ID -> seat, for players connected to this worker
+        self.seats: Dict[str, Seat] = {}
+        # Arena ID -> shard -> when it last said it watches, for arenas hosted here
+        self.watchers: Dict[str, Dict[str, float]] = {}
+        # Snake ID -> (arena, shard holding the WebSocket), for players connected elsewhere
+        self.remote_players: Dict[str, Tuple[Arena, str]] = {}
+        self.migrations = 0
+        self._requests: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        manager.relay = self._relay
+        manager.on_close = self._closed
+
+    def place(self, mode: GameMode, tier: int) -> Tuple[str, Optional[str]]:
+        """Pick the shard and arena for a player; the arena is None when a new one should be opened."""
+        self._expire()
+        loads = {self.shard: self.manager.load}
+        candidates = [(self.shard, arena) for arena in self.manager.summaries()]
+        for shard, report in self.shards.items():
+            loads[shard] = report.load
+            candidates += [(shard, arena) for arena in report.arenas]
+        owners = {arena.id: shard for shard, arena in candidates}
+
+        # Arenas on hot shards only take players when nothing else has room
+        for hot in (False, True):
+            arena = choose_arena(
+                [arena for shard, arena in candidates if (loads[shard] > self.hot_load) == hot], mode, tier
+            )
+            if arena is not None:
+                return owners[arena.id], arena.id
+
+        snakes = dict.fromkeys(loads, 0)
+        for shard, arena in candidates:
+            snakes[shard] += arena.players + arena.bots
+        shard = min(loads, key=lambda shard: (loads[shard] > self.hot_load, snakes[shard], shard != self.shard))
+        return shard, None
+
+    async def join(self, user: User, mode: GameMode, tier: int) -> Seat:
+        """Seat a player in the arena matchmaking picks, on whichever shard hosts it."""
+        shard, arena_id = self.place(mode, tier)
+        if shard != self.shard:
+            seat = await self._join_remote(shard, user, mode, tier, arena_id)
+            if seat is not None:
+                return seat
+        arena, snake = self.manager.join(user, mode, tier, arena_id)
+        seat = Seat(arena.id, snake.id, self.manager.channels[arena.id], arena.document())
+        self.seats[snake.id] = seat
+        return seat
+
+    def steer(self, seat: Seat, direction: Direction):
+        """Send a player's turn to the arena, here or on its shard."""
+        arena = self.manager.get(seat.arena_id)
+        if arena is None:
+            self._send(_TURN, {"arena": seat.arena_id, "snake": seat.snake_id, "direction": direction.value})
+            return
+        snake = arena.snakes.get(seat.snake_id)
+        if snake is not None:
+            arena.steer(snake, direction)
+
+    def leave(self, seat: Seat):
+        """Take a player's snake out of its arena, here or on its shard."""
+        self.seats.pop(seat.snake_id, None)
+        arena = self.manager.get(seat.arena_id)
+        if arena is None:
+            self._send(_LEAVE, {"arena": seat.arena_id, "snake": seat.snake_id})
+        else:
+            snake = arena.snakes.get(seat.snake_id)
+            if snake is not None:
+                self.manager.leave(arena, snake)
+        self.unwatch(seat.arena_id)
+
+    def watch(self, arena_id: str) -> Optional[Tuple[BroadcastChannel, Optional[str]]]:
+        """The channel of an arena's states and, if hosted here, its current state."""
+        arena = self.manager.get(arena_id)
+        if arena is not None:
+            return self.manager.channels[arena_id], arena.document()
+        if arena_id in self.feeds or any(
+            arena.id == arena_id for report in self.shards.values() for arena in report.arenas
+        ):
+            return self._feed(arena_id), None
+        return None
+
+    def unwatch(self, arena_id: str):
+        """Stop receiving an arena's states from its shard once nobody here follows it."""
+        feed = self.feeds.get(arena_id)
+        if feed is None or feed.subscribers:
+            return
+        if not any(seat.arena_id == arena_id for seat in self.seats.values()):
+            del self.feeds[arena_id]
+
+    def summaries(self) -> List[ArenaSummary]:
+        """Arenas on every shard."""
+        self._expire()
+        arenas = self.manager.summaries()
+        for report in self.shards.values():
+            arenas += report.arenas
+        return arenas
+
+    def report(self):
+        """Send this shard's arenas and load to the others, then rebalance if this shard is hot."""
+        self._expire()
+        self._send(_REPORT, {
+            "shard": self.shard,
+            "load": self.manager.load,
+            "arenas": [arena.model_dump(mode="json") for arena in self.manager.summaries()],
+            "watching": list(self.feeds),
+        })
+        self.rebalance()
+
+    def rebalance(self) -> Optional[str]:
+        """Hand the busiest arena to the coolest shard if this one is hot; returns that shard."""
+        if self.manager.load <= self.hot_load or len(self.manager.arenas) < 2 or not self.shards:
+            return None
+        shard, report = min(self.shards.items(), key=lambda item: item[1].load)
+        if report.load >= self.hot_load / 2:
+            return None
+        arena = max(self.manager.arenas.values(), key=lambda arena: len(arena.snakes))
+        snakes = sum(len(hosted.snakes) for hosted in self.manager.arenas.values())
+        self.migrate(arena, shard)
+        # Don't wait for the moving average to notice before deciding again
+        self.manager.load *= 1 - len(arena.snakes) / snakes
+        return shard
+
+    def migrate(self, arena: Arena, shard: str):
+        """Hand an arena over to another shard, routing its local players and spectators there."""
+        fronts = {
+            snake_id: front for snake_id, (owner, front) in self.remote_players.items() if owner is arena
+        }
+        for seat in self.seats.values():
+            if seat.arena_id == arena.id:
+                fronts[seat.snake_id] = self.shard
+        for snake_id in fronts:
+            self.remote_players.pop(snake_id, None)
+        watchers = list(self.watchers.pop(arena.id, {}))
+        channel = self.manager.release(arena)
+        if channel.subscribers or self.shard in fronts.values():
+            self.feeds[arena.id] = channel
+            watchers.append(self.shard)
+        self._send(_MIGRATE, {"to": shard, "arena": arena.snapshot(), "fronts": fronts, "watchers": watchers})
+        self.migrations += 1
+
+    def receive(self, payload: bytes):
+        """Apply an arena event published by another shard."""
+        event, body = payload[:1], payload[1:]
+        if event == _STATE:
+            arena_id, _, document = body.partition(b"\n")
+            feed = self.feeds.get(arena_id.decode())
+            if feed is not None:
+                feed.send(document.decode())
+            return
+
+        message = json.loads(body)
+        if event == _REPORT:
+            shard = message["shard"]
+            self.shards[shard] = ShardReport(
+                message["load"],
+                [ArenaSummary.model_validate(arena) for arena in message["arenas"]],
+                message["watching"],
+                self.clock()
+            )
+            for arena_id in message["watching"]:
+                self._watched_by(arena_id, shard)
+        elif event == _JOIN:
+            if message["to"] == self.shard:
+                self._seat_remote(message)
+        elif event == _JOINED:
+            future = self._requests.get(message["request"])
+            if future is not None and not future.done():
+                future.set_result(message)
+        elif event == _TURN:
+            arena = self.manager.get(message["arena"])
+            snake = arena.snakes.get(message["snake"]) if arena else None
+            if snake is not None:
+                arena.steer(snake, Direction(message["direction"]))
+        elif event == _LEAVE:
+            self.remote_players.pop(message["snake"], None)
+            arena = self.manager.get(message["arena"])
+            snake = arena.snakes.get(message["snake"]) if arena else None
+            if snake is not None:
+                self.manager.leave(arena, snake)
+        elif event == _WATCH:
+            self._watched_by(message["arena"], message["shard"])
+        elif event == _DIED:
+            for snake_id in message["snakes"]:
+                seat = self.seats.get(snake_id)
+                if seat is not None:
+                    seat.alive = False
+        elif event == _CLOSED:
+            feed = self.feeds.pop(message["arena"], None)
+            if feed is not None:
+                feed.close()
+        elif event == _MIGRATE:
+            if message["to"] == self.shard:
+                self._adopt(message)
+
+    def subscribe(self):
+        """Receive the arena events other shards publish on the bus."""
+        self.bus.subscribe(ARENA_EVENTS, self.receive)
+
+    async def start(self):
+        """Start reporting to the other shards on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def expose(self) -> str:
+        """Shard gauges in the Prometheus text format."""
+        lines = [
+            "# HELP arena_shards Workers hosting arenas, this one included.",
+            "# TYPE arena_shards gauge",
+            f"arena_shards {len(self.shards) + 1}",
+            "# HELP arena_load Moving average share of the arena tick interval this worker spends stepping arenas.",
+            "# TYPE arena_load gauge",
+            f"arena_load {self.manager.load}",
+            "# HELP arena_remote_players Players in this worker's arenas connected through other workers.",
+            "# TYPE arena_remote_players gauge",
+            f"arena_remote_players {len(self.remote_players)}",
+            "# HELP arena_migrations_total Arenas this worker handed to other workers.",
+            "# TYPE arena_migrations_total counter",
+            f"arena_migrations_total {self.migrations}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    async def _run(self):
+        while True:
+            self.report()
+            await asyncio.sleep(self.interval)
+
+    async def _join_remote(
+        self, shard: str, user: User, mode: GameMode, tier: int, arena_id: Optional[str]
+    ) -> Optional[Seat]:
+        request = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request] = future
+        try:
+            self._send(_JOIN, {
+                "request": request, "to": shard, "from": self.shard, "arena": arena_id,
+                "mode": mode.value, "tier": tier, "user": user.model_dump(),
+            })
+            answer = await asyncio.wait_for(future, JOIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            # The shard is gone or the request was lost
+            return None
+        finally:
+            self._requests.pop(request, None)
+        seat = Seat(answer["arena"], answer["snake"], self._feed(answer["arena"]), answer["document"])
+        self.seats[seat.snake_id] = seat
+        return seat
+
+    def _seat_remote(self, message: dict):
+        front = message["from"]
+        arena, snake = self.manager.join(
+            User.model_validate(message["user"]), GameMode(message["mode"]), message["tier"], message["arena"]
+        )
+        self.remote_players[snake.id] = (arena, front)
+        self._watched_by(arena.id, front)
+        self._send(_JOINED, {
+            "request": message["request"], "arena": arena.id, "snake": snake.id, "document": arena.document(),
+        })
+
+    def _adopt(self, message: dict):
+        arena = Arena.restore(message["arena"])
+        self.manager.adopt(arena, self.feeds.pop(arena.id, None))
+        for snake_id, front in message["fronts"].items():
+            if front != self.shard:
+                self.remote_players[snake_id] = (arena, front)
+        for shard in message["watchers"]:
+            if shard != self.shard:
+                self._watched_by(arena.id, shard)
+
+    def _feed(self, arena_id: str) -> BroadcastChannel:
+        feed = self.feeds.get(arena_id)
+        if feed is None:
+            feed = self.feeds[arena_id] = BroadcastChannel()
+            self._send(_WATCH, {"arena": arena_id, "shard": self.shard})
+        return feed
+
+    def _watched_by(self, arena_id: str, shard: str):
+        if arena_id in self.manager.arenas:
+            self.watchers.setdefault(arena_id, {})[shard] = self.clock()
+            self.manager.relayed.add(arena_id)
+
+    def _relay(self, arena: Arena, document: Optional[str], died: List[ArenaSnake]):
+        for snake in died:
+            seat = self.seats.get(snake.id)
+            if seat is not None:
+                seat.alive = False
+        if arena.id not in self.watchers:
+            return
+        if document is not None:
+            self.bus.publish(ARENA_EVENTS, _STATE + arena.id.encode() + b"\n" + document.encode())
+        dead = [snake.id for snake in died if snake.id in self.remote_players]
+        if dead:
+            self._send(_DIED, {"arena": arena.id, "snakes": dead})
+
+    def _closed(self, arena: Arena):
+        if self.watchers.pop(arena.id, None):
+            self._send(_CLOSED, {"arena": arena.id})
+        for snake_id, (owner, _) in list(self.remote_players.items()):
+            if owner is arena:
+                del self.remote_players[snake_id]
+
+    def _expire(self):
+        cutoff = self.clock() - self.interval * SHARD_TIMEOUT_REPORTS
+        for shard, report in list(self.shards.items()):
+            if report.received < cutoff:
+                del self.shards[shard]
+        for arena_id, shards in list(self.watchers.items()):
+            for shard, seen in list(shards.items()):
+                if seen < cutoff:
+                    del shards[shard]
+                    self._drop_players(arena_id, shard)
+            if not shards:
+                self.watchers.pop(arena_id, None)
+                self.manager.relayed.discard(arena_id)
+
+    def _drop_players(self, arena_id: str, front: str):
+        """Remove the players a shard that went quiet had in an arena."""
+        for snake_id, (arena, shard) in list(self.remote_players.items()):
+            if arena.id == arena_id and shard == front:
+                del self.remote_players[snake_id]
+                snake = arena.snakes.get(snake_id)
+                if snake is not None and self.manager.get(arena_id) is arena:
+                    self.manager.leave(arena, snake)
+
+    def _send(self, event: bytes, message: dict):
+        self.bus.publish(ARENA_EVENTS, event + json.dumps(message, separators=(",", ":")).encode())
+
+
+# Process-wide matchmaker for this worker's shard
+matchmaker = Matchmaker()
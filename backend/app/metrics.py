@@ -0,0 +1,209 @@
+"""
+Request latency metrics in the Prometheus text format.
+
+`MetricsMiddleware` times every HTTP request and records it in a histogram
+labelled by method, route template and status. Within a request it also
+adds up the time spent in three phases:
+
+* `db` - SQL statements, timed by cursor execution events on every engine
+  (the sync engine, the async engine underneath, and any test engine)
+* `convert` - turning database rows into Pydantic models
+* `encode` - serializing leaderboard responses to JSON
+
+Each phase total goes into a second histogram, so `/metrics` shows where a
+route's time goes; what is left is routing, validation and handler code.
+The phase totals live in a context variable, which follows the request into
+worker threads and `run_sync` calls.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Engine, event
+
+from .profiling import slow_request_profiler
+
+
+# Record request metrics and serve them at /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PHASES = ("db", "convert", "encode")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+class Histogram:
+    """A Prometheus histogram with one series per label set."""
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._lock = Lock()
+        # Labels -> (count per bucket, sum, count)
+        self._series: Dict[Labels, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total, count = self._series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._series[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return series[2] if series else 0
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, (counts, total, count) in series:
+            formatted = _format_labels(labels)
+            # Bucket labels follow the series labels, if there are any
+            prefix = f"{formatted}," if formatted else ""
+            selector = f"{{{formatted}}}" if formatted else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{selector} {total}")
+            lines.append(f"{self.name}_count{selector} {count}")
+        return lines
+
+
+class RequestMetrics:
+    """Latency histograms for requests and their phases."""
+
+    def __init__(self):
+        self.requests = Histogram(
+            "http_request_duration_seconds",
+            "Time to handle an HTTP request, by method, route and status."
+        )
+        self.phases = Histogram(
+            "http_request_phase_seconds",
+            "Time an HTTP request spent in SQL statements (db), building models (convert) and serializing (encode)."
+        )
+
+    def expose(self) -> str:
+        return "\n".join(self.requests.expose() + self.phases.expose()) + "\n"
+
+
+# Process-wide metrics served at /metrics
+request_metrics = RequestMetrics()
+
+
+class RequestTimings:
+    """Seconds one request has spent in each phase so far."""
+
+    __slots__ = PHASES
+
+    def __init__(self):
+        self.db = 0.0
+        self.convert = 0.0
+        self.encode = 0.0
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(phase: str):
+    """Add the time spent in the block to a phase of the current request."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, phase, getattr(timings, phase) + time.perf_counter() - start)
+
+
+def timed_function(phase: str) -> Callable[[Callable], Callable]:
+    """Decorator adding a function's running time to a phase of the current request."""
+    def decorate(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            timings = _current_timings.get()
+            if timings is None:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                setattr(timings, phase, getattr(timings, phase) + time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current_timings.get()
+    start = getattr(context, "_metrics_start", None)
+    if timings is not None and start is not None:
+        timings.db += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording each HTTP request's latency and phase breakdown."""
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        profile = slow_request_profiler.begin()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            _current_timings.reset(token)
+            # The route template, so every game or user ID shares one series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            self.metrics.requests.observe(duration, method=method, route=route, status=str(status))
+            for phase in PHASES:
+                self.metrics.phases.observe(getattr(timings, phase), route=route, phase=phase)
+            slow_request_profiler.end(profile, duration, f"{method} {route}")
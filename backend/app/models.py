@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from enum import Enum
 
 # Enums
@@ -13,6 +13,11 @@ class GameStatus(str, Enum):
     paused = "paused"
     game_over = "game-over"
 
+class LeaderboardWindow(str, Enum):
+    all_time = "all-time"
+    daily = "daily"
+    weekly = "weekly"
+
 class Direction(str, Enum):
     UP = "UP"
     DOWN = "DOWN"
@@ -25,6 +30,10 @@ class User(BaseModel):
     username: str
     email: str
 
+class UserSession(User):
+    # Signed session token, also set as the session cookie
+    token: str
+
 class LoginRequest(BaseModel):
     email: str
     password: str
@@ -41,10 +50,32 @@ class LeaderboardEntry(BaseModel):
     mode: GameMode
     date: str
 
+class LeaderboardRank(BaseModel):
+    score: int
+    mode: Optional[GameMode] = None
+    window: LeaderboardWindow = LeaderboardWindow.all_time
+    rank: int
+    total: int
+
+class LeaderboardPage(BaseModel):
+    # 1-based position of the first entry in leaderboard order
+    start: int
+    total: int
+    entries: List[LeaderboardEntry]
+    # Pass back as `cursor` for the entries that follow, if there are any
+    next_cursor: Optional[str] = None
+
 class SubmitScoreRequest(BaseModel):
     score: int
     mode: GameMode
 
+class SubmitReplayRequest(BaseModel):
+    mode: GameMode
+    seed: int
+    ticks: int
+    # Direction changes as [tick, direction] pairs, in tick order
+    inputs: List[Tuple[int, Direction]] = []
+
 class Position(BaseModel):
     x: int
     y: int
@@ -66,3 +97,32 @@ class ActivePlayer(BaseModel):
     score: int
     mode: GameMode
     gameState: GameState
+
+class ArenaSnakeState(BaseModel):
+    id: str
+    username: str
+    body: List[Position]
+    direction: Direction
+    score: int
+    alive: bool
+    bot: bool = False
+
+class ArenaState(BaseModel):
+    id: str
+    mode: GameMode
+    tick: int
+    # Width and height of the arena grid
+    size: int
+    snakes: List[ArenaSnakeState]
+    food: List[Position]
+
+class ArenaSummary(BaseModel):
+    id: str
+    mode: GameMode
+    # Skill tier matchmaking fills the arena from, 0 for the best players
+    tier: int = 0
+    tick: int
+    players: int
+    bots: int
+    # Snakes the arena holds; bots give up their place to players
+    capacity: int
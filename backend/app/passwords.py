@@ -0,0 +1,136 @@
+"""
+Password hashing with scrypt, off the event loop.
+
+Passwords are hashed with salted scrypt, a memory-hard KDF from hashlib,
+stored as `scrypt$<n>$<r>$<p>$<salt>$<hash>`. Accounts created before that
+have a bare SHA-256 hex digest; it is still accepted, and `needs_rehash`
+tells the caller to replace it (or an scrypt hash with outdated cost
+settings) once the password has been checked.
+
+Hashing takes tens of milliseconds by design, so the API runs it in a small
+thread pool: scrypt releases the GIL, so the workers hash in parallel while
+the event loop keeps serving requests, and the pool size bounds how much
+CPU and memory logins can take at once.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+
+# scrypt CPU/memory cost; each hash needs 128 * N * r bytes of memory
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+
+# scrypt block size
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+
+# scrypt parallelization
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+
+# Threads hashing passwords at once
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_SALT_BYTES = 16
+_HASH_BYTES = 32
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        # OpenSSL's default limit of 32 MiB is below what larger costs need
+        maxmem=2 * 128 * n * r * p + 1024 * 1024,
+        dklen=_HASH_BYTES
+    )
+
+
+def hash_password(
+    password: str,
+    n: int = PASSWORD_SCRYPT_N,
+    r: int = PASSWORD_SCRYPT_R,
+    p: int = PASSWORD_SCRYPT_P
+) -> str:
+    """Hash a password with a fresh salt."""
+    salt = secrets.token_bytes(_SALT_BYTES)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def check_password(password: str, stored: str) -> bool:
+    """Check a password against a stored scrypt or legacy SHA-256 hash."""
+    if not stored.startswith("scrypt$"):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored)
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        expected = _b64decode(digest)
+        actual = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+def needs_rehash(
+    stored: str,
+    n: int = PASSWORD_SCRYPT_N,
+    r: int = PASSWORD_SCRYPT_R,
+    p: int = PASSWORD_SCRYPT_P
+) -> bool:
+    """Whether a stored hash is legacy SHA-256 or uses other cost settings."""
+    return not stored.startswith(f"scrypt${n}${r}${p}$")
+
+
+class PasswordHasher:
+    """Runs password hashing in a bounded pool of worker threads."""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS):
+        self.workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._dummy_hash: Optional[str] = None
+
+    def start(self):
+        """Create the worker pool."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def hash(self, password: str) -> str:
+        """Hash a password off the event loop."""
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._pool, hash_password, password)
+
+    async def check(self, password: str, stored: Optional[str]) -> bool:
+        """
+        Check a password off the event loop.
+
+        With no stored hash (an unknown account) a dummy hash is checked
+        instead, so the response time does not reveal which emails exist.
+        """
+        self.start()
+        if stored is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = await self.hash(secrets.token_hex(16))
+            await asyncio.get_running_loop().run_in_executor(
+                self._pool, check_password, "", self._dummy_hash
+            )
+            return False
+        return await asyncio.get_running_loop().run_in_executor(self._pool, check_password, password, stored)
+
+
+# Process-wide hasher used by the API
+password_hasher = PasswordHasher()
@@ -0,0 +1,153 @@
+"""
+Sampling profiler for slow requests.
+
+With PROFILE_SLOW_REQUESTS=true a background thread records the stack of
+every busy thread each PROFILE_INTERVAL_MS while requests are in flight.
+When a request takes longer than PROFILE_THRESHOLD_MS, the stacks sampled
+during it are written to PROFILE_DIR as collapsed stacks, one
+`thread;outer;...;inner count` line per distinct stack, which flamegraph.pl,
+speedscope and similar tools turn into flame graphs.
+
+Requests share the event loop, so a profile also holds whatever else ran
+while the slow request was in flight. Threads waiting on a condition, such
+as idle pool workers, are left out.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+# Sample stacks while requests run and save those of slow requests
+PROFILE_SLOW_REQUESTS = os.getenv("PROFILE_SLOW_REQUESTS", "false").lower() == "true"
+
+# Requests slower than this many milliseconds get a profile
+PROFILE_THRESHOLD_MS = float(os.getenv("PROFILE_THRESHOLD_MS", "500"))
+
+# Milliseconds between samples
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+# Directory the collapsed stack files are written to
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Samples kept, oldest dropped first; bounds how far back a profile reaches
+PROFILE_MAX_SAMPLES = 50000
+
+# (time taken, stack from the thread name down to the innermost frame)
+Sample = Tuple[float, Tuple[str, ...]]
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _waiting(frame) -> bool:
+    return frame.f_code.co_name == "wait" and frame.f_code.co_filename == threading.__file__
+
+
+class SlowRequestProfiler:
+    """Samples thread stacks while requests run and saves them for slow ones."""
+
+    def __init__(
+        self,
+        enabled: bool = PROFILE_SLOW_REQUESTS,
+        threshold_ms: float = PROFILE_THRESHOLD_MS,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        directory: str = PROFILE_DIR,
+        max_samples: int = PROFILE_MAX_SAMPLES
+    ):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.interval_ms = interval_ms
+        self.directory = Path(directory)
+        self.profiles_written = 0
+        self._samples: Deque[Sample] = deque(maxlen=max_samples)
+        self._labels: Dict[object, str] = {}
+        self._lock = threading.Lock()
+        self._active = 0
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def begin(self) -> Optional[float]:
+        """Note that a request started; returns its start time if profiling."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._active += 1
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return time.perf_counter()
+
+    def end(self, started: Optional[float], duration: float, name: str) -> Optional[Path]:
+        """Note that a request finished, saving its profile if it was slow."""
+        if started is None:
+            return None
+        finished = time.perf_counter()
+        with self._lock:
+            self._active -= 1
+        if duration * 1000 < self.threshold_ms:
+            return None
+        stacks = Counter(stack for taken, stack in list(self._samples) if started <= taken <= finished)
+        if not stacks:
+            return None
+        return self._write(name, duration, stacks)
+
+    def sample(self):
+        """Record the stack of every busy thread but this one."""
+        now = time.perf_counter()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own or _waiting(frame):
+                continue
+            frames: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = _frame_label(code)
+                frames.append(label)
+                frame = frame.f_back
+            frames.append(names.get(ident, str(ident)))
+            self._samples.append((now, tuple(reversed(frames))))
+
+    def shutdown(self):
+        """Stop the sampling thread."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopping:
+            if self._active <= 0:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            self.sample()
+            time.sleep(self.interval_ms / 1000)
+
+    def _write(self, name: str, duration: float, stacks: Counter) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_")
+        path = self.directory / f"{int(time.time() * 1000)}-{slug}-{duration * 1000:.0f}ms.folded"
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        self.profiles_written += 1
+        return path
+
+
+# Process-wide profiler used by the metrics middleware
+slow_request_profiler = SlowRequestProfiler()
@@ -0,0 +1,168 @@
+"""
+Per-client rate limiting and admission control.
+
+Score submissions are limited per user and login/signup per client IP with
+token buckets: each key may burst up to a limit's capacity and then earns
+tokens back at capacity/period per second. A request without a token is
+answered 429 with Retry-After.
+
+Buckets live in a `BucketStore`. `MemoryBucketStore` keeps them in this
+process; with several workers or replicas, assign `rate_limiter.store` a
+store backed by shared storage so all of them draw from the same buckets.
+
+Separately, `admit_request` caps how many score, replay and auth requests
+run at once. Past the cap requests are shed with 503 straight away instead
+of queueing for a connection from the database pool (5 + 10 overflow on
+PostgreSQL) or a password hashing worker.
+"""
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict, NamedTuple, Tuple
+
+from fastapi import Depends, HTTPException, Request
+
+from .models import User
+from .sessions import require_user
+
+
+class RateLimit(NamedTuple):
+    """At most `capacity` requests at once, refilled over `period` seconds."""
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+
+def parse_rate_limit(value: str) -> RateLimit:
+    """Parse a limit written as "<requests>/<seconds>", such as "30/60"."""
+    capacity, _, period = value.partition("/")
+    return RateLimit(int(capacity), float(period))
+
+
+# Enforce the rate limits below
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+# Score and replay submissions per user
+SCORE_RATE_LIMIT = parse_rate_limit(os.getenv("SCORE_RATE_LIMIT", "30/60"))
+
+# Login and signup attempts per client IP
+AUTH_RATE_LIMIT = parse_rate_limit(os.getenv("AUTH_RATE_LIMIT", "10/60"))
+
+# Score, replay and auth requests handled at once before shedding with 503;
+# kept below the PostgreSQL pool's 15 connections
+ADMISSION_LIMIT = int(os.getenv("ADMISSION_LIMIT", "12"))
+
+
+class BucketStore(ABC):
+    """Storage for token buckets."""
+
+    @abstractmethod
+    async def take(self, key: str, limit: RateLimit) -> float:
+        """
+        Take a token from the key's bucket.
+
+        Returns 0 if one was available, otherwise the seconds until one
+        will be.
+        """
+
+
+class MemoryBucketStore(BucketStore):
+    """Token buckets held in this process, least recently used dropped past `max_keys`."""
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._lock = Lock()
+        # Key -> (tokens, time they were counted)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated) * limit.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / limit.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RateLimiter:
+    """Checks requests against named rate limits."""
+
+    def __init__(self, store: BucketStore, limits: Dict[str, RateLimit], enabled: bool = RATE_LIMIT_ENABLED):
+        self.store = store
+        self.limits = limits
+        self.enabled = enabled
+
+    async def check(self, scope: str, key: str):
+        """Spend a token for the key under the scope's limit, answering 429 if there is none."""
+        if not self.enabled:
+            return
+        wait = await self.store.take(f"{scope}:{key}", self.limits[scope])
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+
+# Process-wide limiter used by the API
+rate_limiter = RateLimiter(MemoryBucketStore(), {"score": SCORE_RATE_LIMIT, "auth": AUTH_RATE_LIMIT})
+
+
+async def limit_auth(request: Request):
+    """Dependency limiting login and signup attempts per client IP."""
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the client
+    await rate_limiter.check("auth", request.client.host if request.client else "unknown")
+
+
+async def limit_scores(user: User = Depends(require_user)) -> User:
+    """Dependency limiting score submissions per logged-in user."""
+    await rate_limiter.check("score", user.id)
+    return user
+
+
+class AdmissionControl:
+    """Counts requests in progress and refuses new ones past a limit."""
+
+    def __init__(self, limit: int = ADMISSION_LIMIT):
+        self.limit = limit
+        self.active = 0
+        self.shed = 0
+
+    def try_acquire(self) -> bool:
+        if self.active >= self.limit:
+            self.shed += 1
+            return False
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+
+
+# Process-wide admission control used by the API
+admission = AdmissionControl()
+
+
+async def admit_request():
+    """Dependency holding an admission slot for the request, answering 503 if none is free."""
+    if not admission.try_acquire():
+        raise HTTPException(status_code=503, detail="Server busy", headers={"Retry-After": "1"})
+    try:
+        yield
+    finally:
+        admission.release()
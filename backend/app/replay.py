@@ -0,0 +1,153 @@
+"""
+Replay-verified score submission.
+
+Instead of trusting a submitted score, the client sends the seed its game was
+played with and the list of direction changes it made, each tagged with the
+tick it happened on. The server replays the game with `SnakeEngine` and
+records the score the replay actually reaches.
+
+Replays are simulated in a process pool so a burst of end-of-game submissions
+never runs on the event loop, and each replay gets a fixed time budget. Its
+size is checked before it is handed to a worker, and a pool whose worker
+died is replaced rather than failing every later replay.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Sequence, Tuple
+
+from .engine import SnakeEngine
+from .models import Direction, GameMode
+
+
+# Longest game accepted for verification, in ticks
+REPLAY_MAX_TICKS = int(os.getenv("REPLAY_MAX_TICKS", "100000"))
+
+# Wall-clock seconds a single replay may spend simulating
+REPLAY_TIME_BUDGET = float(os.getenv("REPLAY_TIME_BUDGET", "2.0"))
+
+# Worker processes used for verification
+REPLAY_WORKERS = int(os.getenv("REPLAY_WORKERS", "2"))
+
+# Reject plain POST /leaderboard submissions and only accept replays
+REQUIRE_SCORE_REPLAY = os.getenv("REQUIRE_SCORE_REPLAY", "false").lower() == "true"
+
+# Most direction changes that can matter between two ticks: any direction is
+# at most two turns from the current one
+MAX_TURNS_PER_TICK = 2
+
+# How often the simulation checks its time budget, in ticks
+_BUDGET_CHECK_INTERVAL = 1024
+
+
+class ReplayError(ValueError):
+    """Raised when a replay is malformed or cannot be verified."""
+
+
+class ReplayTimeout(ReplayError):
+    """Raised when a replay does not finish within its time budget."""
+
+
+class ReplayUnavailable(Exception):
+    """Raised when a replay could not be verified because its worker died."""
+
+
+def check_replay_size(ticks: int, inputs: Sequence[Tuple[int, Direction]]):
+    """Reject a replay that is too long, or has more inputs than its ticks could use."""
+    if ticks < 0 or ticks > REPLAY_MAX_TICKS:
+        raise ReplayError(f"Replay must be between 0 and {REPLAY_MAX_TICKS} ticks")
+    if len(inputs) > ticks * MAX_TURNS_PER_TICK:
+        raise ReplayError(f"Replay may have at most {MAX_TURNS_PER_TICK} inputs per tick")
+
+
+def simulate_replay(
+    mode: GameMode,
+    seed: int,
+    ticks: int,
+    inputs: Sequence[Tuple[int, Direction]],
+    time_budget: float = REPLAY_TIME_BUDGET
+) -> int:
+    """
+    Replay a game and return the score it reaches.
+
+    Inputs are applied before the step of the tick they are tagged with, in
+    order, so several turns between two ticks replay exactly as the client
+    made them. The game runs for `ticks` steps or until it ends, whichever
+    comes first.
+    """
+    check_replay_size(ticks, inputs)
+
+    previous_tick = 0
+    for tick, _ in inputs:
+        if tick < previous_tick or tick >= ticks:
+            raise ReplayError("Replay inputs must be in tick order and within the game")
+        previous_tick = tick
+
+    deadline = time.monotonic() + time_budget
+    engine = SnakeEngine(mode, seed)
+    engine.start()
+    next_input = 0
+    for tick in range(ticks):
+        while next_input < len(inputs) and inputs[next_input][0] == tick:
+            engine.change_direction(inputs[next_input][1])
+            next_input += 1
+        if not engine.step():
+            break
+        if tick % _BUDGET_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+            raise ReplayTimeout("Replay exceeded its verification time budget")
+    return engine.score
+
+
+class ReplayVerifier:
+    """Runs replay simulations in a pool of worker processes."""
+
+    def __init__(self, workers: int = REPLAY_WORKERS, time_budget: float = REPLAY_TIME_BUDGET):
+        self.workers = workers
+        self.time_budget = time_budget
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        """Create the worker pool. Workers are spawned on first use."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def verify(
+        self,
+        mode: GameMode,
+        seed: int,
+        ticks: int,
+        inputs: List[Tuple[int, Direction]]
+    ) -> int:
+        """Verify a replay off the event loop and return its score."""
+        # Checked here so an oversized replay is never copied to a worker
+        check_replay_size(ticks, inputs)
+        self.start()
+        pool = self._pool
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                pool, simulate_replay, mode, seed, ticks, inputs, self.time_budget
+            )
+        except BrokenProcessPool:
+            # A broken pool refuses all further work; replace it unless a
+            # replay that failed alongside this one already has
+            if self._pool is pool:
+                self._pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+                self.start()
+            raise ReplayUnavailable("Replay verification was interrupted, try again")
+
+
+# Process-wide verifier used by the API
+replay_verifier = ReplayVerifier()
@@ -0,0 +1,89 @@
+"""
+Cache of serialized leaderboard responses, served with strong ETags.
+
+Leaderboard reads are cached as the exact JSON bytes sent to the client,
+keyed by everything that selects the response (mode, window, page and so
+on). A version counter is bumped whenever a score is recorded or the ranked
+index is reloaded; entries built under an older version are rebuilt on their
+next read. The ETag is a hash of the body, so a client polling with
+`If-None-Match` gets an empty 304 without anything being serialized, and
+keeps getting 304s after a rebuild that produced the same bytes.
+"""
+import os
+from collections import OrderedDict
+from hashlib import blake2b
+from threading import Lock
+from typing import Awaitable, Callable, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+
+
+# Most serialized responses kept, least recently used dropped first
+LEADERBOARD_CACHE_SIZE = int(os.getenv("LEADERBOARD_CACHE_SIZE", "1024"))
+
+
+class CachedBody(NamedTuple):
+    version: int
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """Serialized response bodies, invalidated together by a version counter."""
+
+    def __init__(self, max_entries: int = LEADERBOARD_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.version = 0
+        self.builds = 0
+        self._lock = Lock()
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+
+    def invalidate(self):
+        """Mark every cached body as stale."""
+        with self._lock:
+            self.version += 1
+
+    async def get(self, key: Hashable, build: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, str]:
+        """Get the body and ETag for a key, building the body if it is missing or stale."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached.version == self.version:
+                self._entries.move_to_end(key)
+                return cached.body, cached.etag
+            # A score recorded while building leaves the body stale
+            version = self.version
+
+        body = await build()
+        etag = f'"{blake2b(body, digest_size=16).hexdigest()}"'
+        self.builds += 1
+        with self._lock:
+            self._entries[key] = CachedBody(version, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, etag
+
+
+# Process-wide cache for leaderboard reads
+leaderboard_cache = ResponseCache()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, as RFC 9110 asks)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def cached_response(request: Request, key: Hashable, build: Callable[[], Awaitable[bytes]]) -> Response:
+    """Serve a cached JSON body, or an empty 304 if the client already has it."""
+    body, etag = await leaderboard_cache.get(key, build)
+    # Clients may store the body but must revalidate before reusing it
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
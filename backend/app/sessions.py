@@ -0,0 +1,116 @@
+"""
+Stateless signed session tokens.
+
+A token carries the user's id, username, email and expiry time, signed with
+HMAC-SHA256 under SECRET_KEY. Any worker or replica sharing the key can
+check it without touching the database, so no session state lives in the
+process. Browsers get the token in an HttpOnly cookie; other clients can
+send it as `Authorization: Bearer <token>`.
+
+Logging out deletes the cookie. A copied token stays valid until it expires.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Response
+from starlette.requests import HTTPConnection
+
+from .models import User
+
+
+# Key that signs session tokens; must be the same on every worker and replica
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+if not SECRET_KEY:
+    print("SECRET_KEY is not set; sessions will only be valid in this process")
+    SECRET_KEY = secrets.token_hex(32)
+
+# Lifetime of a session token, in seconds
+SESSION_MAX_AGE = int(os.getenv("SESSION_MAX_AGE", str(7 * 24 * 3600)))
+
+# Only send the session cookie over HTTPS
+SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "false").lower() == "true"
+
+SESSION_COOKIE = "session"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest())
+
+
+def create_session_token(user: User, max_age: int = SESSION_MAX_AGE) -> str:
+    """Create a signed token identifying the user until it expires."""
+    claims = {
+        "sub": user.id,
+        "name": user.username,
+        "email": user.email,
+        "exp": int(time.time()) + max_age,
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def read_session_token(token: str) -> Optional[User]:
+    """Get the user a token identifies, or None if it is forged, malformed or expired."""
+    payload, _, signature = token.partition(".")
+    if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+        if claims["exp"] < time.time():
+            return None
+        return User(id=claims["sub"], username=claims["name"], email=claims["email"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def session_user(connection: HTTPConnection) -> Optional[User]:
+    """Get the logged-in user of a request or WebSocket from its bearer token or cookie."""
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = connection.cookies.get(SESSION_COOKIE, "")
+    return read_session_token(token) if token else None
+
+
+def get_session_user(connection: HTTPConnection) -> Optional[User]:
+    """Dependency giving the logged-in user, or None."""
+    return session_user(connection)
+
+
+def require_user(user: Optional[User] = Depends(get_session_user)) -> User:
+    """Dependency giving the logged-in user, answering 401 if there is none."""
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    return user
+
+
+def start_session(response: Response, user: User) -> str:
+    """Issue a session token for the user and set it as the session cookie."""
+    token = create_session_token(user)
+    response.set_cookie(
+        SESSION_COOKIE,
+        token,
+        max_age=SESSION_MAX_AGE,
+        httponly=True,
+        secure=SESSION_COOKIE_SECURE,
+        samesite="lax"
+    )
+    return token
+
+
+def end_session(response: Response):
+    """Delete the session cookie."""
+    response.delete_cookie(SESSION_COOKIE, httponly=True, secure=SESSION_COOKIE_SECURE, samesite="lax")
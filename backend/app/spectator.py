@@ -0,0 +1,103 @@
+import json
+from typing import List, Literal
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+
+from .models import ActivePlayer, GameStatus
+from .frame_codec import FrameCodecError
+from .live_games import game_registry
+from .sessions import session_user
+
+router = APIRouter(prefix="/spectator", tags=["spectator"])
+
+
+@router.get("/active", response_model=List[ActivePlayer])
+async def get_active_players():
+    """Get list of currently active players."""
+    return game_registry.active_players()
+
+
+async def receive_state(websocket: WebSocket):
+    """Receive a JSON state update or a binary frame from the player."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+    if message.get("bytes") is not None:
+        return message["bytes"]
+    return json.loads(message["text"])
+
+
+@router.websocket("/play")
+async def play(websocket: WebSocket):
+    """
+    Stream the logged-in player's game to spectators.
+
+    Updates are either JSON GameState documents, where only the first one has
+    to be complete, or binary frames from `frame_codec` starting with a
+    keyframe. The server replies once with the game ID.
+    """
+    user = session_user(websocket)
+    if not user:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Not logged in")
+        return
+
+    await websocket.accept()
+    game = None
+    try:
+        while True:
+            message = await receive_state(websocket)
+            if game is None:
+                game = game_registry.start(user, message)
+                await websocket.send_json({"gameId": game.id})
+                game_status = game.codec.status
+            else:
+                game_status = game_registry.update(game, message)
+
+            if game_status == GameStatus.game_over:
+                await websocket.close()
+                break
+    except (json.JSONDecodeError, TypeError, ValidationError, FrameCodecError):
+        await websocket.close(code=status.WS_1007_INVALID_FRAME_PAYLOAD_DATA, reason="Invalid game state")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if game is not None:
+            game_registry.end(game)
+
+
+@router.websocket("/watch/{game_id}")
+async def watch(websocket: WebSocket, game_id: str, format: Literal["json", "binary"] = "json"):
+    """
+    Stream a live game to a spectator until the game ends.
+
+    With `format=json` every frame is a full GameState document. With
+    `format=binary` the spectator gets a keyframe followed by deltas in the
+    `frame_codec` wire format.
+    """
+    await websocket.accept()
+    game = game_registry.get(game_id)
+    if game is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Game not found")
+        return
+
+    binary = format == "binary"
+    subscription = game.channel.subscribe(binary=binary)
+    try:
+        if binary:
+            await websocket.send_bytes(game.codec.keyframe())
+        else:
+            await websocket.send_text(game.document)
+        while True:
+            frame = await subscription.get()
+            if frame is None:
+                break
+            if binary:
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(frame)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        game.channel.unsubscribe(subscription)
@@ -0,0 +1,230 @@
+"""
+Serving the built frontend from an in-memory manifest.
+
+At startup the `static/` tree is walked once. Every file gets an entry with
+its media type, cache policy, ETag and Last-Modified date. Files up to
+STATIC_MEMORY_LIMIT bytes are held in memory, so serving them costs no
+stat, open or read. A request is a dictionary lookup; unknown paths outside
+`assets/` get `index.html` for client-side routing.
+
+Precompressed siblings made at build time (`app.js.br`, `app.js.gz`) are
+served to clients that accept them. They are generated by running this module
+(Brotli needs the `brotli` package, from `uv sync --extra static`):
+
+    uv run python -m app.static_files compress static
+
+Vite puts a content hash in every file name under `assets/`, so those are
+cached for a year as immutable. Everything else, index.html included, must
+be revalidated, which a matching If-None-Match or If-Modified-Since answers
+with an empty 304.
+"""
+import argparse
+import gzip
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from hashlib import blake2b
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from .response_cache import etag_matches
+
+
+# Files up to this many bytes are kept in memory; larger ones are streamed from disk
+STATIC_MEMORY_LIMIT = int(os.getenv("STATIC_MEMORY_LIMIT", str(1024 * 1024)))
+
+# Suffix of a precompressed sibling and the Content-Encoding it is served with
+COMPRESSED_SUFFIXES = {".br": "br", ".gz": "gzip"}
+
+# Encodings in order of preference when the client accepts several
+ENCODING_PREFERENCE = ("br", "gzip")
+
+# Cache policy for hashed build output, and for everything else
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Smallest file worth compressing at build time
+MIN_COMPRESS_SIZE = 1024
+
+COMPRESSIBLE_TYPES = {"application/javascript", "application/json", "application/xml", "image/svg+xml", "application/wasm"}
+
+
+class Variant(NamedTuple):
+    path: Path
+    stat: os.stat_result
+    etag: str
+    body: Optional[bytes]
+
+
+class StaticAsset(NamedTuple):
+    media_type: str
+    cache_control: str
+    last_modified: str
+    # Keyed by Content-Encoding, "identity" for the file itself
+    variants: Dict[str, Variant]
+
+
+def _variant(path: Path, memory_limit: int) -> Variant:
+    stat = path.stat()
+    if stat.st_size <= memory_limit:
+        body = path.read_bytes()
+        return Variant(path, stat, f'"{blake2b(body, digest_size=16).hexdigest()}"', body)
+    return Variant(path, stat, f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"', None)
+
+
+def is_compressed_variant(path: Path) -> bool:
+    """Whether a file is the precompressed sibling of another file, rather than an asset itself."""
+    return path.suffix in COMPRESSED_SUFFIXES and path.with_suffix("").is_file()
+
+
+def compressible(path: Path) -> bool:
+    media_type = mimetypes.guess_type(path.name)[0] or ""
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> set:
+    """Content codings an Accept-Encoding header allows, ignoring preference weights."""
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFrontend:
+    """Manifest of a built frontend, serving it without touching the disk for small files."""
+
+    def __init__(self, directory: Path, memory_limit: int = STATIC_MEMORY_LIMIT):
+        self.directory = Path(directory)
+        self.memory_limit = memory_limit
+        self.assets: Dict[str, StaticAsset] = {}
+        self.loaded = False
+
+    def load(self):
+        """Walk the directory and replace the manifest."""
+        assets: Dict[str, StaticAsset] = {}
+        for path in sorted(self.directory.rglob("*")):
+            if not path.is_file() or is_compressed_variant(path):
+                continue
+            name = path.relative_to(self.directory).as_posix()
+            variants = {"identity": _variant(path, self.memory_limit)}
+            for suffix, encoding in COMPRESSED_SUFFIXES.items():
+                compressed = path.with_name(path.name + suffix)
+                if compressed.is_file():
+                    variants[encoding] = _variant(compressed, self.memory_limit)
+            assets[name] = StaticAsset(
+                media_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+                cache_control=IMMUTABLE if name.startswith("assets/") else REVALIDATE,
+                last_modified=formatdate(variants["identity"].stat.st_mtime, usegmt=True),
+                variants=variants
+            )
+        self.assets = assets
+        self.loaded = True
+
+    def lookup(self, path: str) -> Optional[StaticAsset]:
+        """Find the file for a request path, falling back to index.html outside assets/."""
+        if not self.loaded:
+            self.load()
+        path = path.strip("/")
+        asset = self.assets.get(path or "index.html")
+        if asset is None and not path.startswith("assets/"):
+            asset = self.assets.get("index.html")
+        return asset
+
+    def response(self, request: Request, path: str) -> Response:
+        """Serve a path, choosing a precompressed variant and answering conditional requests."""
+        asset = self.lookup(path)
+        if asset is None and "index.html" not in self.assets:
+            raise HTTPException(status_code=404, detail="Frontend not built. API only mode.")
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+
+        encoding, variant = self.choose(asset, request.headers.get("accept-encoding"))
+        headers = {
+            "Cache-Control": asset.cache_control,
+            "ETag": variant.etag,
+            "Last-Modified": asset.last_modified,
+        }
+        if len(asset.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        if self.not_modified(request, variant, asset):
+            return Response(status_code=304, headers=headers)
+        if variant.body is not None:
+            return Response(content=variant.body, media_type=asset.media_type, headers=headers)
+        return FileResponse(variant.path, media_type=asset.media_type, headers=headers, stat_result=variant.stat)
+
+    @staticmethod
+    def choose(asset: StaticAsset, accept_encoding: Optional[str]) -> Tuple[str, Variant]:
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODING_PREFERENCE:
+            if encoding in asset.variants and encoding in accepted:
+                return encoding, asset.variants[encoding]
+        return "identity", asset.variants["identity"]
+
+    @staticmethod
+    def not_modified(request: Request, variant: Variant, asset: StaticAsset) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            return etag_matches(if_none_match, variant.etag)
+        # If-Modified-Since only counts without If-None-Match (RFC 9110)
+        if_modified_since = request.headers.get("if-modified-since")
+        if not if_modified_since:
+            return False
+        try:
+            return parsedate_to_datetime(asset.last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+
+def compress_directory(directory: Path, min_size: int = MIN_COMPRESS_SIZE) -> int:
+    """Write .gz and, with the brotli package, .br siblings of compressible files; returns files written."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("brotli is not installed; writing gzip variants only")
+
+    written = 0
+    for path in sorted(Path(directory).rglob("*")):
+        if not path.is_file() or is_compressed_variant(path) or not compressible(path):
+            continue
+        body = path.read_bytes()
+        if len(body) < min_size:
+            continue
+        variants = {".gz": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(body, quality=11)
+        for suffix, compressed in variants.items():
+            # Only worth serving if it is smaller
+            if len(compressed) < len(body):
+                path.with_name(path.name + suffix).write_bytes(compressed)
+                written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompress a built frontend for the static file server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compress_parser = commands.add_parser("compress", help="write .gz and .br files next to compressible files")
+    compress_parser.add_argument("directory", nargs="?", default="static")
+    compress_parser.add_argument("--min-size", type=int, default=MIN_COMPRESS_SIZE)
+    args = parser.parse_args()
+
+    written = compress_directory(Path(args.directory), args.min_size)
+    print(f"Wrote {written} compressed files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Fixed-interval tick loop shared by the server-side game schedulers.
+
+A `TickLoop` runs a step function every `interval` seconds on the event
+loop. It times each step in a histogram and keeps a moving average of the
+share of the interval the steps take. A tick that starts late is not made
+up for: the missed ticks are skipped rather than run back to back.
+"""
+import asyncio
+import time
+from typing import Callable, List, Optional
+
+from .metrics import Histogram
+
+
+# Seconds between ticks by default; the browser game ticks every 150 ms
+BROWSER_TICK_INTERVAL = 0.15
+
+# Upper bounds of the tick duration histogram buckets, in seconds
+TICK_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.015, 0.02, 0.025, 0.05, 0.1, 0.25)
+
+# Weight of the latest tick in the moving average of the load
+LOAD_SMOOTHING = 0.2
+
+
+class TickLoop:
+    """Calls `step` on a fixed tick and keeps its late-tick and duration stats."""
+
+    def __init__(
+        self,
+        step: Callable[[], object],
+        interval: float,
+        name: str,
+        description: str,
+        clock: Callable[[], float] = time.perf_counter
+    ):
+        self.step = step
+        self.interval = interval
+        self.name = name
+        self.clock = clock
+        self.late_ticks = 0
+        # Moving average of the share of the interval spent in `step`
+        self.load = 0.0
+        self.durations = Histogram(f"{name}_tick_duration_seconds", description, TICK_BUCKETS)
+        self._task: Optional[asyncio.Task] = None
+
+    def tick(self):
+        """Run one step and record how long it took."""
+        start = self.clock()
+        self.step()
+        elapsed = self.clock() - start
+        self.durations.observe(elapsed)
+        self.load += (elapsed / self.interval - self.load) * LOAD_SMOOTHING
+
+    async def start(self):
+        """Start ticking on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def expose(self) -> List[str]:
+        """Late ticks and tick durations in the Prometheus text format."""
+        return [
+            f"# HELP {self.name}_late_ticks_total Ticks that started after the next one was due.",
+            f"# TYPE {self.name}_late_ticks_total counter",
+            f"{self.name}_late_ticks_total {self.late_ticks}",
+        ] + self.durations.expose()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            self.tick()
+            next_tick += self.interval
+            now = loop.time()
+            if next_tick < now:
+                # Fell behind: skip the missed ticks rather than bursting through them
+                self.late_ticks += 1
+                next_tick = now
+            await asyncio.sleep(next_tick - now)
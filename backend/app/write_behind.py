@@ -0,0 +1,201 @@
+"""
+Write-behind batching for leaderboard inserts.
+
+With WRITE_BEHIND=true a submitted score is added to the in-memory ranked
+index and queued, and the request returns right away. A background task
+collects queued rows until it has WRITE_BEHIND_BATCH_SIZE of them or
+WRITE_BEHIND_INTERVAL seconds have passed since the first one, then writes
+them with a single multi-row INSERT and one commit, which also raises the
+players' best scores. The database work runs in a worker thread so it never
+blocks the event loop.
+
+Scores that are queued or being written are kept as pending until their
+batch commits. Loading the index merges them in, skipping any the load
+already read from the table, so reads see every acknowledged score exactly
+once whether or not it has reached the database yet.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from .db_config import SessionLocal
+from .db_models import DBLeaderboardEntry
+from .leaderboard_events import score_recorded, scores_dropped, scores_written
+from .leaderboard_index import IndexItem, make_index_item
+from .models import GameMode, LeaderboardEntry
+
+
+# Acknowledge scores once queued and insert them in batches
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "false").lower() == "true"
+
+# Most rows written by a single INSERT
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+
+# Longest a queued score waits before its batch is written, in seconds
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "0.2"))
+
+# Queued scores beyond which submissions wait for the writer to catch up
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+
+# Attempts at writing a batch before its scores are given up on and unranked
+WRITE_BEHIND_RETRIES = 3
+
+
+class LeaderboardWriter:
+    """Queues leaderboard entries and inserts them in batches."""
+
+    def __init__(
+        self,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        interval: float = WRITE_BEHIND_INTERVAL,
+        max_queue: int = WRITE_BEHIND_MAX_QUEUE
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self.batches = 0
+        self.written = 0
+        self.dropped = 0
+        self._pending: Dict[str, Tuple[LeaderboardEntry, dict]] = {}
+        self._session_factory: Callable[[], Session] = SessionLocal
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self, session_factory: Optional[Callable[[], Session]] = None):
+        """Start the background writer on the running event loop."""
+        if self._task is not None:
+            return
+        if session_factory is not None:
+            self._session_factory = session_factory
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write every queued score, then stop the background writer."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        await self._queue.put(None)
+        await task
+
+    async def submit(self, user_id: str, username: str, score: int, mode: GameMode) -> LeaderboardEntry:
+        """
+        Record a score without waiting for the database.
+
+        The entry is ranked immediately. If the queue is full this waits
+        until the writer has made room.
+        """
+        created_at = datetime.now(timezone.utc)
+        entry = LeaderboardEntry(
+            id=str(uuid.uuid4()),
+            username=username,
+            score=score,
+            mode=mode,
+            date=created_at.strftime("%Y-%m-%d")
+        )
+        row = {
+            "id": entry.id,
+            "user_id": user_id,
+            "username": username,
+            "score": score,
+            "mode": mode,
+            "created_at": created_at,
+        }
+        # Pending before queued, so the writer never commits a row it
+        # has not seen as pending
+        self._pending[entry.id] = (entry, row)
+        try:
+            await self._queue.put(row)
+        except BaseException:
+            self._pending.pop(entry.id, None)
+            raise
+        score_recorded(entry, created_at)
+        return entry
+
+    def pending_items(self) -> List[IndexItem]:
+        """Index items for scores that are not in the table yet."""
+        return [make_index_item(entry, row["created_at"]) for entry, row in list(self._pending.values())]
+
+    def pending_rows(self) -> List[Tuple[LeaderboardEntry, dict]]:
+        """Entries not in the table yet, each with the row that will be inserted."""
+        return list(self._pending.values())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = loop.time() + self.interval
+            while len(batch) < self.batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        row = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    row = self._queue.get_nowait()
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+
+    async def _flush(self, rows: List[dict]):
+        for attempt in range(1, WRITE_BEHIND_RETRIES + 1):
+            try:
+                await asyncio.to_thread(self._write, rows)
+                return
+            except Exception as e:
+                print(f"Leaderboard batch of {len(rows)} failed (attempt {attempt}): {e}")
+                if attempt < WRITE_BEHIND_RETRIES:
+                    await asyncio.sleep(self.interval)
+
+        # Acknowledged but never stored: unrank them everywhere rather than
+        # let them linger until the next reload
+        print(f"Dropping {len(rows)} leaderboard entries that could not be written")
+        dropped = [self._pending.pop(row["id"]) for row in rows if row["id"] in self._pending]
+        scores_dropped([(entry, row["created_at"]) for entry, row in dropped])
+        self.dropped += len(dropped)
+
+    def _write(self, rows: List[dict]):
+        from .database import upsert_best_scores
+        db = self._session_factory()
+        try:
+            db.execute(insert(DBLeaderboardEntry), rows)
+            upsert_best_scores(db, rows)
+            db.commit()
+        finally:
+            db.close()
+        for row in rows:
+            self._pending.pop(row["id"], None)
+        scores_written()
+        self.batches += 1
+        self.written += len(rows)
+
+
+# Process-wide writer used by the API when WRITE_BEHIND is enabled
+leaderboard_writer = LeaderboardWriter()
+
+
+def merge_pending(items: Iterable[IndexItem], pending: List[IndexItem]) -> Iterable[IndexItem]:
+    """Yield the given items read from the table, then the pending ones that were not among them."""
+    queued = {item[2]: item for item in pending}
+    for item in items:
+        queued.pop(item[2], None)
+        yield item
+    yield from queued.values()
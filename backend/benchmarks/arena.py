@@ -0,0 +1,95 @@
+"""
+Measure the per-tick cost of multiplayer arenas.
+
+Fills arenas with bot snakes and steps them all, as the arena loop does,
+reporting the time per arena tick and per snake with and without building
+the state document sent to players. For comparison, also times finding the
+same collisions by scanning every segment of every snake instead of the
+occupancy grid.
+
+Usage:
+    uv run python -m benchmarks.arena [--arenas 100] [--snakes 16] [--ticks 200] [--size 40]
+"""
+import argparse
+import time
+
+from app.arena_engine import Arena
+from app.engine import NO_CELL
+from app.models import GameMode, User
+
+
+def fill(arenas: int, snakes: int, size: int, mode: GameMode) -> list:
+    pool = []
+    for number in range(arenas):
+        arena = Arena(mode, size=size, max_snakes=snakes, seed=number)
+        for bot in range(snakes):
+            arena.join(User(id=f"bot-{bot}", username=f"Bot {bot}", email=""), bot=True)
+        pool.append(arena)
+    return pool
+
+
+def run(pool: list, ticks: int, documents: bool) -> float:
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for arena in pool:
+            for snake in arena.tick():
+                arena.respawn(snake)
+            if documents:
+                arena.document()
+    return time.perf_counter() - start
+
+
+def collisions_by_scan(arena: Arena) -> int:
+    """Count doomed moves by checking every next head against every segment."""
+    alive = [snake for snake in arena.snakes.values() if snake.alive]
+    doomed = 0
+    for snake in alive:
+        cell = arena._next_cell[snake.direction][snake.body[0]]
+        if cell == NO_CELL or any(cell in other.body for other in alive):
+            doomed += 1
+    return doomed
+
+
+def collisions_by_grid(arena: Arena) -> int:
+    doomed = 0
+    for snake in arena.snakes.values():
+        if snake.alive:
+            cell = arena._next_cell[snake.direction][snake.body[0]]
+            if cell == NO_CELL or arena.occupied[cell]:
+                doomed += 1
+    return doomed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--arenas", type=int, default=100)
+    parser.add_argument("--snakes", type=int, default=16)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--size", type=int, default=40)
+    args = parser.parse_args()
+
+    for mode in (GameMode.walls, GameMode.pass_through):
+        pool = fill(args.arenas, args.snakes, args.size, mode)
+        # Let the snakes grow before measuring
+        run(pool, 50, documents=False)
+        segments = sum(len(snake.body) for arena in pool for snake in arena.snakes.values()) / len(pool)
+
+        steps = args.arenas * args.ticks
+        for documents in (False, True):
+            elapsed = run(pool, args.ticks, documents)
+            label = "tick + document" if documents else "tick"
+            print(f"{mode.value:>12} {label:>15}: {elapsed / steps * 1e6:7.1f} us/arena, "
+                  f"{elapsed / steps / args.snakes * 1e6:5.2f} us/snake, "
+                  f"all {args.arenas} arenas {elapsed / args.ticks * 1000:6.2f} ms/tick")
+
+        for name, check in (("grid", collisions_by_grid), ("scan", collisions_by_scan)):
+            start = time.perf_counter()
+            for arena in pool:
+                check(arena)
+            elapsed = time.perf_counter() - start
+            print(f"{mode.value:>12} collisions by {name}: {elapsed / len(pool) * 1e6:7.1f} us/arena "
+                  f"({segments:.0f} segments per arena)")
+
+
+if __name__ == "__main__":
+    main()
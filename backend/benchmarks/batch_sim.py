@@ -0,0 +1,69 @@
+"""
+Measure greedy bot evaluation throughput, batch simulator vs scalar engine.
+
+Plays games with the greedy bot until they end or hit the tick cap (the
+greedy bot often circles forever) and reports games and ticks per second.
+Needs NumPy (`uv sync --extra sim`).
+
+Usage:
+    uv run python -m benchmarks.batch_sim [--games 20000] [--batch 10000] [--max-ticks 200]
+"""
+import argparse
+import time
+
+from app.batch_sim import BatchSimulator, greedy_policy
+from app.bot import greedy_direction
+from app.engine import SnakeEngine
+from app.models import GameMode
+
+
+def run_scalar(mode: GameMode, games: int, max_ticks: int) -> int:
+    ticks = 0
+    engine = SnakeEngine(mode)
+    for seed in range(games):
+        engine.reset(seed)
+        engine.start()
+        for _ in range(max_ticks):
+            engine.change_direction(greedy_direction(engine))
+            ticks += 1
+            if not engine.step():
+                break
+    return ticks
+
+
+def run_batch(mode: GameMode, games: int, batch: int, max_ticks: int) -> int:
+    ticks = 0
+    sim = BatchSimulator(mode, range(min(batch, games)))
+    for first in range(0, games, batch):
+        seeds = range(first, min(first + batch, games))
+        if len(seeds) != sim.size:
+            sim = BatchSimulator(mode, seeds)
+        else:
+            sim.reset(seeds)
+        sim.run(greedy_policy, max_ticks)
+        ticks += int(sim.ticks.sum())
+    return ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=10000)
+    parser.add_argument("--max-ticks", type=int, default=200)
+    parser.add_argument("--scalar-games", type=int, default=1000)
+    args = parser.parse_args()
+
+    for mode in (GameMode.walls, GameMode.pass_through):
+        for label, games, run in (
+            ("scalar", args.scalar_games, lambda g, mode=mode: run_scalar(mode, g, args.max_ticks)),
+            ("batch", args.games, lambda g, mode=mode: run_batch(mode, g, args.batch, args.max_ticks)),
+        ):
+            start = time.perf_counter()
+            ticks = run(games)
+            elapsed = time.perf_counter() - start
+            print(f"{mode.value:>12} {label:>6}: {games / elapsed * 60:>12,.0f} games/min "
+                  f"{ticks / elapsed:>12,.0f} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Measure how many server bots one worker can host within its tick budget.
+
+For each bot count, runs the scheduler on the event loop for a while and
+reports bot steps per second, the tick rate each bot actually got, the p99
+tick duration and the worst event loop stall seen by a 10 ms ticker, which
+stands in for request handling.
+
+Usage:
+    uv run python -m benchmarks.bot_scheduler [--bots 100 1000 5000] [--seconds 5] [--interval 0.15] [--budget-ms 20]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.bot_scheduler import BotScheduler
+from app.bus import LocalBus
+from app.live_games import GameRegistry
+
+
+async def ticker(stop: asyncio.Event) -> float:
+    """Return the longest the loop was late waking a 10 ms sleep, in ms."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, (time.perf_counter() - start - 0.01) * 1000)
+    return worst
+
+
+async def run(bots: int, seconds: float, interval: float, budget_ms: float):
+    scheduler = BotScheduler(registry=GameRegistry(bus=LocalBus()), interval=interval, budget_ms=budget_ms, seed=0)
+    durations = []
+    tick = scheduler.loop.step
+
+    def timed_tick() -> int:
+        start = time.perf_counter()
+        stepped = tick()
+        durations.append((time.perf_counter() - start) * 1000)
+        return stepped
+
+    scheduler.loop.step = timed_tick
+    stop = asyncio.Event()
+    lag = asyncio.create_task(ticker(stop))
+    await scheduler.start(bots)
+    start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await scheduler.stop()
+    worst_lag = await lag
+
+    p99 = statistics.quantiles(durations, n=100)[98] if len(durations) > 1 else durations[0]
+    print(f"{bots:>7} bots: {scheduler.steps / elapsed:>9,.0f} steps/s, "
+          f"{scheduler.steps / bots / elapsed:5.2f} ticks/s per bot, "
+          f"tick p99 {p99:5.1f} ms, {scheduler.loop.late_ticks} late ticks, "
+          f"worst loop stall {worst_lag:5.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bots", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--interval", type=float, default=0.15)
+    parser.add_argument("--budget-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    print(f"Tick every {args.interval * 1000:.0f} ms, budget {args.budget_ms:.0f} ms "
+          f"(full rate is {1 / args.interval:.2f} ticks/s per bot)")
+    for bots in args.bots:
+        asyncio.run(run(bots, args.seconds, args.interval, args.budget_ms))
+
+
+if __name__ == "__main__":
+    main()
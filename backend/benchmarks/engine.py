@@ -0,0 +1,51 @@
+"""
+Measure server-side engine throughput in game ticks per second.
+
+Steps a pool of games in round-robin, restarting any game that ends, with a
+random turn on some ticks.
+
+Usage:
+    uv run python -m benchmarks.engine [--games 1000] [--ticks 200]
+"""
+import argparse
+import random
+import time
+
+from app.engine import SnakeEngine
+from app.models import Direction, GameMode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    choices = random.Random(0)
+    directions = list(Direction)
+    for mode in (GameMode.walls, GameMode.pass_through):
+        games = [SnakeEngine(mode, seed=i) for i in range(args.games)]
+        for game in games:
+            game.start()
+        turns = [choices.choice(directions) if choices.random() < 0.2 else None for _ in range(4096)]
+
+        restarts = 0
+        start = time.perf_counter()
+        for tick in range(args.ticks):
+            for i, game in enumerate(games):
+                turn = turns[(tick * 31 + i) & 4095]
+                if turn is not None:
+                    game.change_direction(turn)
+                if not game.step():
+                    game.reset(seed=tick * args.games + i)
+                    game.start()
+                    restarts += 1
+        elapsed = time.perf_counter() - start
+
+        steps = args.games * args.ticks
+        print(f"{mode.value:>12}: {steps / elapsed:>10,.0f} ticks/s "
+              f"({elapsed / steps * 1e6:.2f} us/tick, {restarts} restarts)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare spectator frame size and encode time: JSON vs the binary frame codec.
+
+For each snake length this measures one ordinary tick (head moves, tail
+follows) three ways:
+
+* json:   GameState.model_dump_json(), what JSON spectators receive
+* diff:   FrameCodec.encode() from a full GameState model
+* delta:  FrameCodec.encode_delta() from a known move, as a server-side
+          engine would call it; relaying a player's binary frame costs the same
+
+Usage:
+    uv run python -m benchmarks.frame_codec
+"""
+import timeit
+
+from app.frame_codec import FrameCodec, pack_cell, pack_meta
+from app.models import Direction, GameMode, GameState, GameStatus, Position, Snake
+
+NUMBER = 5000
+
+
+def make_body(length: int):
+    """A snake winding through the grid row by row, head first."""
+    cells = [(x if y % 2 == 0 else 19 - x, y) for y in range(20) for x in range(20)]
+    return [Position(x=x, y=y) for x, y in reversed(cells[:length + 1])]
+
+
+def make_state(body) -> GameState:
+    return GameState(
+        snake=Snake(body=body, direction=Direction.RIGHT),
+        food=Position(x=3, y=4),
+        score=len(body) * 10,
+        status=GameStatus.playing,
+        mode=GameMode.pass_through
+    )
+
+
+def timed(fn) -> float:
+    return timeit.timeit(fn, number=NUMBER) / NUMBER * 1e6
+
+
+def main():
+    print(f"{'length':>6} {'json B':>7} {'delta B':>7} {'json us':>8} {'diff us':>8} {'delta us':>8}")
+    for length in (3, 20, 50, 100, 200, 399):
+        full = make_body(length)
+        previous = make_state(full[1:])
+        current = make_state(full[:-1])
+
+        sender = FrameCodec(keyframe_interval=NUMBER * 10)
+        sender.encode(previous)
+        snapshot = sender.keyframe()
+        frame = sender.encode(current)
+
+        head = pack_cell(current.snake.body[0].x, current.snake.body[0].y)
+        food = pack_cell(current.food.x, current.food.y)
+        meta = pack_meta(current.mode, current.status, current.snake.direction)
+
+        def diff(sender=sender, snapshot=snapshot, current=current):
+            sender.decode(snapshot)
+            sender.encode(current)
+
+        def delta(sender=sender, head=head, score=previous.score, food=food, meta=meta):
+            # Re-adding the same head keeps the length steady, so no reset needed
+            sender.encode_delta((head,), 1, score, food, meta)
+
+        reset = timed(lambda sender=sender, snapshot=snapshot: sender.decode(snapshot))
+
+        print(f"{length:>6} {len(current.model_dump_json()):>7} {len(frame):>7} "
+              f"{timed(current.model_dump_json):>8.2f} {timed(diff) - reset:>8.2f} "
+              f"{timed(delta):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Measure bulk leaderboard import and export throughput.
+
+Writes generated history to a file, imports it into an empty database with
+the leaderboard_io module, exports it back to a second file and checks that
+both files hold the same records. Prints rows per second for each step and
+the peak memory of the process. Works on SQLite and PostgreSQL (COPY is used
+with psycopg2); the database must be empty unless --reset is given, which
+drops the application's tables first.
+
+Usage:
+    uv run python -m benchmarks.leaderboard_io [--rows 10000000] [--format csv] [--database-url sqlite:///./leaderboard_io_bench.db]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from alembic import command
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.leaderboard_io import COLUMNS, FORMATS, export_leaderboard, import_leaderboard
+from app.models import GameMode
+from benchmarks.leaderboard_queries import migrate
+
+
+def write_history(path: str, fmt: str, rows: int, users: int):
+    generator = random.Random(0)
+    start_time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    modes = [mode.value for mode in GameMode]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        if fmt == "csv":
+            writer.writerow(COLUMNS)
+        for n in range(rows):
+            user = generator.randrange(users)
+            record = (
+                f"{n:010d}",
+                f"user-{user}",
+                f"player{user}",
+                int(generator.expovariate(1 / 120)),
+                modes[n % len(modes)],
+                (start_time + timedelta(seconds=n)).isoformat(),
+            )
+            if fmt == "csv":
+                writer.writerow(record)
+            else:
+                f.write(json.dumps(dict(zip(COLUMNS, record))) + "\n")
+
+
+def read_records(path: str, fmt: str):
+    with open(path, newline="") as f:
+        if fmt == "csv":
+            return sorted(tuple(row) for row in csv.reader(f))
+        return sorted(tuple(json.loads(line).values()) for line in f)
+
+
+def peak_memory_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--database-url", default="sqlite:///./leaderboard_io_bench.db")
+    parser.add_argument("--reset", action="store_true", help="drop the application's tables first")
+    parser.add_argument("--skip-check", action="store_true", help="do not compare the exported file with the input")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.reset:
+        migrate(engine, command.downgrade, "base")
+    elif "leaderboard" in inspect(engine).get_table_names():
+        parser.error("the database already has a leaderboard table; pass --reset to drop it")
+    migrate(engine, command.upgrade, "head")
+    db = sessionmaker(bind=engine, autoflush=False)()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, f"history.{args.format}")
+        exported = os.path.join(directory, f"exported.{args.format}")
+
+        start = time.perf_counter()
+        write_history(source, args.format, args.rows, args.users)
+        print(f"Generated {args.rows:,} rows in {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        with open(source, newline="") as f:
+            count = import_leaderboard(db, f, args.format)
+        elapsed = time.perf_counter() - start
+        print(f"Import ({engine.dialect.name}): {count:,} rows in {elapsed:.1f} s, {count / elapsed:,.0f} rows/s")
+
+        start = time.perf_counter()
+        with open(exported, "wb") as f:
+            for chunk in export_leaderboard(db, args.format):
+                f.write(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"Export ({engine.dialect.name}): {count:,} rows in {elapsed:.1f} s, {count / elapsed:,.0f} rows/s")
+        print(f"Peak memory: {peak_memory_mb():,.0f} MB")
+
+        if not args.skip_check:
+            if read_records(source, args.format) != read_records(exported, args.format):
+                sys.exit("Exported records differ from the imported ones")
+            print("Round trip: exported records match the input")
+
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Measure leaderboard query plans and latency before and after the composite indexes.
+
+Builds the schema at migration 0002 (single-column indexes only), loads
+generated scores, times the leaderboard's query shapes and prints their
+plans, then upgrades to the latest migration and repeats. Works on SQLite
+and PostgreSQL; the database must be empty unless --reset is given, which
+drops the application's tables first.
+
+Usage:
+    uv run python -m benchmarks.leaderboard_queries [--rows 10000000] [--database-url sqlite:///./leaderboard_bench.db]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, desc, func, inspect, insert, select, text
+
+from app.db_config import ALEMBIC_CONFIG
+from app.db_models import DBLeaderboardEntry
+from app.models import GameMode
+
+
+LOAD_CHUNK = 50000
+
+
+def migrate(engine, operation, revision: str):
+    config = Config(ALEMBIC_CONFIG)
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        operation(config, revision)
+
+
+def load_rows(engine, rows: int, users: int):
+    generator = random.Random(0)
+    start_time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    modes = list(GameMode)
+    table = DBLeaderboardEntry.__table__
+    with engine.begin() as connection:
+        for first in range(0, rows, LOAD_CHUNK):
+            chunk = []
+            for n in range(first, min(first + LOAD_CHUNK, rows)):
+                user = generator.randrange(users)
+                chunk.append({
+                    "id": f"{n:010d}",
+                    "user_id": f"user-{user}",
+                    "username": f"player{user}",
+                    # Most games end early; a few go long
+                    "score": int(generator.expovariate(1 / 120)),
+                    "mode": modes[n % len(modes)],
+                    "created_at": start_time + timedelta(seconds=n),
+                })
+            connection.execute(insert(table), chunk)
+            print(f"\rLoaded {min(first + LOAD_CHUNK, rows):,} rows", end="", flush=True)
+    print()
+
+
+def analyze(engine):
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+
+def queries(users: int):
+    entry = DBLeaderboardEntry
+    order = (desc(entry.score), entry.created_at, entry.id)
+    return [
+        ("top 100, one mode", select(entry).where(entry.mode == GameMode.walls).order_by(*order).limit(100)),
+        ("top 100, all modes", select(entry).order_by(*order).limit(100)),
+        ("personal best", select(entry.score).where(
+            entry.user_id == f"user-{users // 2}", entry.mode == GameMode.walls
+        ).order_by(desc(entry.score)).limit(1)),
+        ("rank of score", select(func.count()).select_from(entry).where(
+            entry.mode == GameMode.walls, entry.score > 600
+        )),
+    ]
+
+
+def explain(connection, statement) -> str:
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "sqlite":
+        return "\n".join(f"      {row[3]}" for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    return "\n".join(f"      {row[0]}" for row in connection.execute(text(f"EXPLAIN {sql}")))
+
+
+def run_queries(engine, users: int, repeat: int):
+    with engine.connect() as connection:
+        for label, statement in queries(users):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                connection.execute(statement).all()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"  {label:<20} median {statistics.median(timings):>10.2f} ms   p95 {p95:>10.2f} ms")
+            print(explain(connection, statement))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default="sqlite:///./leaderboard_bench.db")
+    parser.add_argument("--reset", action="store_true", help="drop the application's tables first")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.reset:
+        migrate(engine, command.downgrade, "base")
+    elif "leaderboard" in inspect(engine).get_table_names():
+        parser.error("the database already has a leaderboard table; pass --reset to drop it")
+
+    migrate(engine, command.upgrade, "0002")
+    start = time.perf_counter()
+    load_rows(engine, args.rows, args.users)
+    print(f"Load: {time.perf_counter() - start:.1f} s")
+    analyze(engine)
+
+    print(f"\nSingle-column indexes ({engine.dialect.name}, {args.rows:,} rows)")
+    run_queries(engine, args.users, args.repeat)
+
+    start = time.perf_counter()
+    migrate(engine, command.upgrade, "head")
+    analyze(engine)
+    print(f"\nComposite indexes built in {time.perf_counter() - start:.1f} s")
+    run_queries(engine, args.users, args.repeat)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""
+Load-test the running API with a realistic mix of requests at fixed concurrency.
+
+Starts the real app under uvicorn against a fresh SQLite database, or the
+PostgreSQL database given with --database-url, signs up a pool of players
+and keeps a few of their games streaming. Then --concurrency clients each
+pick operations by weight for --duration seconds: leaderboard reads (sent
+with the last ETag, like a polling browser), rank and page lookups, score
+submissions, logins, signups and spectator subscriptions. Reports
+throughput and p50/p95/p99 latency per operation.
+
+--output saves the results as JSON. --baseline compares them with a saved
+run and exits with status 1 if any operation's p95 latency rose, or its
+throughput fell, by more than --tolerance. Rate limits are switched off in
+the server so they do not cap the load; requests shed with 429 or 503 are
+counted apart from errors.
+
+Usage:
+    uv run python -m benchmarks.load_test [--duration 30] [--concurrency 32] [--database-url postgresql://...] [--output results.json] [--baseline benchmarks/baselines/load_test_sqlite.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import secrets
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+from websockets.asyncio.client import connect
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_MIX = {
+    "leaderboard": 50,
+    "rank": 10,
+    "page": 10,
+    "submit": 15,
+    "login": 6,
+    "signup": 2,
+    "spectate": 7,
+}
+
+MODES = ["walls", "pass-through"]
+
+# Operations with fewer samples than this are not compared with the baseline
+MIN_COMPARED_SAMPLES = 20
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation: {name}")
+        mix[name] = int(weight)
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, database_url: str, workers: int, extra_env: Dict[str, str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "RATE_LIMIT_ENABLED": "false",
+        "SECRET_KEY": os.environ.get("SECRET_KEY") or secrets.token_hex(32),
+    }
+    if workers > 1:
+        env["MESSAGE_BUS"] = "unix"
+        env["MESSAGE_BUS_DIR"] = tempfile.mkdtemp(prefix="snake-arena-bus-")
+    env.update(extra_env)
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def stop_server(server: subprocess.Popen):
+    # SIGINT runs the app's shutdown, which writes out queued scores
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+async def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with status {server.returncode}")
+            try:
+                if (await client.get("/api")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+def game_state(score: int = 0) -> dict:
+    return {
+        "snake": {"body": [{"x": 10, "y": 10}, {"x": 9, "y": 10}, {"x": 8, "y": 10}], "direction": "RIGHT"},
+        "food": {"x": 15, "y": 10},
+        "score": score,
+        "status": "playing",
+        "mode": "walls",
+    }
+
+
+class LoadTest:
+    """Shared state of one load test run."""
+
+    def __init__(self, base_url: str, mix: Dict[str, int]):
+        self.base_url = base_url
+        self.ws_url = base_url.replace("http://", "ws://")
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.run_id = secrets.token_hex(3)
+        self.players: List[dict] = []
+        self.game_ids: List[str] = []
+        self.signups = 0
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    async def signup(self, client: httpx.AsyncClient) -> httpx.Response:
+        self.signups += 1
+        name = f"load-{self.run_id}-{self.signups}"
+        response = await client.post(
+            "/auth/signup",
+            json={"username": name, "email": f"{name}@example.com", "password": "password123"}
+        )
+        if response.status_code == 200:
+            self.players.append({"email": f"{name}@example.com", "token": response.json()["token"]})
+        return response
+
+    async def run_operation(self, name: str, client: httpx.AsyncClient, etags: Dict[str, str]) -> int:
+        if name == "leaderboard":
+            mode = random.choice(MODES + [None])
+            params = {"mode": mode} if mode else {}
+            headers = {"If-None-Match": etags[mode]} if mode in etags else {}
+            response = await client.get("/leaderboard", params=params, headers=headers)
+            if "etag" in response.headers:
+                etags[mode] = response.headers["etag"]
+            return response.status_code
+        if name == "rank":
+            return (await client.get("/leaderboard/rank", params={"score": random.randint(0, 1000)})).status_code
+        if name == "page":
+            params = {"start": random.randint(1, 500), "limit": 50}
+            return (await client.get("/leaderboard/page", params=params)).status_code
+        if name == "submit":
+            player = random.choice(self.players)
+            response = await client.post(
+                "/leaderboard",
+                json={"score": random.randint(0, 1000), "mode": random.choice(MODES)},
+                headers={"Authorization": f"Bearer {player['token']}"}
+            )
+            return response.status_code
+        if name == "login":
+            player = random.choice(self.players)
+            response = await client.post("/auth/login", json={"email": player["email"], "password": "password123"})
+            return response.status_code
+        if name == "signup":
+            return (await self.signup(client)).status_code
+        if name == "spectate":
+            if not self.game_ids:
+                return 0
+            async with connect(f"{self.ws_url}/spectator/watch/{random.choice(self.game_ids)}") as websocket:
+                await websocket.recv()
+            return 200
+        raise ValueError(name)
+
+    async def client_loop(self, stop: asyncio.Event):
+        etags: Dict[str, str] = {}
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=30) as client:
+            while not stop.is_set():
+                name = random.choices(self.operations, self.weights)[0]
+                start = time.perf_counter()
+                try:
+                    status = await self.run_operation(name, client, etags)
+                except (httpx.HTTPError, OSError, asyncio.TimeoutError):
+                    status = 0
+                except Exception:
+                    status = -1
+                if self.recording:
+                    self.latencies[name].append((time.perf_counter() - start) * 1000)
+                    self.statuses[name][status] += 1
+
+    async def stream_game(self, player: dict, stop: asyncio.Event, tick: float):
+        headers = {"Authorization": f"Bearer {player['token']}"}
+        async with connect(f"{self.ws_url}/spectator/play", additional_headers=headers) as websocket:
+            await websocket.send(json.dumps(game_state()))
+            game_id = json.loads(await websocket.recv())["gameId"]
+            self.game_ids.append(game_id)
+            score = 0
+            try:
+                while not stop.is_set():
+                    score += 10
+                    await websocket.send(json.dumps({"score": score}))
+                    await asyncio.sleep(tick)
+            finally:
+                self.game_ids.remove(game_id)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(test: LoadTest, duration: float) -> Dict[str, dict]:
+    operations = {}
+    for name in test.operations:
+        latencies = test.latencies.get(name)
+        if not latencies:
+            continue
+        statuses = test.statuses[name]
+        ok = sum(count for status, count in statuses.items() if 200 <= status < 400)
+        shed = statuses.get(429, 0) + statuses.get(503, 0)
+        operations[name] = {
+            "count": len(latencies),
+            "ok": ok,
+            "shed": shed,
+            "errors": len(latencies) - ok - shed,
+            "throughput": len(latencies) / duration,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+        }
+    return operations
+
+
+def print_report(operations: Dict[str, dict]):
+    print(f"{'operation':<12} {'count':>8} {'errors':>7} {'shed':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in operations.items():
+        print(f"{name:<12} {stats['count']:>8} {stats['errors']:>7} {stats['shed']:>6} {stats['throughput']:>9.1f} "
+              f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    total = sum(stats["throughput"] for stats in operations.values())
+    print(f"{'total':<12} {sum(s['count'] for s in operations.values()):>8} "
+          f"{sum(s['errors'] for s in operations.values()):>7} {sum(s['shed'] for s in operations.values()):>6} {total:>9.1f}")
+
+
+def compare(operations: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Describe every operation that is worse than the baseline by more than the tolerance."""
+    regressions = []
+    for name, stats in operations.items():
+        base = baseline.get(name)
+        if base is None or min(stats["count"], base["count"]) < MIN_COMPARED_SAMPLES:
+            continue
+        if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.2f} ms -> {stats['p95_ms']:.2f} ms")
+        if stats["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput']:.1f} -> {stats['throughput']:.1f} req/s")
+    return regressions
+
+
+async def run(args) -> dict:
+    database_dir = None
+    database_url = args.database_url
+    if database_url is None:
+        database_dir = tempfile.TemporaryDirectory(prefix="snake-arena-load-")
+        database_url = f"sqlite:///{database_dir.name}/load_test.db"
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    server = start_server(port, database_url, args.workers, extra_env)
+    try:
+        await wait_until_ready(base_url, server)
+        test = LoadTest(base_url, args.mix)
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            for _ in range(args.users):
+                await test.signup(client)
+
+        stop = asyncio.Event()
+        streams = [
+            asyncio.create_task(test.stream_game(player, stop, 1 / args.tick_rate))
+            for player in test.players[:args.players]
+        ]
+        # Spectators need games to watch from the start
+        async with asyncio.timeout(30):
+            while len(test.game_ids) < len(streams):
+                await asyncio.sleep(0.05)
+        clients = [asyncio.create_task(test.client_loop(stop)) for _ in range(args.concurrency)]
+
+        await asyncio.sleep(args.warmup)
+        test.recording = True
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        test.recording = False
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*clients, *streams, return_exceptions=True)
+    finally:
+        stop_server(server)
+        if database_dir is not None:
+            database_dir.cleanup()
+
+    return {
+        "config": {
+            "database": database_url.split(":", 1)[0].split("+")[0],
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "workers": args.workers,
+            "players": args.players,
+            "mix": args.mix,
+            "env": extra_env,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "operations": summarize(test, elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", help="database to test against (default: a fresh SQLite file)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of load before measuring")
+    parser.add_argument("--concurrency", type=int, default=32, help="clients sending requests at once")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--users", type=int, default=50, help="players signed up before the test")
+    parser.add_argument("--players", type=int, default=4, help="games streamed for spectators to watch")
+    parser.add_argument("--tick-rate", type=float, default=10, help="frames per second of each streamed game")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="operation weights, such as leaderboard=50,submit=15 (default: %(default)s)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra server environment, such as ASYNC_DATABASE=true")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="compare with results saved by an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed fraction worse than the baseline")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_report(results["operations"])
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results["operations"], baseline["operations"], args.tolerance)
+        if regressions:
+            print(f"\nWorse than {args.baseline} by more than {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nWithin {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
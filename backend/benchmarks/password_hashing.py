@@ -0,0 +1,72 @@
+"""
+Measure login throughput and latency for scrypt cost settings.
+
+For each cost N, runs concurrent password checks through the hashing pool
+the API uses and reports checks per second, p50/p99 latency, and the worst
+event loop stall seen by a 10 ms ticker (which stays near zero because
+hashing runs off the loop).
+
+Usage:
+    uv run python -m benchmarks.password_hashing [--costs 12 13 14 15 16] [--workers 4] [--logins 200] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.passwords import PasswordHasher, hash_password
+
+
+async def ticker(stop: asyncio.Event) -> float:
+    """Return the longest the loop was late waking a 10 ms sleep, in ms."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, (time.perf_counter() - start - 0.01) * 1000)
+    return worst
+
+
+async def run(cost: int, workers: int, logins: int, concurrency: int):
+    stored = hash_password("password123", n=2 ** cost)
+    hasher = PasswordHasher(workers=workers)
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def login():
+        async with limit:
+            start = time.perf_counter()
+            await hasher.check("password123", stored)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    stop = asyncio.Event()
+    stall = asyncio.create_task(ticker(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_stall = await stall
+    hasher.shutdown()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    memory = 128 * 2 ** cost * 8 / 2 ** 20
+    print(f"N=2^{cost:<3} {memory:>6.0f} MiB/hash {logins / elapsed:>9,.1f} logins/s "
+          f"p50 {statistics.median(latencies):>8.1f} ms  p99 {p99:>8.1f} ms  loop stall {worst_stall:>6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--costs", type=int, nargs="+", default=[12, 13, 14, 15, 16], help="log2 of scrypt N")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers, {args.concurrency} concurrent logins, r=8 p=1")
+    for cost in args.costs:
+        asyncio.run(run(cost, args.workers, args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
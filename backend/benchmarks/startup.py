@@ -0,0 +1,87 @@
+"""
+Measure how long the app takes from process start to ready to serve.
+
+Starts fresh interpreters that import `app.main` and run its startup, in the
+development and production startup modes, against a migrated SQLite
+database (or --database-url). Prints the median time to import the app, to
+run startup, and from spawning the process until startup finished. With
+--max-seconds, exits with status 1 when the production median is slower,
+so CI can catch startup regressions.
+
+Usage:
+    uv run python -m benchmarks.startup [--runs 5] [--max-seconds 5] [--database-url sqlite:///./startup_bench.db]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("development", "production")
+
+
+def child():
+    """Import the app and run its startup, then report the timings as JSON."""
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def start():
+        async with app.router.lifespan_context(app):
+            return time.perf_counter(), time.time()
+
+    ready, ready_at = asyncio.run(start())
+    print(json.dumps({"import": imported - started, "startup": ready - imported, "ready_at": ready_at}))
+
+
+def measure(mode: str, database_url: str) -> dict:
+    env = dict(os.environ, STARTUP_MODE=mode, DATABASE_URL=database_url)
+    # Wall clock, since the interval spans two processes; it also covers
+    # interpreter startup, which the child cannot time itself
+    spawned_at = time.time()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["total"] = timings.pop("ready_at") - spawned_at
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", help="migrated database to start against (default: a temporary SQLite file)")
+    parser.add_argument("--max-seconds", type=float, help="fail when the production median exceeds this")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database_url or f"sqlite:///{os.path.join(directory, 'startup_bench.db')}"
+        # Migrate and seed once, so every measured run finds the same database
+        measure("development", database_url)
+
+        medians = {}
+        for mode in MODES:
+            runs = [measure(mode, database_url) for _ in range(args.runs)]
+            medians[mode] = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(
+                f"{mode:<12} import {medians[mode]['import'] * 1000:>7.0f} ms   "
+                f"startup {medians[mode]['startup'] * 1000:>7.0f} ms   "
+                f"spawn to ready {medians[mode]['total'] * 1000:>7.0f} ms"
+            )
+
+    if args.max_seconds is not None and medians["production"]["total"] > args.max_seconds:
+        sys.exit(f"Production startup took {medians['production']['total']:.2f} s, over {args.max_seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Alembic environment for the Snake Arena database.
+
+Migrates the database configured in `app.db_config`. When the application
+runs the migrations itself (see `db_config.migrate_database`) it passes its
+open connection in `config.attributes["connection"]`.
+"""
+from alembic import context
+
+from app.db_config import get_engine
+from app.db_models import Base
+
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Emit the migration SQL without connecting to the database."""
+    engine = get_engine()
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=engine.dialect.name == "sqlite"
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_with(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite can only alter tables by copying them
+        render_as_batch=connection.dialect.name == "sqlite"
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run the migrations over a live connection."""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations_with(connection)
+        return
+    with get_engine().connect() as connection:
+        run_migrations_with(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,50 @@
+"""
+Initial schema: users and leaderboard.
+
+Matches the tables `Base.metadata.create_all` built before migrations were
+introduced, so existing databases are stamped at this revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "leaderboard",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("mode", sa.Enum("walls", "pass_through", name="gamemode"), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_leaderboard_user_id", "leaderboard", ["user_id"])
+    op.create_index("ix_leaderboard_mode", "leaderboard", ["mode"])
+
+
+def downgrade():
+    op.drop_table("leaderboard")
+    op.drop_table("users")
+    sa.Enum(name="gamemode").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,50 @@
+"""
+Add best_scores, one row per player and mode, filled from the leaderboard.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "best_scores",
+        sa.Column("user_id", sa.String(), primary_key=True),
+        # The gamemode type already exists on PostgreSQL
+        sa.Column("mode", postgresql.ENUM("walls", "pass_through", name="gamemode", create_type=False), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("entry_id", sa.String(), nullable=False),
+        sa.Column("achieved_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_best_scores_mode_score", "best_scores", ["mode", "score"])
+
+    op.execute(
+        """
+        INSERT INTO best_scores (user_id, mode, username, score, entry_id, achieved_at)
+        SELECT user_id, mode, username, score, id, created_at
+        FROM (
+            SELECT user_id, mode, username, score, id, created_at,
+                   row_number() OVER (
+                       PARTITION BY user_id, mode
+                       ORDER BY score DESC, created_at, id
+                   ) AS position
+            FROM leaderboard
+        ) AS ranked
+        WHERE position = 1
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("best_scores")
@@ -0,0 +1,59 @@
+"""
+Replace single-column leaderboard indexes with ones matching the queries.
+
+Top-N reads sort by score descending, then oldest, then id, per mode or
+across modes; personal bests look up a user's highest score in a mode. Each
+gets a composite index in that order, and the single-column `user_id` and
+`mode` indexes, now leading prefixes of the new ones, are dropped.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_leaderboard_mode_score", "leaderboard",
+        ["mode", sa.text("score DESC"), "created_at", "id"]
+    )
+    op.create_index(
+        "ix_leaderboard_score", "leaderboard",
+        [sa.text("score DESC"), "created_at", "id"]
+    )
+    op.create_index(
+        "ix_leaderboard_user_mode_score", "leaderboard",
+        ["user_id", "mode", sa.text("score DESC")]
+    )
+    op.drop_index("ix_leaderboard_user_id", table_name="leaderboard")
+    op.drop_index("ix_leaderboard_mode", table_name="leaderboard")
+
+    op.drop_index("ix_best_scores_mode_score", table_name="best_scores")
+    op.create_index(
+        "ix_best_scores_mode_score", "best_scores",
+        ["mode", sa.text("score DESC"), "achieved_at", "entry_id"]
+    )
+    op.create_index(
+        "ix_best_scores_score", "best_scores",
+        [sa.text("score DESC"), "achieved_at", "entry_id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_best_scores_score", table_name="best_scores")
+    op.drop_index("ix_best_scores_mode_score", table_name="best_scores")
+    op.create_index("ix_best_scores_mode_score", "best_scores", ["mode", "score"])
+
+    op.create_index("ix_leaderboard_mode", "leaderboard", ["mode"])
+    op.create_index("ix_leaderboard_user_id", "leaderboard", ["user_id"])
+    op.drop_index("ix_leaderboard_user_mode_score", table_name="leaderboard")
+    op.drop_index("ix_leaderboard_score", table_name="leaderboard")
+    op.drop_index("ix_leaderboard_mode_score", table_name="leaderboard")
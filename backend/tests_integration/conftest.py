@@ -4,17 +4,33 @@ Configuration for integration tests.
 This module provides fixtures for integration testing with a real SQLite database.
 Each test gets a fresh database instance with clean state.
 """
+import os
+
+# Cheap password hashing keeps seeding and logins fast; set before the app
+# reads its configuration
+os.environ.setdefault("PASSWORD_SCRYPT_N", "16")
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-import os
+from sqlalchemy.pool import NullPool
 import tempfile
 
 from app.main import app
 from app.db_models import Base
-from app.db_config import get_db
-from app.database import seed_database, set_current_user_session
+from app.db_config import get_db, to_async_url
+from app.database import seed_database
+from app.leaderboard_index import leaderboard_index
+from app.live_games import game_registry
+from app.rate_limit import MemoryBucketStore, rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    """Give each test empty rate limit buckets, since every test client shares one IP."""
+    rate_limiter.store = MemoryBucketStore()
 
 
 @pytest.fixture(scope="function")
@@ -56,17 +72,27 @@ def test_db():
         os.unlink(db_path)
 
 
+@pytest.fixture
+def engine():
+    """An engine on an empty temporary SQLite database, for tests that build the schema themselves."""
+    db_fd, db_path = tempfile.mkstemp(suffix=".db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
 @pytest.fixture(scope="function")
 def client(test_db: Session):
     """
     Create a test client with a test database.
     
-    This fixture overrides the database dependency to use the test database
-    and clears session state before each test.
+    This fixture overrides the database dependency to use the test database.
+    Each client has its own cookie jar, so every test starts logged out.
     """
-    # Clear any existing session state before each test
-    set_current_user_session(None)
-    
     def override_get_db():
         try:
             yield test_db
@@ -76,11 +102,38 @@ def client(test_db: Session):
     app.dependency_overrides[get_db] = override_get_db
     
     with TestClient(app) as test_client:
+        # Startup loaded the index from the default database; drop it so the
+        # first request reloads it from the test database instead
+        leaderboard_index.clear()
         yield test_client
     
-    # Clean up session state after test
-    set_current_user_session(None)
+    game_registry.clear()
     
     # Clean up dependency overrides
     app.dependency_overrides.clear()
 
+
+@pytest.fixture(scope="function")
+def async_client(test_db: Session):
+    """
+    Create a test client whose endpoints get an AsyncSession.
+    
+    The async engine (aiosqlite) opens the same temporary database as
+    `test_db`, so the seeded data is visible through either session.
+    """
+    # Without pooling no connection outlives the event loop that opened it
+    engine = create_async_engine(to_async_url(str(test_db.get_bind().url)), poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    
+    async def override_get_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+    
+    app.dependency_overrides[get_db] = override_get_db
+    
+    with TestClient(app) as test_client:
+        leaderboard_index.clear()
+        yield test_client
+    
+    game_registry.clear()
+    app.dependency_overrides.clear()
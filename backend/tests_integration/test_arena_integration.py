@@ -0,0 +1,294 @@
+"""
+Integration tests for multiplayer arenas.
+
+Tests the shared-grid rules (simultaneous moves, collisions between snakes,
+batched turns and food), placement of players in arenas by mode, bots, and
+playing and watching arenas over WebSockets.
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.arena_engine import Arena, ArenaFullError
+from app.arena_loop import ARENA_RESPAWN_TICKS, ArenaManager, arena_manager
+from app.models import ArenaState, Direction, GameMode, User
+
+
+def player(number: int) -> User:
+    return User(id=str(number), username=f"player{number}", email=f"player{number}@example.com")
+
+
+def heads(arena: Arena) -> dict:
+    size = arena.size
+    return {
+        snake.user.username: (snake.body[0] % size, snake.body[0] // size)
+        for snake in arena.snakes.values() if snake.alive
+    }
+
+
+def check_grid(arena: Arena):
+    """Occupancy and free list agree with the snakes and food."""
+    cells = [cell for snake in arena.snakes.values() for cell in snake.body]
+    assert len(cells) == len(set(cells))
+    assert sorted(cell for cell, taken in enumerate(arena.occupied) if taken) == sorted(cells)
+    assert sorted(arena.free) == sorted(set(range(arena.size ** 2)) - set(cells) - set(arena.food))
+    for index, cell in enumerate(arena.free):
+        assert arena.free_index[cell] == index
+
+
+@pytest.fixture
+def arena() -> Arena:
+    return Arena(GameMode.walls, size=20, food_count=0, seed=1)
+
+
+@pytest.fixture
+def manual_ticks(monkeypatch):
+    """Keep the app's arena loop from ticking on its own while a test steps it."""
+    monkeypatch.setattr(arena_manager, "interval", 3600)
+    yield
+    arena_manager.clear()
+
+
+class TestRules:
+    """Test one tick of the shared grid."""
+
+    def test_all_snakes_move(self, arena: Arena):
+        arena.place(player(1), [(5, 5), (4, 5), (3, 5)], Direction.RIGHT)
+        arena.place(player(2), [(5, 10), (5, 11), (5, 12)], Direction.UP)
+        assert arena.tick() == []
+        assert heads(arena) == {"player1": (6, 5), "player2": (5, 9)}
+        check_grid(arena)
+
+    def test_head_on_collision_kills_both(self, arena: Arena):
+        arena.place(player(1), [(5, 5), (4, 5), (3, 5)], Direction.RIGHT)
+        arena.place(player(2), [(7, 5), (8, 5), (9, 5)], Direction.LEFT)
+        died = arena.tick()
+        assert {snake.user.username for snake in died} == {"player1", "player2"}
+        assert heads(arena) == {}
+        check_grid(arena)
+
+    def test_hitting_a_body_kills_only_the_mover(self, arena: Arena):
+        snake = arena.place(player(1), [(5, 5), (5, 6), (5, 7)], Direction.UP)
+        arena.place(player(2), [(6, 4), (6, 5), (6, 6)], Direction.UP)
+        arena.steer(snake, Direction.RIGHT)
+        died = arena.tick()
+        assert [snake.user.username for snake in died] == ["player1"]
+        assert heads(arena) == {"player2": (6, 3)}
+        check_grid(arena)
+
+    def test_moving_tail_still_blocks(self, arena: Arena):
+        arena.place(player(1), [(5, 5), (4, 5), (3, 5)], Direction.RIGHT)
+        arena.place(player(2), [(3, 6), (3, 7), (3, 8)], Direction.UP)
+        died = arena.tick()
+        assert [snake.user.username for snake in died] == ["player2"]
+
+    def test_walls(self, arena: Arena):
+        arena.place(player(1), [(19, 5), (18, 5), (17, 5)], Direction.RIGHT)
+        assert len(arena.tick()) == 1
+
+    def test_pass_through_wraps(self):
+        arena = Arena(GameMode.pass_through, size=20, food_count=0)
+        arena.place(player(1), [(19, 5), (18, 5), (17, 5)], Direction.RIGHT)
+        assert arena.tick() == []
+        assert heads(arena) == {"player1": (0, 5)}
+
+    def test_last_turn_before_tick_wins(self, arena: Arena):
+        snake = arena.place(player(1), [(5, 5), (4, 5), (3, 5)], Direction.RIGHT)
+        arena.steer(snake, Direction.UP)
+        arena.steer(snake, Direction.DOWN)
+        arena.tick()
+        assert heads(arena) == {"player1": (5, 6)}
+        # Turns are used up by the tick they were sent before
+        arena.tick()
+        assert heads(arena) == {"player1": (5, 7)}
+
+    def test_reverse_ignored(self, arena: Arena):
+        snake = arena.place(player(1), [(5, 5), (4, 5), (3, 5)], Direction.RIGHT)
+        arena.steer(snake, Direction.LEFT)
+        assert arena.tick() == []
+        assert heads(arena) == {"player1": (6, 5)}
+
+    def test_eating(self):
+        arena = Arena(GameMode.pass_through, size=20, food_count=3, seed=4)
+        food = arena.food[0]
+        x, y = food % 20, food // 20
+        snake = arena.place(player(1), [((x - 1) % 20, y)], Direction.RIGHT)
+        arena.tick()
+        assert snake.score == 10
+        assert len(snake.body) == 2
+        assert food not in arena.food and len(arena.food) == 3
+        check_grid(arena)
+
+    def test_cells_taken(self, arena: Arena):
+        arena.place(player(1), [(5, 5), (4, 5), (3, 5)], Direction.RIGHT)
+        with pytest.raises(ArenaFullError):
+            arena.place(player(2), [(4, 5), (4, 6), (4, 7)], Direction.UP)
+
+    def test_document(self, arena: Arena):
+        arena.place(player(1), [(5, 5), (4, 5), (3, 5)], Direction.RIGHT)
+        state = ArenaState.model_validate_json(arena.document())
+        assert state.snakes[0].body[0].x == 5
+        assert state.snakes[0].username == "player1"
+        assert state.mode == GameMode.walls
+
+
+class TestSimulation:
+    """Test many ticks of bots on a full arena."""
+
+    @pytest.mark.parametrize("mode", list(GameMode))
+    def test_grid_stays_consistent(self, mode: GameMode):
+        arena = Arena(mode, seed=3)
+        for number in range(arena.max_snakes):
+            arena.join(player(number), bot=True)
+        for _ in range(300):
+            for snake in arena.tick():
+                arena.respawn(snake)
+        check_grid(arena)
+        assert len(arena.food) == arena.food_count
+        assert any(snake.score > 0 for snake in arena.snakes.values())
+
+    def test_full(self):
+        arena = Arena(GameMode.walls, max_snakes=2)
+        arena.join(player(1))
+        arena.join(player(2))
+        with pytest.raises(ArenaFullError):
+            arena.join(player(3))
+
+
+class TestManager:
+    """Test placing players in arenas."""
+
+    def test_fills_arenas_by_mode(self):
+        manager = ArenaManager(bots=0)
+        placed = [manager.join(player(number), GameMode.walls)[0] for number in range(20)]
+        other, _ = manager.join(player(99), GameMode.pass_through)
+        assert len({arena.id for arena in placed[:16]}) == 1
+        assert placed[16].id != placed[0].id
+        assert other.mode == GameMode.pass_through and other.id not in {arena.id for arena in placed}
+
+    def test_bots_make_way(self):
+        manager = ArenaManager(bots=15)
+        arena, _ = manager.join(player(1), GameMode.walls)
+        assert (arena.players, arena.bots) == (1, 15)
+        same, _ = manager.join(player(2), GameMode.walls)
+        assert same is arena
+        assert (arena.players, arena.bots) == (2, 14)
+
+    def test_closes_when_players_leave(self):
+        manager = ArenaManager(bots=3)
+        arena, snake = manager.join(player(1), GameMode.walls)
+        subscription = manager.channels[arena.id].subscribe()
+        manager.leave(arena, snake)
+        assert manager.arenas == {}
+        assert subscription.queue.get_nowait() is None
+
+    def test_bot_respawn(self):
+        manager = ArenaManager(bots=1)
+        arena, _ = manager.join(player(1), GameMode.walls)
+        bot = next(snake for snake in arena.snakes.values() if snake.bot)
+        # Point the bot at the wall
+        arena.leave(bot)
+        bot = arena.place(bot.user, [(0, 0), (1, 0), (2, 0)], Direction.LEFT, bot=True)
+        arena.bot_direction = lambda snake: snake.direction
+        manager.tick()
+        assert not bot.alive
+        for _ in range(ARENA_RESPAWN_TICKS - 1):
+            manager.tick()
+            assert not bot.alive
+        manager.tick()
+        assert bot.alive and bot.score == 0
+
+    def test_states_sent_each_tick(self):
+        manager = ArenaManager(bots=2)
+        arena, _ = manager.join(player(1), GameMode.walls)
+        subscription = manager.channels[arena.id].subscribe()
+        manager.tick()
+        manager.tick()
+        states = [ArenaState.model_validate_json(subscription.queue.get_nowait()) for _ in range(2)]
+        assert [state.tick for state in states] == [1, 2]
+        assert len(states[0].snakes) == 3
+
+
+class TestWebSockets:
+    """Test playing and watching arenas."""
+
+    def login(self, client: TestClient, number: int = 1):
+        client.post("/auth/login", json={"email": f"player{number}@example.com", "password": "password123"})
+
+    def test_play_requires_auth(self, client: TestClient):
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect("/arena/play") as websocket:
+                websocket.receive_json()
+
+    def test_play(self, manual_ticks, client: TestClient):
+        self.login(client)
+        with client.websocket_connect("/arena/play?mode=pass-through") as websocket:
+            joined = websocket.receive_json()
+            state = ArenaState.model_validate(websocket.receive_json())
+            assert state.id == joined["arenaId"]
+            assert [snake.id for snake in state.snakes] == [joined["snakeId"]]
+
+            arenas = client.get("/arena/active").json()
+            assert arenas == [{
+                "id": joined["arenaId"], "mode": "pass-through", "tier": joined["tier"],
+                "tick": 0, "players": 1, "bots": 0, "capacity": 16,
+            }]
+
+            snake = arena_manager.get(joined["arenaId"]).snakes[joined["snakeId"]]
+            turn = Direction.UP if snake.direction in (Direction.LEFT, Direction.RIGHT) else Direction.LEFT
+            websocket.send_json({"direction": turn.value})
+            # The turn waits for the tick; wait until the server has queued it
+            deadline = time.monotonic() + 5
+            while snake.turn is None and time.monotonic() < deadline:
+                time.sleep(0.001)
+            arena_manager.tick()
+            state = ArenaState.model_validate(websocket.receive_json())
+            assert state.tick == 1
+            assert state.snakes[0].direction == turn
+        assert client.get("/arena/active").json() == []
+
+    def test_invalid_turn(self, manual_ticks, client: TestClient):
+        self.login(client)
+        with client.websocket_connect("/arena/play") as websocket:
+            websocket.receive_json()
+            websocket.receive_json()
+            websocket.send_json({"direction": "SIDEWAYS"})
+            with pytest.raises(WebSocketDisconnect) as error:
+                websocket.receive_json()
+        assert error.value.code == 1007
+
+    def test_closes_when_snake_dies(self, manual_ticks, client: TestClient):
+        self.login(client)
+        with client.websocket_connect("/arena/play?mode=walls") as websocket:
+            arena_id = websocket.receive_json()["arenaId"]
+            websocket.receive_json()
+            for _ in range(arena_manager.get(arena_id).size + 1):
+                arena_manager.tick()
+                state = websocket.receive_json()
+                if not state["snakes"][0]["alive"]:
+                    break
+            with pytest.raises(WebSocketDisconnect):
+                websocket.receive_json()
+
+    def test_watch(self, manual_ticks, client: TestClient, monkeypatch):
+        monkeypatch.setattr(arena_manager, "bots", 4)
+        self.login(client)
+        with client.websocket_connect("/arena/play") as player_socket:
+            arena_id = player_socket.receive_json()["arenaId"]
+            with client.websocket_connect(f"/arena/watch/{arena_id}") as spectator:
+                assert len(ArenaState.model_validate(spectator.receive_json()).snakes) == 5
+                arena_manager.tick()
+                assert spectator.receive_json()["tick"] == 1
+
+    def test_watch_unknown(self, client: TestClient):
+        with client.websocket_connect("/arena/watch/missing") as spectator:
+            with pytest.raises(WebSocketDisconnect):
+                spectator.receive_json()
+
+    def test_metrics(self, manual_ticks, client: TestClient):
+        arena_manager.join(player(1), GameMode.walls)
+        lines = client.get("/metrics").text.splitlines()
+        assert "arenas_running 1" in lines
+        assert "arena_snakes 1" in lines
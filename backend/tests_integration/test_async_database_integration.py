@@ -0,0 +1,126 @@
+"""
+Integration tests for the async database path.
+
+Runs the auth and leaderboard flows with endpoints receiving an AsyncSession,
+and checks the `_async` CRUD functions against both kinds of session.
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app import database
+from app.database import (
+    create_leaderboard_entry_async,
+    ensure_leaderboard_index_async,
+    get_leaderboard_async,
+    get_user_best_score_async,
+    get_user_by_email_async,
+    verify_password_async
+)
+from app.db_config import to_async_url
+from app.leaderboard_index import leaderboard_index
+from app.models import GameMode
+
+
+class TestAsyncEndpoints:
+    """Test endpoints served through an AsyncSession."""
+    
+    def test_login_and_me(self, async_client: TestClient):
+        """Test logging in with credentials checked through the async engine."""
+        response = async_client.post(
+            "/auth/login",
+            json={"email": "player1@example.com", "password": "password123"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["username"] == "player1"
+        assert async_client.get("/auth/me").json()["username"] == "player1"
+    
+    def test_signup_duplicate_rejected(self, async_client: TestClient):
+        """Test signup checks and inserts through the async engine."""
+        user = {"username": "asyncuser", "email": "async@example.com", "password": "secret"}
+        
+        assert async_client.post("/auth/signup", json=user).status_code == 200
+        assert async_client.post("/auth/signup", json=user).status_code == 400
+    
+    def test_submit_and_read_leaderboard(self, async_client: TestClient):
+        """Test that a score submitted through the async engine is ranked."""
+        async_client.post(
+            "/auth/login",
+            json={"email": "rookie@example.com", "password": "password123"}
+        )
+        
+        response = async_client.post("/leaderboard", json={"score": 900, "mode": "walls"})
+        assert response.status_code == 200
+        assert response.json()["entry"]["date"]
+        
+        entries = async_client.get("/leaderboard?mode=walls").json()
+        assert entries[0]["score"] == 900
+        assert entries[0]["username"] == "rookie"
+        assert async_client.get("/leaderboard/rank?score=900&mode=walls").json()["rank"] == 1
+
+
+class TestAsyncCrud:
+    """Test the async CRUD functions directly."""
+    
+    def test_plain_session_supported(self, test_db: Session):
+        """Test that the async functions also accept a synchronous Session."""
+        user = asyncio.run(get_user_by_email_async(test_db, "ninja@example.com"))
+        
+        assert user.username == "ninja"
+        assert asyncio.run(get_user_best_score_async(test_db, user.id, GameMode.pass_through)) == 410
+    
+    def test_concurrent_sessions(self, test_db: Session):
+        """Test many async sessions querying and writing concurrently."""
+        engine = create_async_engine(to_async_url(str(test_db.get_bind().url)), poolclass=NullPool)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        
+        async def read():
+            async with sessions() as db:
+                return await get_leaderboard_async(db, GameMode.walls)
+        
+        async def login():
+            async with sessions() as db:
+                assert isinstance(db, AsyncSession)
+                return await verify_password_async(db, "champion@example.com", "password123")
+        
+        async def write(score):
+            async with sessions() as db:
+                return await create_leaderboard_entry_async(db, "7", "champion", score, GameMode.walls)
+        
+        async def run():
+            return await asyncio.gather(*[read() for _ in range(10)], login(), write(1000), write(1001))
+        
+        results = asyncio.run(run())
+        
+        assert all(entries[0].score == 505 for entries in results[:10])
+        assert results[10].username == "champion"
+        assert {results[11].score, results[12].score} == {1000, 1001}
+        assert results[11].created_at is not None
+        
+        top = asyncio.run(get_leaderboard_async(test_db, GameMode.walls, limit=2))
+        assert [entry.score for entry in top] == [1001, 1000]
+    
+    def test_concurrent_first_index_loads(self, test_db: Session, monkeypatch):
+        """Test that requests racing to load the index share one load and all finish."""
+        engine = create_async_engine(to_async_url(str(test_db.get_bind().url)), poolclass=NullPool)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        loads = []
+        load = database.load_leaderboard_index
+        monkeypatch.setattr(database, "load_leaderboard_index", lambda db: loads.append(db) or load(db))
+        
+        async def ensure():
+            async with sessions() as db:
+                await ensure_leaderboard_index_async(db)
+        
+        async def run():
+            await asyncio.wait_for(asyncio.gather(*[ensure() for _ in range(5)]), 10)
+        
+        leaderboard_index.clear()
+        asyncio.run(run())
+        
+        assert len(loads) == 1
+        assert leaderboard_index.count(GameMode.walls) == 6
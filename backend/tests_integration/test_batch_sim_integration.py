@@ -0,0 +1,88 @@
+"""
+Integration tests for the vectorized batch simulator.
+
+Every game in a batch must play out exactly like a `SnakeEngine` with the
+same seed and the same turns.
+"""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.batch_sim import BatchSimulator, greedy_policy, mulberry32
+from app.bot import DIRECTIONS, greedy_direction
+from app.engine import Mulberry32, SnakeEngine
+from app.models import GameMode, GameStatus
+
+
+def engine_matches(sim: BatchSimulator, i: int, engine: SnakeEngine) -> bool:
+    cells = np.roll(sim.body[i], -int(sim.head[i]))[:sim.length[i]]
+    return (
+        [int(cell) for cell in cells] == engine.cells()
+        and int(sim.food[i]) == engine.food
+        and int(sim.score[i]) == engine.score
+        and bool(sim.playing[i]) == (engine.status == GameStatus.playing)
+    )
+
+
+class TestBatchSimulator:
+    """Test lockstep simulation against the scalar engine."""
+
+    def test_mulberry32_matches_engine(self):
+        """Test that the vectorized generator yields the engine's sequence."""
+        seeds = [0, 1, 12345, 2 ** 32 - 1]
+        state = np.array(seeds, dtype=np.uint32)
+        generators = [Mulberry32(seed) for seed in seeds]
+
+        for _ in range(5):
+            state, outputs = mulberry32(state)
+            assert outputs.tolist() == [g.next_uint32() for g in generators]
+
+    @pytest.mark.parametrize("mode", [GameMode.walls, GameMode.pass_through])
+    def test_greedy_policy_matches_scalar_bot(self, mode):
+        """Test that the vectorized bot makes the scalar bot's moves."""
+        seeds = list(range(40))
+        sim = BatchSimulator(mode, seeds)
+        sim.run(greedy_policy, max_ticks=300)
+
+        for i, seed in enumerate(seeds):
+            engine = SnakeEngine(mode, seed)
+            engine.start()
+            for _ in range(300):
+                engine.change_direction(greedy_direction(engine))
+                if not engine.step():
+                    break
+            assert engine_matches(sim, i, engine)
+
+    @pytest.mark.parametrize("mode", [GameMode.walls, GameMode.pass_through])
+    def test_random_turns_match_engine(self, mode):
+        """Test crashes, growth and food placement under random turns."""
+        seeds = list(range(100, 160))
+        turns = random.Random(3)
+        moves = [[turns.randrange(-4, 4) for _ in seeds] for _ in range(400)]
+
+        def scripted(sim, rows):
+            return np.array(moves[sim.ticks[rows[0]]], dtype=np.int8)[rows]
+
+        sim = BatchSimulator(mode, seeds)
+        sim.run(scripted, max_ticks=400)
+        assert not sim.playing.all()
+
+        for i, seed in enumerate(seeds):
+            engine = SnakeEngine(mode, seed)
+            engine.start()
+            for tick in range(400):
+                if moves[tick][i] >= 0:
+                    engine.change_direction(DIRECTIONS[moves[tick][i]])
+                if not engine.step():
+                    break
+            assert engine_matches(sim, i, engine)
+
+    def test_reset_replays_same_games(self):
+        """Test that resetting with the same seeds reproduces the same results."""
+        sim = BatchSimulator(GameMode.pass_through, range(20))
+        first = sim.run(max_ticks=200).copy()
+
+        sim.reset(range(20))
+        assert (sim.run(max_ticks=200) == first).all()
@@ -0,0 +1,120 @@
+"""
+Integration tests for the best score table.
+
+Tests that each player's best score per mode is kept up to date as scores
+are recorded, and the one-entry-per-player leaderboard built from it.
+"""
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import (
+    create_leaderboard_entry,
+    get_unique_leaderboard,
+    get_user_best_score,
+    rebuild_best_scores
+)
+from app.db_models import DBBestScore, DBLeaderboardEntry
+from app.models import GameMode
+from app.write_behind import leaderboard_writer
+
+
+def login(client: TestClient):
+    client.post(
+        "/auth/login",
+        json={
+            "email": "player1@example.com",
+            "password": "password123"
+        }
+    )
+
+
+class TestBestScores:
+    """Test maintenance of the best score table."""
+
+    def test_seeded_best_scores(self, test_db: Session):
+        """Test that seeding fills one row per player and mode."""
+        assert test_db.query(DBBestScore).count() == 10
+        assert get_user_best_score(test_db, "2", GameMode.walls) == 380
+        assert get_user_best_score(test_db, "2", GameMode.pass_through) == 340
+        assert get_user_best_score(test_db, "1", GameMode.walls) is None
+
+    def test_raised_only_by_higher_scores(self, test_db: Session):
+        """Test that a lower or equal score leaves the best score alone."""
+        better = create_leaderboard_entry(test_db, "3", "snakemaster", 470, GameMode.walls)
+        create_leaderboard_entry(test_db, "3", "snakemaster", 460, GameMode.walls)
+        create_leaderboard_entry(test_db, "3", "snakemaster", 470, GameMode.walls)
+
+        best = test_db.get(DBBestScore, ("3", GameMode.walls))
+        assert best.score == 470
+        assert best.entry_id == better.id
+
+    def test_first_score_for_mode(self, test_db: Session):
+        """Test that a player's first score in a mode becomes their best."""
+        create_leaderboard_entry(test_db, "1", "player1", 10, GameMode.walls)
+
+        assert get_user_best_score(test_db, "1", GameMode.walls) == 10
+
+    def test_rebuild(self, test_db: Session):
+        """Test that the table is recomputed from the leaderboard."""
+        test_db.query(DBBestScore).delete()
+        test_db.add(DBLeaderboardEntry(id="11", user_id="6", username="ninja", score=300, mode=GameMode.walls))
+        test_db.commit()
+
+        rebuild_best_scores(test_db)
+        test_db.commit()
+
+        assert test_db.query(DBBestScore).count() == 10
+        assert get_user_best_score(test_db, "6", GameMode.walls) == 300
+        assert test_db.get(DBBestScore, ("6", GameMode.walls)).entry_id == "11"
+
+
+class TestUniqueLeaderboard:
+    """Test the one-entry-per-player leaderboard."""
+
+    def test_one_entry_per_player(self, client: TestClient):
+        """Test that players with several scores appear once, with their best."""
+        response = client.get("/leaderboard?unique=true")
+
+        assert response.status_code == 200
+        entries = response.json()
+        usernames = [e["username"] for e in entries]
+        assert len(usernames) == len(set(usernames)) == 8
+        assert [e["score"] for e in entries] == [505, 450, 410, 380, 320, 290, 260, 150]
+        assert entries[2]["mode"] == "pass-through"
+
+    def test_filter_by_mode(self, client: TestClient):
+        """Test the unique view for a single mode."""
+        entries = client.get("/leaderboard?unique=true&mode=walls").json()
+
+        assert [e["username"] for e in entries] == ["champion", "snakemaster", "speedrunner", "gamer99", "ninja", "rookie"]
+
+    def test_new_best_replaces_entry(self, client: TestClient):
+        """Test that a submitted personal best replaces the player's entry."""
+        login(client)
+        entry = client.post("/leaderboard", json={"score": 600, "mode": "pass-through"}).json()["entry"]
+        client.post("/leaderboard", json={"score": 100, "mode": "pass-through"})
+
+        entries = client.get("/leaderboard?unique=true").json()
+
+        assert entries[0]["id"] == entry["id"]
+        assert [e["username"] for e in entries].count("player1") == 1
+
+    def test_limit(self, test_db: Session):
+        """Test that the limit counts players, not rows."""
+        entries = get_unique_leaderboard(test_db, limit=3)
+
+        assert [e.username for e in entries] == ["champion", "snakemaster", "ninja"]
+
+    def test_includes_pending_scores(self, client: TestClient, test_db: Session):
+        """Test that queued write-behind scores count before they are written."""
+        client.portal.call(leaderboard_writer.start, sessionmaker(bind=test_db.get_bind()))
+        try:
+            login(client)
+            entry = client.post("/leaderboard", json={"score": 990, "mode": "walls"}).json()["entry"]
+
+            assert client.get("/leaderboard?unique=true").json()[0]["id"] == entry["id"]
+            assert get_user_best_score(test_db, "1", GameMode.walls) == 990
+        finally:
+            client.portal.call(leaderboard_writer.stop)
+
+        assert test_db.get(DBBestScore, ("1", GameMode.walls)).score == 990
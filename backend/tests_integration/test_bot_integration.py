@@ -0,0 +1,77 @@
+"""
+Integration tests for the greedy bot port.
+
+Checks the move ordering against results recorded from V8's
+Array.prototype.sort and the bot's choices on simple boards.
+"""
+from app.bot import compare_moves, greedy_direction, v8_sort
+from app.engine import SnakeEngine, to_cell
+from app.models import Direction, GameMode, GameState, GameStatus, Position, Snake
+
+
+def make_engine(body, direction, food, mode=GameMode.walls) -> SnakeEngine:
+    state = GameState(
+        snake=Snake(body=[Position(x=x, y=y) for x, y in body], direction=direction),
+        food=Position(x=food[0], y=food[1]),
+        score=0,
+        status=GameStatus.playing,
+        mode=mode
+    )
+    return SnakeEngine.from_game_state(state)
+
+
+class TestV8Sort:
+    """Test the emulation of V8's sort for short arrays."""
+
+    def test_consistent_comparator(self):
+        """Test that a consistent comparator sorts normally and stably."""
+        items = [(3, "a"), (1, "b"), (2, "c"), (1, "d"), (5, "e")]
+
+        assert v8_sort(items, lambda a, b: a[0] - b[0]) == sorted(items, key=lambda item: item[0])
+
+    def test_matches_browser_on_cyclic_moves(self):
+        """Test the bot comparator's cycles against results recorded in Node."""
+        a = ("a", 5, 1)
+        b = ("b", 7, 2)
+        c = ("c", 9, 3)
+        expected = {
+            "abc": "cba", "acb": "acb", "bac": "bac",
+            "bca": "acb", "cab": "bac", "cba": "cba",
+        }
+
+        for order, result in expected.items():
+            moves = [{"a": a, "b": b, "c": c}[name] for name in order]
+            assert "".join(move[0] for move in v8_sort(moves, compare_moves)) == result
+
+
+class TestGreedyBot:
+    """Test the greedy bot's choices."""
+
+    def test_prefers_room_from_body(self):
+        """Test that the bot picks the move that keeps a gap from its body."""
+        body = [(10, 10), (10, 11), (11, 11), (12, 11)]
+        engine = make_engine(body, Direction.UP, food=(15, 10))
+
+        # RIGHT would sit next to the body, UP and LEFT tie and keep bot order
+        assert greedy_direction(engine) == Direction.UP
+
+    def test_avoids_wall(self):
+        """Test that the bot never drives into a wall in walls mode."""
+        engine = make_engine([(19, 5), (18, 5), (17, 5)], Direction.RIGHT, food=(19, 0))
+
+        assert greedy_direction(engine) == Direction.UP
+
+    def test_wraps_off_edge(self):
+        """Test that moving off the grid is allowed in pass-through mode."""
+        body = [(19, 5), (19, 4), (18, 4), (17, 4)]
+        engine = make_engine(body, Direction.DOWN, food=(0, 5), mode=GameMode.pass_through)
+
+        assert greedy_direction(engine) == Direction.RIGHT
+
+    def test_trapped_keeps_direction(self):
+        """Test that the bot keeps its direction when every move is fatal."""
+        body = [(0, 0), (1, 0), (1, 1), (0, 1)]
+        engine = make_engine(body, Direction.LEFT, food=(10, 10))
+
+        assert engine.occupied[to_cell(0, 1)]
+        assert greedy_direction(engine) == Direction.LEFT
@@ -0,0 +1,215 @@
+"""
+Integration tests for server-hosted bots.
+
+Tests that bots are listed and watchable like human players, that their
+frames rebuild the engine's state on spectators and other workers, that the
+scheduler stays within its budget per tick by lowering every bot's tick
+rate, and that bots respawn after losing.
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app import admin, bot_scheduler
+from app.bot_scheduler import BOT_RESPAWN_TICKS, BotScheduler
+from app.bus import LocalBus, LocalHub
+from app.engine import GRID_SIZE
+from app.frame_codec import FrameCodec
+from app.live_games import GameRegistry, game_registry
+from app.models import Direction, GameMode, GameStatus
+
+
+TOKEN = "admin-secret"
+
+
+class FakeClock:
+    """Advances by a fixed step every time it is read."""
+
+    def __init__(self, step: float):
+        self.step = step
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now += self.step
+        return self.now
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = BotScheduler(registry=game_registry, budget_ms=1000, seed=7)
+    yield scheduler
+    scheduler.remove(len(scheduler.bots))
+
+
+@pytest.fixture
+def reckless(monkeypatch):
+    """Make bots head straight for the top wall instead of playing well."""
+    monkeypatch.setattr(bot_scheduler, "greedy_direction", lambda engine: Direction.UP)
+
+
+def play_until_over(scheduler: BotScheduler, limit: int = 100):
+    bot = next(bot for bot in scheduler.bots if bot.engine.mode == GameMode.walls)
+    for _ in range(limit):
+        scheduler.tick()
+        if bot.game is None:
+            return bot
+    pytest.fail("bot never lost")
+
+
+class TestSpectating:
+    """Test watching bots through the spectator endpoints."""
+
+    def test_listed_as_active(self, client: TestClient, scheduler: BotScheduler):
+        scheduler.add(3)
+        players = client.get("/spectator/active").json()
+        assert sorted(player["username"] for player in players) == ["Bot 1", "Bot 2", "Bot 3"]
+        assert {player["mode"] for player in players} == {"walls", "pass-through"}
+
+    def test_json_stream(self, client: TestClient, scheduler: BotScheduler):
+        bot = scheduler.add(1)[0]
+        with client.websocket_connect(f"/spectator/watch/{bot.game.id}") as spectator:
+            assert spectator.receive_json()["status"] == "playing"
+            scheduler.tick()
+            assert spectator.receive_json() == bot.engine.to_game_state().model_dump(mode="json")
+
+    def test_binary_stream(self, client: TestClient, scheduler: BotScheduler):
+        bot = scheduler.add(1)[0]
+        with client.websocket_connect(f"/spectator/watch/{bot.game.id}?format=binary") as spectator:
+            codec = FrameCodec()
+            codec.decode(spectator.receive_bytes())
+            for _ in range(5):
+                scheduler.tick()
+                codec.decode(spectator.receive_bytes())
+                assert codec.to_game_state() == bot.engine.to_game_state()
+
+    def test_stream_ends_with_game(self, client: TestClient, scheduler: BotScheduler, reckless):
+        bot = scheduler.add(2)[1]
+        with client.websocket_connect(f"/spectator/watch/{bot.game.id}") as spectator:
+            spectator.receive_json()
+            play_until_over(scheduler)
+            states = []
+            with pytest.raises(WebSocketDisconnect):
+                while True:
+                    states.append(spectator.receive_json())
+        assert states[-1]["status"] == "game-over"
+
+
+class TestFrames:
+    """Test the frames bots broadcast."""
+
+    def test_mirrored_by_other_workers(self):
+        hub = LocalHub()
+        registry = GameRegistry(bus=LocalBus(hub))
+        mirror = GameRegistry(bus=LocalBus(hub))
+        mirror.subscribe()
+        scheduler = BotScheduler(registry=registry, budget_ms=1000, seed=3)
+        scheduler.add(4)
+        for _ in range(120):
+            scheduler.tick()
+            for bot in scheduler.bots:
+                if bot.game is not None:
+                    assert mirror.get(bot.game.id).state == bot.engine.to_game_state()
+        scheduler.remove(4)
+        assert mirror.active_players() == []
+
+    def test_eating_keeps_tail(self, reckless):
+        scheduler = BotScheduler(registry=GameRegistry(bus=LocalBus()), budget_ms=1000, seed=11)
+        bot = scheduler.add(2)[1]
+        # Put the food right above the head, where the reckless bot is going
+        bot.engine.food = bot.engine.head_cell - GRID_SIZE
+        scheduler.tick()
+        assert bot.engine.score == 10
+        assert bot.game.state == bot.engine.to_game_state()
+        assert len(bot.game.state.snake.body) == 4
+
+
+class TestScheduling:
+    """Test the budget per tick and bot lifecycle."""
+
+    def test_budget_limits_bots_per_tick(self):
+        # Every step reads the clock once, so a 1 ms clock step allows 5 bots in 5 ms
+        scheduler = BotScheduler(registry=GameRegistry(bus=LocalBus()), budget_ms=5, clock=FakeClock(0.001))
+        scheduler.add(20)
+        assert scheduler.tick() == 5
+        assert scheduler.coverage == 0.25
+        assert scheduler.tick_rate == pytest.approx(0.25 / scheduler.interval)
+
+    def test_tick_loop_stats(self):
+        """Test that a tick through the loop is timed and counted towards its load."""
+        scheduler = BotScheduler(registry=GameRegistry(bus=LocalBus()), budget_ms=5, clock=FakeClock(0.001))
+        scheduler.add(20)
+        scheduler.loop.tick()
+        assert scheduler.loop.durations.count() == 1
+        assert scheduler.loop.load > 0
+        assert "bot_late_ticks_total 0" in scheduler.expose().splitlines()
+
+    def test_round_robin(self):
+        scheduler = BotScheduler(registry=GameRegistry(bus=LocalBus()), budget_ms=5, clock=FakeClock(0.001))
+        scheduler.add(20)
+        first = scheduler.bots[0].game.codec.seq
+        for _ in range(4):
+            scheduler.tick()
+        # Four ticks of five bots reach each of the twenty exactly once
+        assert {bot.game.codec.seq for bot in scheduler.bots} == {first + 1}
+
+    def test_within_budget_steps_everyone(self, scheduler: BotScheduler):
+        scheduler.add(10)
+        assert scheduler.tick() == 10
+        assert scheduler.coverage == 1.0
+
+    def test_respawn(self, scheduler: BotScheduler, reckless):
+        scheduler.add(2)
+        bot = play_until_over(scheduler)
+        for _ in range(BOT_RESPAWN_TICKS - 1):
+            scheduler.tick()
+            assert bot.game is None
+        scheduler.tick()
+        assert bot.game is not None
+        assert bot.game.codec.status == GameStatus.playing
+        assert bot.engine.score == 0
+
+    def test_resize(self, scheduler: BotScheduler):
+        scheduler.resize(5)
+        assert len(game_registry.games) == 5
+        scheduler.resize(2)
+        assert len(game_registry.games) == 2
+        assert [bot.user.username for bot in scheduler.bots] == ["Bot 1", "Bot 2"]
+
+    def test_stop_ends_games(self):
+        scheduler = BotScheduler(registry=GameRegistry(bus=LocalBus()), interval=0.001, seed=5)
+
+        async def run():
+            await scheduler.start(3)
+            await asyncio.sleep(0.02)
+            await scheduler.stop()
+
+        asyncio.run(run())
+        assert scheduler.ticks > 1
+        assert scheduler.bots == []
+        assert scheduler.registry.games == {}
+
+
+class TestAdmin:
+    """Test changing the number of bots at runtime."""
+
+    def test_set_count(self, client: TestClient, monkeypatch):
+        monkeypatch.setattr(admin, "ADMIN_TOKEN", TOKEN)
+        response = client.put("/admin/bots?count=4", headers={"X-Admin-Token": TOKEN})
+        assert response.status_code == 200
+        assert response.json()["bots"] == 4
+        assert len(client.get("/spectator/active").json()) == 4
+        assert client.put("/admin/bots?count=0", headers={"X-Admin-Token": TOKEN}).json()["bots"] == 0
+
+    def test_requires_token(self, client: TestClient, monkeypatch):
+        monkeypatch.setattr(admin, "ADMIN_TOKEN", TOKEN)
+        assert client.put("/admin/bots?count=4").status_code == 403
+
+    def test_metrics(self, client: TestClient, monkeypatch):
+        monkeypatch.setattr(admin, "ADMIN_TOKEN", TOKEN)
+        client.put("/admin/bots?count=2", headers={"X-Admin-Token": TOKEN})
+        lines = client.get("/metrics").text.splitlines()
+        client.put("/admin/bots?count=0", headers={"X-Admin-Token": TOKEN})
+        assert "bots_running 2" in lines
+        assert "# TYPE bot_tick_duration_seconds histogram" in lines
@@ -0,0 +1,204 @@
+"""
+Integration tests for the server-side snake engine.
+
+Checks the engine against a direct port of the frontend's gameLogic.ts rules.
+"""
+import random
+
+import pytest
+
+from app.engine import GRID_SIZE, Mulberry32, SnakeEngine, to_cell
+from app.models import Direction, GameMode, GameState, GameStatus, Position, Snake
+
+
+# Reference port of gameLogic.ts, kept deliberately literal
+
+MOVES = {"UP": (0, -1), "DOWN": (0, 1), "LEFT": (-1, 0), "RIGHT": (1, 0)}
+OPPOSITE = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
+
+
+def reference_move(state: dict, next_food) -> dict:
+    """moveSnake(), with generateFood() replaced by `next_food`."""
+    head = state["body"][0]
+    dx, dy = MOVES[state["direction"]]
+    new_head = (head[0] + dx, head[1] + dy)
+
+    if state["mode"] == "pass-through":
+        new_head = ((new_head[0] + GRID_SIZE) % GRID_SIZE, (new_head[1] + GRID_SIZE) % GRID_SIZE)
+    elif not (0 <= new_head[0] < GRID_SIZE and 0 <= new_head[1] < GRID_SIZE):
+        return {**state, "status": "game-over"}
+
+    if new_head in state["body"][1:]:
+        return {**state, "status": "game-over"}
+
+    new_body = [new_head] + state["body"]
+    ate_food = new_head == state["food"]
+    if not ate_food:
+        new_body.pop()
+
+    return {
+        **state,
+        "body": new_body,
+        "food": next_food(new_body) if ate_food else state["food"],
+        "score": state["score"] + 10 if ate_food else state["score"],
+    }
+
+
+def engine_snapshot(engine: SnakeEngine) -> dict:
+    state = engine.to_game_state()
+    return {
+        "body": [(p.x, p.y) for p in state.snake.body],
+        "direction": state.snake.direction.value,
+        "food": (state.food.x, state.food.y),
+        "score": state.score,
+        "status": state.status.value,
+        "mode": state.mode.value,
+    }
+
+
+class TestMulberry32:
+    """Test the food placement random generator."""
+
+    def test_matches_javascript(self):
+        """Test outputs against the JavaScript mulberry32 implementation."""
+        expected = {
+            0: [1144304738, 1416247, 958946056],
+            1: [2693262067, 11749833, 2265367787],
+            42: [2581720956, 1925393290, 3661312704],
+            4294967295: [3850105811, 813802916, 3073704848],
+        }
+        for seed, values in expected.items():
+            rng = Mulberry32(seed)
+            assert [rng.next_uint32() for _ in range(3)] == values
+
+    def test_below_matches_floor_of_random(self):
+        """Test that below(n) equals Math.floor(Math.random() * n)."""
+        a, b = Mulberry32(7), Mulberry32(7)
+        for n in [1, 2, 3, 397, 400]:
+            assert a.below(n) == int(b.random() * n)
+
+
+class TestSnakeEngine:
+    """Test that the engine follows the frontend game rules."""
+
+    def test_initial_state(self):
+        """Test that a new game matches createInitialGameState()."""
+        engine = SnakeEngine(GameMode.walls, seed=1)
+        state = engine.to_game_state()
+
+        assert [(p.x, p.y) for p in state.snake.body] == [(10, 10), (9, 10), (8, 10)]
+        assert state.snake.direction == Direction.RIGHT
+        assert state.status == GameStatus.idle
+        assert state.score == 0
+        assert state.food not in state.snake.body
+
+    @pytest.mark.parametrize("mode", [GameMode.walls, GameMode.pass_through])
+    def test_matches_reference_rules(self, mode: GameMode):
+        """Test random games step for step against the reference rules."""
+        choices = random.Random(1234)
+        for seed in range(40):
+            engine = SnakeEngine(mode, seed=seed)
+            engine.start()
+            expected = engine_snapshot(engine)
+
+            for _ in range(400):
+                if choices.random() < 0.3:
+                    direction = choices.choice(list(Direction))
+                    engine.change_direction(direction)
+                    if OPPOSITE[expected["direction"]] != direction.value:
+                        expected["direction"] = direction.value
+
+                engine.step()
+                expected = reference_move(expected, lambda body, engine=engine: engine_snapshot(engine)["food"])
+                actual = engine_snapshot(engine)
+                assert actual == expected
+                assert actual["food"] not in actual["body"] or actual["status"] == "game-over"
+                if actual["status"] == "game-over":
+                    break
+
+    def test_walls_end_game(self):
+        """Test that leaving the grid ends a walls game."""
+        engine = SnakeEngine(GameMode.walls)
+        engine.start()
+        steps = 0
+        while engine.step():
+            steps += 1
+
+        assert steps == 9
+        assert engine.status == GameStatus.game_over
+        assert engine.to_game_state().snake.body[0] == Position(x=19, y=10)
+
+    def test_pass_through_wraps(self):
+        """Test that the head wraps around in pass-through mode."""
+        engine = SnakeEngine(GameMode.pass_through)
+        engine.food = to_cell(0, 0)
+        engine.start()
+        for _ in range(10):
+            assert engine.step()
+
+        assert engine.to_game_state().snake.body[0] == Position(x=0, y=10)
+
+    def test_reverse_direction_ignored(self):
+        """Test that turning back onto the body is ignored."""
+        engine = SnakeEngine(GameMode.walls)
+        engine.change_direction(Direction.LEFT)
+        assert engine.direction == Direction.RIGHT
+
+        engine.change_direction(Direction.UP)
+        assert engine.direction == Direction.UP
+
+    def test_moving_into_tail_ends_game(self):
+        """Test that the tail counts as a collision even though it would move."""
+        state = GameState(
+            snake=Snake(
+                body=[Position(x=0, y=0), Position(x=1, y=0), Position(x=1, y=1), Position(x=0, y=1)],
+                direction=Direction.LEFT
+            ),
+            food=Position(x=5, y=5),
+            score=10,
+            status=GameStatus.playing,
+            mode=GameMode.pass_through
+        )
+        engine = SnakeEngine.from_game_state(state)
+        engine.change_direction(Direction.DOWN)
+
+        assert not engine.step()
+        assert engine.status == GameStatus.game_over
+
+    def test_eating_grows_and_scores(self):
+        """Test that eating grows the snake and places new food elsewhere."""
+        engine = SnakeEngine(GameMode.walls, seed=3)
+        engine.food = to_cell(11, 10)
+        engine.start()
+
+        assert engine.step()
+        state = engine.to_game_state()
+        assert len(state.snake.body) == 4
+        assert state.score == 10
+        assert state.food not in state.snake.body
+
+    def test_game_state_round_trip(self):
+        """Test conversion to and from GameState models."""
+        engine = SnakeEngine(GameMode.pass_through, seed=9)
+        engine.start()
+        for _ in range(15):
+            engine.step()
+        state = engine.to_game_state()
+
+        assert SnakeEngine.from_game_state(state).to_game_state() == state
+
+    def test_same_seed_same_game(self):
+        """Test that a seed fully determines food placement."""
+        games = []
+        for _ in range(2):
+            engine = SnakeEngine(GameMode.pass_through, seed=99)
+            engine.start()
+            foods = []
+            for tick in range(300):
+                if tick % 7 == 0:
+                    engine.change_direction([Direction.UP, Direction.LEFT][tick % 2])
+                engine.step()
+                foods.append(engine.food)
+            games.append(foods)
+
+        assert games[0] == games[1]
@@ -0,0 +1,166 @@
+"""
+Integration tests for the binary game state frame codec.
+
+Tests that streams of GameState models survive the round trip through
+keyframes and deltas unchanged.
+"""
+import pytest
+
+from app.frame_codec import FrameCodec, FrameCodecError, pack_cell, pack_meta
+from app.models import Direction, GameMode, GameState, GameStatus, Position, Snake
+
+
+def make_state(body, food=(15, 10), score=0, status=GameStatus.playing,
+               direction=Direction.RIGHT, mode=GameMode.walls) -> GameState:
+    return GameState(
+        snake=Snake(body=[Position(x=x, y=y) for x, y in body], direction=direction),
+        food=Position(x=food[0], y=food[1]),
+        score=score,
+        status=status,
+        mode=mode
+    )
+
+
+def play_states():
+    """A short game: move right, eat, turn down, then die."""
+    body = [(10, 10), (9, 10), (8, 10)]
+    food = (15, 10)
+    score = 0
+    states = [make_state(body, food=food)]
+    for _ in range(5):
+        head = (body[0][0] + 1, body[0][1])
+        if head == food:
+            body = [head] + body
+            food = (3, 4)
+            score += 10
+        else:
+            body = [head] + body[:-1]
+        states.append(make_state(body, food=food, score=score))
+    for _ in range(3):
+        body = [(body[0][0], body[0][1] + 1)] + body[:-1]
+        states.append(make_state(body, food=food, score=score, direction=Direction.DOWN))
+    states.append(states[-1].model_copy(update={"status": GameStatus.game_over}))
+    return states
+
+
+class TestFrameCodec:
+    """Test encoding and decoding frame streams."""
+
+    def test_round_trip(self):
+        """Test that every state is rebuilt exactly on the receiving side."""
+        sender = FrameCodec()
+        receiver = FrameCodec()
+
+        for state in play_states():
+            receiver.decode(sender.encode(state))
+            assert receiver.to_game_state() == state
+
+    def test_first_frame_is_keyframe_then_deltas(self):
+        """Test that only the first frame carries the whole state."""
+        sender = FrameCodec()
+        frames = [sender.encode(state) for state in play_states()]
+
+        assert frames[0][0] == ord("K")
+        assert all(frame[0] == ord("D") for frame in frames[1:])
+
+        # A plain move is a few bytes regardless of the snake's length
+        assert len(frames[1]) == 8
+        assert len(frames[1]) * 10 < len(play_states()[1].model_dump_json())
+
+    def test_periodic_keyframes(self):
+        """Test that a keyframe is sent every keyframe_interval frames."""
+        sender = FrameCodec(keyframe_interval=3)
+        frames = [sender.encode(state) for state in play_states()]
+
+        assert [frame[0] for frame in frames[:7]] == [ord(c) for c in "KDDKDDK"]
+
+    def test_keyframe_joins_stream(self):
+        """Test that a receiver can join mid-stream from a keyframe."""
+        sender = FrameCodec()
+        states = play_states()
+        for state in states[:4]:
+            sender.encode(state)
+
+        receiver = FrameCodec()
+        receiver.decode(sender.keyframe())
+        assert receiver.to_game_state() == states[3]
+
+        for state in states[4:]:
+            receiver.decode(sender.encode(state))
+            assert receiver.to_game_state() == state
+
+    def test_unrelated_body_falls_back_to_keyframe(self):
+        """Test that a body that is not a move of the previous one is sent whole."""
+        sender = FrameCodec()
+        sender.encode(make_state([(10, 10), (9, 10), (8, 10)]))
+        frame = sender.encode(make_state([(1, 1), (1, 2)]))
+
+        assert frame[0] == ord("K")
+
+    def test_missing_frame_detected(self):
+        """Test that a delta not following the previous frame is rejected."""
+        sender = FrameCodec()
+        receiver = FrameCodec()
+        states = play_states()
+        receiver.decode(sender.encode(states[0]))
+        sender.encode(states[1])
+
+        with pytest.raises(FrameCodecError):
+            receiver.decode(sender.encode(states[2]))
+
+    def test_delta_before_keyframe_rejected(self):
+        """Test that a stream cannot start with a delta."""
+        sender = FrameCodec()
+        states = play_states()
+        sender.encode(states[0])
+
+        with pytest.raises(FrameCodecError):
+            FrameCodec().decode(sender.encode(states[1]))
+
+    def test_malformed_frames_rejected(self):
+        """Test that truncated and unknown frames are rejected."""
+        sender = FrameCodec()
+        keyframe = sender.encode(play_states()[0])
+
+        for frame in [b"", b"X", keyframe[:-1], keyframe + b"\x00"]:
+            with pytest.raises(FrameCodecError):
+                FrameCodec().decode(frame)
+
+    def test_sequence_number_wraps(self):
+        """Test that deltas keep applying across the 16-bit sequence wrap."""
+        sender = FrameCodec()
+        receiver = FrameCodec()
+        states = play_states()
+        receiver.decode(sender.encode(states[0]))
+        sender.seq = receiver.seq = 0xFFFF
+
+        for state in states[1:]:
+            receiver.decode(sender.encode(state))
+            assert receiver.to_game_state() == state
+
+    def test_out_of_range_position_rejected(self):
+        """Test that positions that do not fit in a byte cannot be encoded."""
+        with pytest.raises(FrameCodecError):
+            FrameCodec().encode(make_state([(-1, 10)]))
+
+    def test_encode_delta_from_known_move(self):
+        """Test that producers that know the move can skip the state diff."""
+        sender = FrameCodec()
+        receiver = FrameCodec()
+        states = play_states()
+        receiver.decode(sender.encode(states[0]))
+
+        # Move right and eat: one new head, nothing dropped
+        state = make_state([(11, 10), (10, 10), (9, 10), (8, 10)], food=(3, 4), score=10)
+        meta = pack_meta(state.mode, state.status, state.snake.direction)
+        frame = sender.encode_delta((pack_cell(11, 10),), 0, 10, pack_cell(3, 4), meta)
+
+        assert frame[0] == ord("D")
+        receiver.decode(frame)
+        assert receiver.to_game_state() == state
+
+        # Plain move: the tail follows
+        state = make_state([(12, 10), (11, 10), (10, 10), (9, 10)], food=(3, 4), score=10)
+        receiver.decode(sender.encode_delta((pack_cell(12, 10),), 1, 10, pack_cell(3, 4), meta))
+        assert receiver.to_game_state() == state
+        assert sender.to_game_state() == state
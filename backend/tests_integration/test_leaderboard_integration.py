@@ -239,3 +239,43 @@ class TestLeaderboard:
         # (There might be overlap in the database)
         assert len(all_entries) >= len(walls_entries)
         assert len(all_entries) >= len(passthrough_entries)
+    
+    def test_leaderboard_rank(self, client: TestClient):
+        """Test ranking a score against the leaderboard."""
+        # Seeded walls scores: 505, 450, 380, 290, 275, 150
+        response = client.get("/leaderboard/rank?score=400&mode=walls")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rank"] == 3
+        assert data["total"] == 6
+        
+        # Equal scores share a rank
+        response = client.get("/leaderboard/rank?score=450&mode=walls")
+        assert response.json()["rank"] == 2
+        
+        # Without a mode the score is ranked across all modes
+        response = client.get("/leaderboard/rank?score=1000")
+        assert response.json()["rank"] == 1
+        assert response.json()["total"] == 10
+    
+    def test_submitted_score_updates_rank(self, client: TestClient):
+        """Test that a submitted score is ranked immediately."""
+        client.post(
+            "/auth/login",
+            json={
+                "email": "rookie@example.com",
+                "password": "password123"
+            }
+        )
+        
+        # Load the leaderboard before submitting
+        client.get("/leaderboard?mode=walls")
+        client.post("/leaderboard", json={"score": 600, "mode": "walls"})
+        
+        response = client.get("/leaderboard?mode=walls")
+        assert response.json()[0]["score"] == 600
+        
+        response = client.get("/leaderboard/rank?score=550&mode=walls")
+        assert response.json()["rank"] == 2
+        assert response.json()["total"] == 7
@@ -0,0 +1,277 @@
+"""
+Integration tests for bulk leaderboard export and import.
+
+Tests that history round-trips through NDJSON and CSV, that existing ids are
+skipped, that a bad record imports nothing, that the ranked index picks up
+imported scores, and that the command line tells the running workers.
+"""
+import asyncio
+import csv
+import io
+import json
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import admin, leaderboard_events, leaderboard_io
+from app.bus import LocalBus, UnixSocketBus, message_bus
+from app.db_models import DBBestScore, DBLeaderboardEntry
+from app.leaderboard_events import LEADERBOARD_RELOADED, index_rebuilder
+from app.leaderboard_index import leaderboard_index
+from app.leaderboard_io import COLUMNS, export_leaderboard, import_leaderboard, main
+
+
+TOKEN = "test-admin-token"
+HEADERS = {"X-Admin-Token": TOKEN}
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", TOKEN)
+
+
+def ndjson(*records: dict) -> str:
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def record(id: str, score: int, username: str = "player1", user_id: str = "1", mode: str = "walls") -> dict:
+    return {
+        "id": id,
+        "user_id": user_id,
+        "username": username,
+        "score": score,
+        "mode": mode,
+        "created_at": "2026-01-01T12:00:00+00:00",
+    }
+
+
+class TestAdminToken:
+    """Test that the endpoints need the admin token."""
+
+    def test_missing_token(self, client: TestClient):
+        assert client.get("/admin/leaderboard/export").status_code == 403
+
+    def test_wrong_token(self, client: TestClient):
+        response = client.get("/admin/leaderboard/export", headers={"X-Admin-Token": "wrong"})
+        assert response.status_code == 403
+
+    def test_disabled_without_token(self, client: TestClient, monkeypatch):
+        monkeypatch.setattr(admin, "ADMIN_TOKEN", "")
+        response = client.get("/admin/leaderboard/export", headers={"X-Admin-Token": ""})
+        assert response.status_code == 404
+
+
+class TestExport:
+    """Test streaming the leaderboard table out."""
+
+    def test_ndjson(self, client: TestClient, test_db: Session):
+        response = client.get("/admin/leaderboard/export", headers=HEADERS)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert len(records) == test_db.query(DBLeaderboardEntry).count()
+        assert set(records[0]) == set(COLUMNS)
+        assert records[0]["created_at"].endswith("+00:00")
+
+    def test_csv(self, client: TestClient, test_db: Session):
+        response = client.get("/admin/leaderboard/export?format=csv", headers=HEADERS)
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == test_db.query(DBLeaderboardEntry).count()
+        assert {row["mode"] for row in rows} == {"walls", "pass-through"}
+
+    def test_mode_filter(self, client: TestClient):
+        response = client.get("/admin/leaderboard/export?mode=pass-through", headers=HEADERS)
+        modes = {json.loads(line)["mode"] for line in response.text.splitlines()}
+        assert modes == {"pass-through"}
+
+    def test_async_session(self, async_client: TestClient, test_db: Session):
+        response = async_client.get("/admin/leaderboard/export", headers=HEADERS)
+        assert len(response.text.splitlines()) == test_db.query(DBLeaderboardEntry).count()
+
+
+class TestImport:
+    """Test adding history from a request body."""
+
+    def test_ndjson(self, client: TestClient, test_db: Session):
+        body = ndjson(record("imported-1", 5000), record("imported-2", 10, mode="pass-through"))
+        response = client.post("/admin/leaderboard/import", content=body, headers=HEADERS)
+        assert response.status_code == 200
+        assert response.json()["records"] == 2
+        entry = test_db.get(DBLeaderboardEntry, "imported-1")
+        assert entry.score == 5000
+        assert entry.created_at.year == 2026
+
+    def test_csv(self, client: TestClient, test_db: Session):
+        body = "username,user_id,score,mode\r\nplayer1,1,4000,walls\r\nplayer1,1,30,pass-through\r\n"
+        response = client.post("/admin/leaderboard/import?format=csv", content=body, headers=HEADERS)
+        assert response.json()["records"] == 2
+        assert test_db.query(DBLeaderboardEntry).filter(DBLeaderboardEntry.score == 4000).count() == 1
+
+    def test_existing_ids_skipped(self, client: TestClient, test_db: Session):
+        existing = test_db.query(DBLeaderboardEntry).first()
+        before = test_db.query(DBLeaderboardEntry).count()
+        body = ndjson(record(existing.id, 7777), record("imported-1", 10))
+        response = client.post("/admin/leaderboard/import", content=body, headers=HEADERS)
+        assert response.status_code == 200
+        test_db.expire_all()
+        assert test_db.query(DBLeaderboardEntry).count() == before + 1
+        assert test_db.get(DBLeaderboardEntry, existing.id).score != 7777
+
+    def test_bad_record_imports_nothing(self, client: TestClient, test_db: Session):
+        before = test_db.query(DBLeaderboardEntry).count()
+        body = ndjson(record("imported-1", 10)) + '{"score": "lots"}\n'
+        response = client.post("/admin/leaderboard/import", content=body, headers=HEADERS)
+        assert response.status_code == 400
+        assert "Line 2" in response.json()["detail"]
+        assert test_db.query(DBLeaderboardEntry).count() == before
+
+    def test_ranked_after_import(self, client: TestClient, test_db: Session):
+        client.get("/leaderboard?mode=walls")
+        body = ndjson(record("imported-1", 99999))
+        client.post("/admin/leaderboard/import", content=body, headers=HEADERS)
+        top = client.get("/leaderboard?mode=walls").json()[0]
+        assert top["id"] == "imported-1"
+        assert client.get("/leaderboard/rank?score=99999&mode=walls").json()["rank"] == 1
+        best = test_db.get(DBBestScore, {"user_id": "1", "mode": "walls"})
+        assert best.score == 99999
+
+    def test_other_workers_told(self, client: TestClient):
+        peer = LocalBus(hub=message_bus.hub)
+        received = []
+        peer.subscribe(LEADERBOARD_RELOADED, received.append)
+        try:
+            client.post("/admin/leaderboard/import", content=ndjson(record("imported-1", 10)), headers=HEADERS)
+        finally:
+            message_bus.hub.members.discard(peer)
+        assert received == [b""]
+
+    def test_import_by_other_worker(self, client: TestClient, test_db: Session, monkeypatch):
+        """Test that another worker's import is ranked here once the index is rebuilt in the background."""
+        monkeypatch.setattr(index_rebuilder, "session_factory", sessionmaker(bind=test_db.get_bind()))
+        rebuilds = index_rebuilder.rebuilds
+        client.get("/leaderboard?mode=walls")
+        test_db.add(DBLeaderboardEntry(id="imported-1", user_id="1", username="player1", score=99999, mode="walls"))
+        test_db.commit()
+
+        peer = LocalBus(hub=message_bus.hub)
+        try:
+            peer.publish(LEADERBOARD_RELOADED, b"")
+        finally:
+            message_bus.hub.members.discard(peer)
+        client.portal.call(index_rebuilder.wait)
+
+        assert index_rebuilder.rebuilds == rebuilds + 1
+        assert leaderboard_index.loaded
+        assert client.get("/leaderboard?mode=walls").json()[0]["id"] == "imported-1"
+
+    def test_async_session(self, async_client: TestClient, test_db: Session):
+        body = ndjson(record("imported-1", 5000))
+        response = async_client.post("/admin/leaderboard/import", content=body, headers=HEADERS)
+        assert response.json()["records"] == 1
+        assert test_db.get(DBLeaderboardEntry, "imported-1").score == 5000
+
+
+class TestRoundTrip:
+    """Test that an export imports back unchanged."""
+
+    @pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+    def test_round_trip(self, client: TestClient, test_db: Session, fmt: str):
+        exported = client.get(f"/admin/leaderboard/export?format={fmt}", headers=HEADERS).content
+        before = {
+            (entry.id, entry.score, entry.mode, entry.created_at)
+            for entry in test_db.query(DBLeaderboardEntry)
+        }
+        test_db.query(DBLeaderboardEntry).delete()
+        test_db.commit()
+
+        response = client.post(f"/admin/leaderboard/import?format={fmt}", content=exported, headers=HEADERS)
+        assert response.json()["records"] == len(before)
+        test_db.expire_all()
+        after = {
+            (entry.id, entry.score, entry.mode, entry.created_at)
+            for entry in test_db.query(DBLeaderboardEntry)
+        }
+        assert after == before
+
+    def test_csv_multiline_field(self, client: TestClient, test_db: Session):
+        """Test that quoted fields with newlines, commas and quotes survive, however the body is split."""
+        username = 'line one\nline "two", three'
+        test_db.add(DBLeaderboardEntry(id="multiline", user_id="1", username=username, score=123, mode="walls"))
+        test_db.commit()
+        exported = client.get("/admin/leaderboard/export?format=csv", headers=HEADERS).content
+        count = test_db.query(DBLeaderboardEntry).count()
+        test_db.query(DBLeaderboardEntry).delete()
+        test_db.commit()
+
+        def chunks():
+            for start in range(0, len(exported), 7):
+                yield exported[start:start + 7]
+
+        response = client.post("/admin/leaderboard/import?format=csv", content=chunks(), headers=HEADERS)
+        assert response.json()["records"] == count
+        assert test_db.get(DBLeaderboardEntry, "multiline").username == username
+
+        test_db.query(DBLeaderboardEntry).delete()
+        test_db.commit()
+        assert import_leaderboard(test_db, io.StringIO(exported.decode(), newline=""), "csv") == count
+        assert test_db.get(DBLeaderboardEntry, "multiline").username == username
+
+    def test_unclosed_quote(self, client: TestClient, test_db: Session):
+        before = test_db.query(DBLeaderboardEntry).count()
+        body = 'username,user_id,score,mode\r\n"player1,1,10,walls\r\n'
+        response = client.post("/admin/leaderboard/import?format=csv", content=body, headers=HEADERS)
+        assert response.status_code == 400
+        assert test_db.query(DBLeaderboardEntry).count() == before
+
+    def test_sync_functions_in_chunks(self, test_db: Session):
+        exported = b"".join(export_leaderboard(test_db, "csv")).decode()
+        count = test_db.query(DBLeaderboardEntry).count()
+        test_db.query(DBLeaderboardEntry).delete()
+        test_db.commit()
+
+        lines = io.StringIO(exported, newline="")
+        assert import_leaderboard(test_db, lines, "csv", chunk_size=3) == count
+        assert test_db.query(DBLeaderboardEntry).count() == count
+
+
+class TestCommandLine:
+    """Test importing from a process that does not serve the API."""
+
+    @pytest.fixture
+    def cli(self, test_db: Session, tmp_path, monkeypatch):
+        """The command-line import of one record, on the test database and a bus in `tmp_path`."""
+        monkeypatch.setattr(leaderboard_io, "SessionLocal", sessionmaker(bind=test_db.get_bind()))
+        monkeypatch.setattr(leaderboard_io, "migrate_database", lambda: None)
+        monkeypatch.setattr(leaderboard_events, "message_bus", UnixSocketBus(str(tmp_path / "bus")))
+        source = tmp_path / "import.ndjson"
+        source.write_text(ndjson(record("imported-1", 99999)))
+        monkeypatch.setattr(sys, "argv", ["leaderboard_io", "import", str(source)])
+        leaderboard_index.clear()
+        return tmp_path / "bus"
+
+    def test_running_workers_told(self, cli, test_db: Session, capsys):
+        async def import_beside_worker():
+            worker = UnixSocketBus(str(cli))
+            received = []
+            worker.subscribe(LEADERBOARD_RELOADED, received.append)
+            await worker.start()
+            await asyncio.to_thread(main)
+            await asyncio.sleep(0.05)
+            await worker.stop()
+            return received
+
+        assert asyncio.run(import_beside_worker()) == [b""]
+        assert "Running workers told to rebuild their leaderboard: 1" in capsys.readouterr().err
+        assert test_db.get(DBLeaderboardEntry, "imported-1").score == 99999
+        # The command line has no index worth loading
+        assert not leaderboard_index.loaded
+
+    def test_no_workers_reported(self, cli, test_db: Session, capsys):
+        main()
+        err = capsys.readouterr().err
+        assert "Imported 1 records" in err
+        assert "restart the API" in err
+        assert test_db.get(DBLeaderboardEntry, "imported-1").score == 99999
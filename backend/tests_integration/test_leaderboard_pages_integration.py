@@ -0,0 +1,136 @@
+"""
+Integration tests for leaderboard pages and neighbors.
+
+Tests paging by position and by keyset cursor, and reading the entries
+around a rank or a score.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.leaderboard_index import LeaderboardIndex, decode_cursor, make_index_item
+from app.models import GameMode, LeaderboardEntry
+
+
+def login(client: TestClient):
+    client.post(
+        "/auth/login",
+        json={
+            "email": "player1@example.com",
+            "password": "password123"
+        }
+    )
+
+
+def walk(client: TestClient, url: str):
+    """Follow next_cursor from the first page, returning every page."""
+    pages = [client.get(url).json()]
+    while pages[-1]["next_cursor"]:
+        pages.append(client.get(f"{url}&cursor={pages[-1]['next_cursor']}").json())
+    return pages
+
+
+class TestLeaderboardPages:
+    """Test paging through the leaderboard."""
+
+    def test_page_by_position(self, client: TestClient):
+        """Test jumping to a 1-based position."""
+        response = client.get("/leaderboard/page?start=3&limit=3")
+
+        assert response.status_code == 200
+        page = response.json()
+        assert page["start"] == 3
+        assert page["total"] == 10
+        assert [e["score"] for e in page["entries"]] == [410, 380, 340]
+        assert page["next_cursor"]
+
+    def test_walk_with_cursor(self, client: TestClient):
+        """Test that following cursors visits every entry once, in order."""
+        pages = walk(client, "/leaderboard/page?limit=3")
+
+        ids = [e["id"] for page in pages for e in page["entries"]]
+        assert ids == [e["id"] for e in client.get("/leaderboard").json()]
+        assert [page["start"] for page in pages] == [1, 4, 7, 10]
+        assert pages[-1]["next_cursor"] is None
+
+    def test_walk_through_ties(self, client: TestClient):
+        """Test that entries with equal scores are neither skipped nor repeated."""
+        login(client)
+        submitted = {
+            client.post("/leaderboard", json={"score": 300, "mode": "walls"}).json()["entry"]["id"]
+            for _ in range(4)
+        }
+
+        pages = walk(client, "/leaderboard/page?mode=walls&limit=1")
+
+        ids = [page["entries"][0]["id"] for page in pages]
+        assert len(ids) == len(set(ids)) == 10
+        assert submitted <= set(ids)
+
+    def test_cursor_survives_inserts(self, client: TestClient):
+        """Test that a new higher score does not shift the next page."""
+        first = client.get("/leaderboard/page?mode=walls&limit=2").json()
+        login(client)
+        client.post("/leaderboard", json={"score": 999, "mode": "walls"})
+
+        following = client.get(f"/leaderboard/page?mode=walls&limit=2&cursor={first['next_cursor']}").json()
+
+        assert [e["score"] for e in following["entries"]] == [380, 290]
+        assert following["start"] == 4
+
+    def test_invalid_cursor(self, client: TestClient):
+        """Test that a malformed cursor is rejected."""
+        response = client.get("/leaderboard/page?cursor=not-a-cursor")
+
+        assert response.status_code == 400
+        with pytest.raises(ValueError):
+            decode_cursor("WzEsMl0")
+
+    def test_deep_page(self):
+        """Test reading a page far from the top by position and by cursor."""
+        index = LeaderboardIndex()
+        start_time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        index.load(
+            make_index_item(
+                LeaderboardEntry(id=f"{n:06d}", username="player", score=n // 3, mode=GameMode.walls, date=""),
+                start_time + timedelta(seconds=n)
+            )
+            for n in range(30000)
+        )
+
+        page = index.page(5000, 50)
+        assert page.start == 5001
+        assert [e.score for e in page.entries] == [(29999 - 5000 - n) // 3 for n in range(50)]
+        following = index.page_after(decode_cursor(page.next_cursor), 50)
+        assert following.entries == index.page(5050, 50).entries
+
+
+class TestLeaderboardNeighbors:
+    """Test reading the entries around a rank or a score."""
+
+    def test_around_rank(self, client: TestClient):
+        """Test the entries on each side of a rank."""
+        page = client.get("/leaderboard/neighbors?rank=3&count=1").json()
+
+        assert page["start"] == 2
+        assert [e["score"] for e in page["entries"]] == [450, 410, 380]
+
+    def test_around_top_rank(self, client: TestClient):
+        """Test that the window is cut off at the top of the leaderboard."""
+        page = client.get("/leaderboard/neighbors?rank=1&count=2&mode=walls").json()
+
+        assert page["start"] == 1
+        assert [e["score"] for e in page["entries"]] == [505, 450, 380]
+
+    def test_around_score(self, client: TestClient):
+        """Test the entries above and below where a score would rank."""
+        page = client.get("/leaderboard/neighbors?score=400&count=2&mode=walls").json()
+
+        assert page["start"] == 1
+        assert [e["score"] for e in page["entries"]] == [505, 450, 380, 290]
+
+    def test_rank_or_score_required(self, client: TestClient):
+        """Test that exactly one of rank and score must be given."""
+        assert client.get("/leaderboard/neighbors").status_code == 400
+        assert client.get("/leaderboard/neighbors?rank=1&score=100").status_code == 400
@@ -0,0 +1,129 @@
+"""
+Integration tests for daily and weekly leaderboards.
+
+Tests that windowed leaderboards hold only the current day's or week's
+scores, take new scores as they arrive, and expire when the window rolls
+over.
+"""
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.db_models import DBLeaderboardEntry
+from app.leaderboard_index import LeaderboardIndex, make_index_item, window_bucket
+from app.models import GameMode, LeaderboardEntry, LeaderboardWindow
+
+
+# A Sunday; the week began on Monday 2026-10-12
+NOW = datetime(2026, 10, 18, 15, 0, tzinfo=timezone.utc)
+
+
+class Clock:
+    """A settable stand-in for time.time."""
+
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now.timestamp()
+
+
+def entry(entry_id: str, score: int, mode: GameMode = GameMode.walls) -> LeaderboardEntry:
+    return LeaderboardEntry(id=entry_id, username=f"player{entry_id}", score=score, mode=mode, date="")
+
+
+def scores(index: LeaderboardIndex, window: LeaderboardWindow, mode=None):
+    return [e.score for e in index.top(mode, window=window)]
+
+
+class TestWindowBuckets:
+    """Test the buckets behind the daily and weekly leaderboards."""
+
+    def test_week_starts_on_monday(self):
+        """Test that Sunday and the following Monday fall in different weeks."""
+        sunday = NOW.timestamp()
+        monday = (NOW + timedelta(days=1)).timestamp()
+        previous_monday = datetime(2026, 10, 12, tzinfo=timezone.utc).timestamp()
+
+        assert window_bucket(LeaderboardWindow.weekly, sunday) == window_bucket(LeaderboardWindow.weekly, previous_monday)
+        assert window_bucket(LeaderboardWindow.weekly, monday) == window_bucket(LeaderboardWindow.weekly, sunday) + 1
+
+    def test_load_splits_by_window(self):
+        """Test that loading puts each score in the windows it falls in."""
+        index = LeaderboardIndex(clock=Clock(NOW))
+        index.load([
+            make_index_item(entry("1", 100), NOW - timedelta(hours=1)),
+            make_index_item(entry("2", 200), NOW - timedelta(days=2)),
+            make_index_item(entry("3", 300), NOW - timedelta(days=8)),
+            make_index_item(entry("4", 50, GameMode.pass_through), NOW),
+        ])
+
+        assert scores(index, LeaderboardWindow.daily) == [100, 50]
+        assert scores(index, LeaderboardWindow.daily, GameMode.walls) == [100]
+        assert scores(index, LeaderboardWindow.weekly) == [200, 100, 50]
+        assert scores(index, LeaderboardWindow.all_time) == [300, 200, 100, 50]
+        assert index.rank_of(150, window=LeaderboardWindow.weekly) == 2
+        assert index.count(GameMode.walls, LeaderboardWindow.weekly) == 2
+
+    def test_added_scores(self):
+        """Test that new scores join the current windows and late ones do not."""
+        index = LeaderboardIndex(clock=Clock(NOW))
+        index.load([])
+
+        index.add(entry("1", 100), NOW)
+        index.add(entry("2", 200), NOW - timedelta(days=3))
+
+        assert scores(index, LeaderboardWindow.daily) == [100]
+        assert scores(index, LeaderboardWindow.weekly) == [200, 100]
+        assert scores(index, LeaderboardWindow.all_time) == [200, 100]
+
+    def test_rollover(self):
+        """Test that a window's scores expire when the next day or week starts."""
+        clock = Clock(NOW)
+        index = LeaderboardIndex(clock=clock)
+        index.load([make_index_item(entry("1", 100), NOW)])
+
+        clock.now = NOW + timedelta(hours=10)
+        assert scores(index, LeaderboardWindow.daily) == []
+        assert scores(index, LeaderboardWindow.weekly) == []
+
+        index.add(entry("2", 200), clock.now)
+        assert scores(index, LeaderboardWindow.daily) == [200]
+        assert scores(index, LeaderboardWindow.all_time) == [200, 100]
+
+
+class TestWindowedEndpoints:
+    """Test windowed leaderboards through the API."""
+
+    def test_old_scores_only_all_time(self, client: TestClient, test_db: Session):
+        """Test that a score from last month is only on the all-time leaderboard."""
+        test_db.add(DBLeaderboardEntry(
+            id="old", user_id="8", username="rookie", score=900, mode=GameMode.walls,
+            created_at=datetime.now(timezone.utc) - timedelta(days=30)
+        ))
+        test_db.commit()
+
+        all_time = client.get("/leaderboard?mode=walls").json()
+        daily = client.get("/leaderboard?mode=walls&window=daily").json()
+        weekly = client.get("/leaderboard?mode=walls&window=weekly").json()
+
+        assert all_time[0]["id"] == "old"
+        assert [e["score"] for e in daily] == [e["score"] for e in weekly] == [505, 450, 380, 290, 275, 150]
+
+    def test_submitted_score_in_windows(self, client: TestClient):
+        """Test that a submitted score appears on today's leaderboard."""
+        client.get("/leaderboard")
+        client.post("/auth/login", json={"email": "player1@example.com", "password": "password123"})
+        client.post("/leaderboard", json={"score": 700, "mode": "pass-through"})
+
+        assert client.get("/leaderboard?window=daily").json()[0]["score"] == 700
+        rank = client.get("/leaderboard/rank?score=600&window=weekly&mode=pass-through").json()
+        assert rank["window"] == "weekly"
+        assert (rank["rank"], rank["total"]) == (2, 5)
+        page = client.get("/leaderboard/page?window=daily&limit=2").json()
+        assert [e["score"] for e in page["entries"]] == [700, 505]
+
+    def test_unique_all_time_only(self, client: TestClient):
+        """Test that the one-entry-per-player view is refused for other windows."""
+        assert client.get("/leaderboard?unique=true&window=daily").status_code == 400
@@ -0,0 +1,326 @@
+"""
+Integration tests for arena matchmaking and sharding.
+
+Tests skill tiers and arena choice, placing players across shards by load,
+routing a player's turns and their arena's states between the worker holding
+their WebSocket and the shard hosting the arena, handing arenas from a hot
+shard to a cool one, and forgetting shards that go quiet.
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import matchmaking
+from app.arena_loop import ArenaManager, arena_manager, choose_arena
+from app.bus import LocalBus, LocalHub, message_bus
+from app.matchmaking import SKILL_TIERS, Matchmaker, matchmaker, skill_tier
+from app.models import ArenaState, ArenaSummary, Direction, GameMode, User
+
+
+def player(number: int) -> User:
+    return User(id=str(number), username=f"player{number}", email=f"player{number}@example.com")
+
+
+def summary(name: str, tier: int = 0, players: int = 1, mode: GameMode = GameMode.walls) -> ArenaSummary:
+    return ArenaSummary(id=name, mode=mode, tier=tier, tick=0, players=players, bots=0, capacity=4)
+
+
+def turn_for(direction: Direction) -> Direction:
+    return Direction.UP if direction in (Direction.LEFT, Direction.RIGHT) else Direction.LEFT
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def hub() -> LocalHub:
+    return LocalHub()
+
+
+@pytest.fixture
+def shards(hub: LocalHub, clock: FakeClock):
+    """Two shards on buses that were never started, so events are handled as they are published."""
+    pair = [Matchmaker(ArenaManager(bots=0), LocalBus(hub), interval=1.0, clock=clock) for _ in range(2)]
+    for shard in pair:
+        shard.subscribe()
+    return pair
+
+
+def join(shard: Matchmaker, number: int, mode: GameMode = GameMode.walls, tier: int = 0):
+    return asyncio.run(shard.join(player(number), mode, tier))
+
+
+class TestSkill:
+    """Test skill tiers and choosing an arena."""
+
+    def test_tiers(self):
+        assert [skill_tier(rank, 8) for rank in range(1, 9)] == [0, 0, 1, 1, 2, 2, 3, 3]
+        assert skill_tier(1, 1) == 0
+        assert skill_tier(None, 8) == SKILL_TIERS - 1
+        assert skill_tier(None, 0) == SKILL_TIERS - 1
+
+    def test_own_tier_first(self):
+        arenas = [summary("near", tier=1, players=3), summary("own", tier=2)]
+        assert choose_arena(arenas, GameMode.walls, 2).id == "own"
+
+    def test_neighbouring_tier(self):
+        arenas = [summary("far", tier=3), summary("near", tier=1)]
+        assert choose_arena(arenas, GameMode.walls, 0).id == "near"
+        assert choose_arena([summary("far", tier=3)], GameMode.walls, 0) is None
+
+    def test_fullest_with_room(self):
+        arenas = [summary("full", players=4), summary("busy", players=3), summary("quiet", players=1)]
+        assert choose_arena(arenas, GameMode.walls, 0).id == "busy"
+
+    def test_mode(self):
+        assert choose_arena([summary("walls")], GameMode.pass_through, 0) is None
+
+
+class TestPlacement:
+    """Test placing players across shards."""
+
+    def test_single_shard_is_local(self, shards):
+        a, _ = shards
+        seat = join(a, 1)
+        assert a.manager.get(seat.arena_id) is not None
+        assert seat.channel is a.manager.channels[seat.arena_id]
+
+    def test_new_arena_on_least_busy_shard(self, shards):
+        a, b = shards
+        a.manager.join(player(1), GameMode.walls)
+        a.report()
+        b.report()
+        assert a.place(GameMode.pass_through, 0) == (b.shard, None)
+        # Otherwise equal shards keep the player local
+        assert b.place(GameMode.pass_through, 0) == (b.shard, None)
+
+    def test_hot_shard_avoided(self, shards):
+        a, b = shards
+        arena, _ = a.manager.join(player(1), GameMode.walls)
+        b.manager.join(player(2), GameMode.walls, tier=1)
+        a.manager.load = 0.9
+        a.report()
+        b.report()
+        assert b.place(GameMode.walls, 0) == (b.shard, b.manager.summaries()[0].id)
+        assert b.place(GameMode.walls, 3) == (b.shard, None)
+        # A hot shard's arena is still better than none
+        assert b.place(GameMode.walls, 0) != (a.shard, arena.id)
+        b.manager.clear()
+        assert b.place(GameMode.walls, 0) == (a.shard, arena.id)
+
+    def test_summaries_cover_every_shard(self, shards):
+        a, b = shards
+        a.manager.join(player(1), GameMode.walls)
+        b.manager.join(player(2), GameMode.walls)
+        b.report()
+        assert len(a.summaries()) == 2
+
+
+class TestRouting:
+    """Test playing in an arena hosted by another shard."""
+
+    @pytest.fixture
+    def remote(self, shards):
+        """A player connected to the first shard, seated in an arena of the second."""
+        a, b = shards
+        arena, _ = b.manager.join(player(1), GameMode.walls)
+        b.report()
+        seat = join(a, 2)
+        return a, b, arena, seat
+
+    def test_joins_remote_arena(self, remote):
+        a, b, arena, seat = remote
+        assert seat.arena_id == arena.id
+        assert arena.players == 2
+        assert b.remote_players[seat.snake_id] == (arena, a.shard)
+        assert seat.channel is a.feeds[arena.id]
+        assert ArenaState.model_validate_json(seat.document).id == arena.id
+
+    def test_turns_and_states(self, remote):
+        a, b, arena, seat = remote
+        subscription = seat.channel.subscribe()
+        snake = arena.snakes[seat.snake_id]
+        turn = turn_for(snake.direction)
+        a.steer(seat, turn)
+        assert snake.turn == turn
+        b.manager.tick()
+        state = ArenaState.model_validate_json(subscription.queue.get_nowait())
+        assert state.tick == 1
+        assert next(s for s in state.snakes if s.id == seat.snake_id).direction == turn
+
+    def test_death(self, remote):
+        a, b, arena, seat = remote
+        for _ in range(arena.size + 1):
+            b.manager.tick()
+            if not seat.alive:
+                break
+        assert not seat.alive
+        assert not arena.snakes[seat.snake_id].alive
+
+    def test_leave(self, remote):
+        a, b, arena, seat = remote
+        a.leave(seat)
+        assert seat.snake_id not in arena.snakes
+        assert seat.snake_id not in b.remote_players
+        assert a.feeds == {}
+
+    def test_closed_arena_ends_feed(self, remote):
+        a, b, arena, seat = remote
+        subscription = seat.channel.subscribe()
+        b.manager.clear()
+        assert subscription.queue.get_nowait() is None
+        assert a.feeds == {}
+
+    def test_watch(self, shards):
+        a, b = shards
+        arena, _ = b.manager.join(player(1), GameMode.walls)
+        b.report()
+        channel, document = a.watch(arena.id)
+        assert document is None
+        assert a.shard in b.watchers[arena.id]
+        subscription = channel.subscribe()
+        b.manager.tick()
+        assert ArenaState.model_validate_json(subscription.queue.get_nowait()).tick == 1
+        channel.unsubscribe(subscription)
+        a.unwatch(arena.id)
+        assert a.feeds == {}
+        assert a.watch("missing") is None
+
+
+class TestRebalancing:
+    """Test moving arenas off hot shards."""
+
+    def test_hot_shard_hands_off_busiest_arena(self, shards):
+        a, b = shards
+        quiet = join(a, 1, GameMode.walls)
+        seat = join(a, 2, GameMode.pass_through)
+        busy = a.manager.get(seat.arena_id)
+        busy.join(player(3), bot=True)
+        subscription = seat.channel.subscribe()
+        b.report()
+        a.manager.load = 0.9
+        a.report()
+
+        assert a.migrations == 1
+        assert a.manager.get(busy.id) is None
+        assert a.manager.get(quiet.arena_id) is not None
+        assert 0 < a.manager.load < 0.9
+        moved = b.manager.get(busy.id)
+        assert moved.tick_count == busy.tick_count
+        assert sorted(moved.snakes) == sorted(busy.snakes)
+
+        # The player keeps their seat and channel, now routed to the new host
+        snake = moved.snakes[seat.snake_id]
+        turn = turn_for(snake.direction)
+        a.steer(seat, turn)
+        assert snake.turn == turn
+        b.manager.tick()
+        assert ArenaState.model_validate_json(subscription.queue.get_nowait()).tick == 1
+        a.leave(seat)
+        assert b.manager.arenas == {}
+
+    def test_stays_when_others_are_busy(self, shards):
+        a, b = shards
+        join(a, 1, GameMode.walls)
+        join(a, 2, GameMode.pass_through)
+        b.manager.load = 0.3
+        b.report()
+        a.manager.load = 0.9
+        assert a.rebalance() is None
+
+    def test_single_arena_stays(self, shards):
+        a, b = shards
+        join(a, 1)
+        b.report()
+        a.manager.load = 0.9
+        assert a.rebalance() is None
+
+
+class TestExpiry:
+    """Test shards that stop reporting."""
+
+    def test_quiet_shards_players_removed(self, shards, clock: FakeClock):
+        a, b = shards
+        a.manager.load = 0.9
+        a.report()
+        b.report()
+        seat = join(a, 1)
+        arena = b.manager.get(seat.arena_id)
+        assert arena.players == 1
+
+        clock.now += 10
+        b.report()
+        assert b.shards == {}
+        assert b.manager.arenas == {}
+        assert b.remote_players == {}
+
+    def test_join_falls_back_to_local(self, shards, hub: LocalHub, monkeypatch):
+        a, b = shards
+        monkeypatch.setattr(matchmaking, "JOIN_TIMEOUT", 0.01)
+        a.manager.load = 0.9
+        b.report()
+        hub.members.discard(b.bus)
+        seat = join(a, 1)
+        assert a.manager.get(seat.arena_id) is not None
+        assert b.manager.arenas == {}
+
+
+class TestWebSockets:
+    """Test playing through the app in an arena hosted by another worker."""
+
+    @pytest.fixture
+    def peer(self, monkeypatch):
+        """A second shard on the app's bus, and the app's shard too hot to host."""
+        monkeypatch.setattr(arena_manager, "interval", 3600)
+        monkeypatch.setattr(arena_manager, "load", 0.9)
+        peer = Matchmaker(ArenaManager(bots=0), LocalBus(message_bus.hub))
+        peer.subscribe()
+        yield peer
+        message_bus.hub.members.discard(peer.bus)
+        matchmaker.shards.clear()
+        arena_manager.clear()
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert condition()
+
+    def test_play_on_peer(self, client: TestClient, peer: Matchmaker):
+        peer.report()
+        self.wait_for(lambda: peer.shard in matchmaker.shards)
+        client.post("/auth/login", json={"email": "snakemaster@example.com", "password": "password123"})
+        with client.websocket_connect("/arena/play?mode=walls") as websocket:
+            joined = websocket.receive_json()
+            assert joined["tier"] == 0
+            arena = peer.manager.get(joined["arenaId"])
+            assert arena.tier == 0
+            assert ArenaState.model_validate(websocket.receive_json()).id == arena.id
+            assert arena_manager.arenas == {}
+
+            snake = arena.snakes[joined["snakeId"]]
+            turn = turn_for(snake.direction)
+            websocket.send_json({"direction": turn.value})
+            self.wait_for(lambda: snake.turn is not None)
+            peer.manager.tick()
+            state = ArenaState.model_validate(websocket.receive_json())
+            assert state.tick == 1
+            assert state.snakes[0].direction == turn
+        self.wait_for(lambda: not peer.manager.arenas)
+
+    def test_metrics(self, client: TestClient):
+        lines = client.get("/metrics").text.splitlines()
+        assert "arena_shards 1" in lines
+        assert "# TYPE arena_migrations_total counter" in lines
@@ -0,0 +1,222 @@
+"""
+Integration tests for sharing state between workers over the message bus.
+
+Another worker is stood in for by a second local bus on the app's hub.
+Tests that scores and live games from either side reach the other, and that
+the Unix socket bus delivers between separate sockets.
+"""
+import asyncio
+import json
+import socket
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.bus import LocalBus, LocalHub, UnixSocketBus, message_bus
+from app.leaderboard_events import SCORE_SUBMITTED, SCORES_DROPPED, SCORES_WRITTEN, encode_score
+from app.live_games import GAME_EVENTS, REMOTE_GAME_TIMEOUT, GameRegistry
+from app.models import GameMode, LeaderboardEntry, User
+from app.response_cache import leaderboard_cache
+from tests_integration.test_spectator_integration import make_game_state
+
+
+OTHER_USER = User(id="6", username="ninja", email="ninja@example.com")
+
+
+class Peer:
+    """Another worker on the app's bus, recording what it receives."""
+
+    def __init__(self):
+        self.bus = LocalBus(hub=message_bus.hub)
+        self.received: List[Tuple[str, bytes]] = []
+        for topic in (SCORE_SUBMITTED, SCORES_WRITTEN, GAME_EVENTS):
+            self.bus.subscribe(topic, lambda payload, topic=topic: self.received.append((topic, payload)))
+        self.games = GameRegistry(bus=self.bus)
+
+    def topics(self) -> List[str]:
+        return [topic for topic, _ in self.received]
+
+
+@pytest.fixture
+def peer():
+    peer = Peer()
+    yield peer
+    message_bus.hub.members.discard(peer.bus)
+
+
+def remote_entry(score: int = 9999) -> LeaderboardEntry:
+    return LeaderboardEntry(id="remote-1", username="ninja", score=score, mode=GameMode.walls, date="2026-01-01")
+
+
+def login(client: TestClient):
+    client.post("/auth/login", json={"email": "player1@example.com", "password": "password123"})
+
+
+class TestLeaderboardEvents:
+    """Test keeping leaderboards in step across workers."""
+
+    def test_score_from_other_worker(self, client: TestClient, peer: Peer):
+        """Test that another worker's score is ranked and replaces cached responses."""
+        etag = client.get("/leaderboard").headers["etag"]
+
+        peer.bus.publish(SCORE_SUBMITTED, encode_score(remote_entry(), datetime.now(timezone.utc)))
+        response = client.get("/leaderboard", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.json()[0]["id"] == "remote-1"
+
+    def test_duplicate_score_ignored(self, client: TestClient, peer: Peer):
+        """Test that a score already in the index is not ranked twice."""
+        payload = encode_score(remote_entry(), datetime.now(timezone.utc))
+        client.get("/leaderboard")
+
+        peer.bus.publish(SCORE_SUBMITTED, payload)
+        peer.bus.publish(SCORE_SUBMITTED, payload)
+
+        ids = [entry["id"] for entry in client.get("/leaderboard").json()]
+        assert ids.count("remote-1") == 1
+
+    def test_score_published(self, client: TestClient, peer: Peer):
+        """Test that a score recorded here is announced to other workers."""
+        login(client)
+        entry = client.post("/leaderboard", json={"score": 777, "mode": "walls"}).json()["entry"]
+
+        assert peer.topics() == [SCORE_SUBMITTED]
+        message = json.loads(peer.received[0][1])
+        assert message["entry"]["id"] == entry["id"]
+        assert message["entry"]["score"] == 777
+
+    def test_scores_written(self, client: TestClient, peer: Peer):
+        """Test that a written batch on another worker invalidates cached responses."""
+        client.get("/leaderboard")
+        version = leaderboard_cache.version
+
+        peer.bus.publish(SCORES_WRITTEN, b"")
+        client.get("/leaderboard")
+
+        assert leaderboard_cache.version == version + 1
+
+    def test_scores_dropped(self, client: TestClient, peer: Peer):
+        """Test that scores another worker could not write are unranked here too."""
+        created_at = datetime.now(timezone.utc)
+        client.get("/leaderboard")
+        peer.bus.publish(SCORE_SUBMITTED, encode_score(remote_entry(), created_at))
+        assert client.get("/leaderboard").json()[0]["id"] == "remote-1"
+
+        peer.bus.publish(SCORES_DROPPED, b"[" + encode_score(remote_entry(), created_at) + b"]")
+
+        assert "remote-1" not in [entry["id"] for entry in client.get("/leaderboard").json()]
+        assert client.get("/leaderboard/rank?score=9999&mode=walls").json()["total"] == 6
+
+
+class TestGameMirrors:
+    """Test watching games hosted by other workers."""
+
+    def test_watch_remote_game(self, client: TestClient, peer: Peer):
+        """Test that a game on another worker is listed and streamed here."""
+        game = peer.games.start(OTHER_USER, make_game_state())
+
+        players = client.get("/spectator/active").json()
+        assert [player["id"] for player in players] == [game.id]
+        assert players[0]["username"] == "ninja"
+
+        with client.websocket_connect(f"/spectator/watch/{game.id}") as spectator:
+            assert spectator.receive_json()["score"] == 0
+            peer.games.update(game, {"score": 10})
+            assert spectator.receive_json()["score"] == 10
+
+            peer.games.end(game)
+            with pytest.raises(WebSocketDisconnect):
+                spectator.receive_json()
+
+        assert client.get("/spectator/active").json() == []
+
+    def test_local_game_published(self, client: TestClient, peer: Peer):
+        """Test that a game played here is mirrored by other workers."""
+        peer.bus.subscribe(GAME_EVENTS, peer.games.receive)
+        login(client)
+
+        with client.websocket_connect("/spectator/play") as player:
+            player.send_json(make_game_state())
+            game_id = player.receive_json()["gameId"]
+            player.send_json({"score": 30})
+            # A round trip makes sure the update was handled
+            client.get("/spectator/active")
+
+            mirrored = peer.games.active_players()
+            assert [(p.id, p.username, p.score) for p in mirrored] == [(game_id, "player1", 30)]
+
+        assert peer.games.active_players() == []
+
+    def test_lost_frame_resyncs(self):
+        """Test that a mirror that misses a frame catches up at the next keyframe."""
+        hub = LocalHub()
+        host = GameRegistry(bus=LocalBus(hub))
+        mirror = GameRegistry(bus=LocalBus(hub))
+        mirror.subscribe()
+
+        game = host.start(OTHER_USER, make_game_state())
+        game.codec.keyframe_interval = 3
+        mirror.bus.handlers.clear()
+        host.update(game, {"score": 10})
+        mirror.subscribe()
+
+        host.update(game, {"score": 20})
+        assert mirror.get(game.id).state.score == 0
+        host.update(game, {"score": 30})
+        assert mirror.get(game.id).state.score == 30
+
+    def test_abandoned_mirror_expires(self):
+        """Test that a mirror stops being listed once its host goes quiet."""
+        now = [0.0]
+        hub = LocalHub()
+        host = GameRegistry(bus=LocalBus(hub))
+        mirror = GameRegistry(bus=LocalBus(hub), clock=lambda: now[0])
+        mirror.subscribe()
+
+        game = host.start(OTHER_USER, make_game_state())
+        assert mirror.get(game.id) is not None
+
+        now[0] = REMOTE_GAME_TIMEOUT + 1
+        assert mirror.active_players() == []
+        assert mirror.get(game.id) is None
+
+
+class TestUnixSocketBus:
+    """Test the bus between processes on one node."""
+
+    def test_delivers_to_others(self, tmp_path):
+        """Test that a message reaches every other socket but not its sender."""
+        async def exchange():
+            buses = [UnixSocketBus(str(tmp_path)) for _ in range(3)]
+            received = [[] for _ in buses]
+            for bus, inbox in zip(buses, received):
+                bus.subscribe("topic", inbox.append)
+                await bus.start()
+            buses[0].publish("topic", b"hello")
+            await asyncio.sleep(0.05)
+            for bus in buses:
+                await bus.stop()
+            return received
+
+        assert asyncio.run(exchange()) == [[], [b"hello"], [b"hello"]]
+        assert list(tmp_path.glob("*.sock")) == []
+
+    def test_forgets_exited_workers(self, tmp_path):
+        """Test that a socket left behind by an exited worker is removed."""
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(str(tmp_path / "1-exited.sock"))
+        stale.close()
+
+        async def publish():
+            bus = UnixSocketBus(str(tmp_path))
+            await bus.start()
+            bus.publish("topic", b"hello")
+            await bus.stop()
+
+        asyncio.run(publish())
+
+        assert list(tmp_path.glob("*.sock")) == []
@@ -0,0 +1,148 @@
+"""
+Integration tests for request metrics and the slow request profiler.
+
+Tests that requests are recorded per route template with a breakdown of
+database, conversion and encoding time, that /metrics serves them in the
+Prometheus text format, and that slow requests get a collapsed stack profile.
+"""
+import re
+import time
+
+from fastapi.testclient import TestClient
+
+from app.metrics import Histogram, request_metrics
+from app.profiling import SlowRequestProfiler
+
+
+def metric_lines(client: TestClient, name: str) -> list:
+    return [line for line in client.get("/metrics").text.splitlines() if line.startswith(name)]
+
+
+def busy(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestRequestMetrics:
+    """Test the latency histograms served at /metrics."""
+
+    def test_exposition_format(self, client: TestClient):
+        """Test that /metrics serves histograms Prometheus can scrape."""
+        client.get("/leaderboard")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+        assert "# TYPE http_request_phase_seconds histogram" in response.text
+        assert re.search(
+            r'^http_request_duration_seconds_bucket\{method="GET",route="/leaderboard",status="200",le="\+Inf"\} \d+$',
+            response.text,
+            re.MULTILINE
+        )
+
+    def test_paths_not_labels(self, client: TestClient):
+        """Test that requests are labelled by route template, never by raw path."""
+        for path in ("/missing-a", "/missing-b"):
+            client.get(path)
+
+        assert "/missing-a" not in client.get("/metrics").text
+
+    def test_status_label(self, client: TestClient):
+        """Test that failed requests are recorded with their status."""
+        before = request_metrics.requests.count(method="GET", route="/auth/me", status="401")
+
+        client.get("/auth/me")
+
+        assert request_metrics.requests.count(method="GET", route="/auth/me", status="401") == before + 1
+
+    def test_phase_breakdown(self, client: TestClient):
+        """Test that database, conversion and encoding time are recorded."""
+        client.get("/leaderboard?unique=true")
+
+        sums = {
+            line.split("phase=\"")[1].split("\"")[0]: float(line.rsplit(" ", 1)[1])
+            for line in metric_lines(client, "http_request_phase_seconds_sum")
+            if 'route="/leaderboard"' in line
+        }
+        assert sums["db"] > 0
+        assert sums["convert"] > 0
+        assert sums["encode"] > 0
+
+
+class TestHistogram:
+    """Test the histogram itself."""
+
+    def test_cumulative_buckets(self):
+        """Test that bucket counts are cumulative and end with the total."""
+        histogram = Histogram("latency", "Test latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, route="/x")
+
+        assert histogram.expose()[2:] == [
+            'latency_bucket{route="/x",le="0.1"} 1',
+            'latency_bucket{route="/x",le="1.0"} 2',
+            'latency_bucket{route="/x",le="+Inf"} 3',
+            'latency_sum{route="/x"} 5.55',
+            'latency_count{route="/x"} 3',
+        ]
+
+    def test_no_labels(self):
+        """Test that a series without labels has no stray commas or empty braces."""
+        histogram = Histogram("latency", "Test latency.", buckets=(1.0,))
+        histogram.observe(0.5)
+
+        assert histogram.expose()[2:] == [
+            'latency_bucket{le="1.0"} 1',
+            'latency_bucket{le="+Inf"} 1',
+            'latency_sum 0.5',
+            'latency_count 1',
+        ]
+
+    def test_label_escaping(self):
+        """Test that quotes and backslashes in label values are escaped."""
+        histogram = Histogram("latency", "Test latency.", buckets=(1.0,))
+        histogram.observe(0.5, route='say "hi"\\')
+
+        assert 'route="say \\"hi\\"\\\\"' in histogram.expose()[2]
+
+
+class TestSlowRequestProfiler:
+    """Test profiles of slow requests."""
+
+    def test_writes_collapsed_stacks(self, tmp_path):
+        """Test that a slow request's samples are saved as collapsed stacks."""
+        profiler = SlowRequestProfiler(enabled=True, threshold_ms=10, interval_ms=1, directory=str(tmp_path))
+        try:
+            started = profiler.begin()
+            busy(0.1)
+            path = profiler.end(started, 0.1, "GET /leaderboard")
+        finally:
+            profiler.shutdown()
+
+        assert path is not None and path.parent == tmp_path
+        assert "GET_leaderboard" in path.name
+        lines = path.read_text().splitlines()
+        assert all(re.fullmatch(r"[^ ].*;.* \d+", line) for line in lines)
+        assert any("busy (test_metrics_integration.py" in line for line in lines)
+
+    def test_fast_request_skipped(self, tmp_path):
+        """Test that requests under the threshold leave no profile."""
+        profiler = SlowRequestProfiler(enabled=True, threshold_ms=1000, interval_ms=1, directory=str(tmp_path))
+        try:
+            started = profiler.begin()
+            busy(0.02)
+            assert profiler.end(started, 0.02, "GET /leaderboard") is None
+        finally:
+            profiler.shutdown()
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_disabled(self, tmp_path):
+        """Test that a disabled profiler never starts sampling."""
+        profiler = SlowRequestProfiler(enabled=False, directory=str(tmp_path))
+
+        assert profiler.begin() is None
+        assert profiler.end(None, 10.0, "GET /leaderboard") is None
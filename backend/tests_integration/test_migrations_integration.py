@@ -0,0 +1,79 @@
+"""
+Integration tests for the Alembic migrations.
+
+Tests that the migration chain builds the schema the models describe, and
+that databases created before migrations existed are adopted and upgraded.
+"""
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import inspect, text
+
+from app.db_config import ALEMBIC_CONFIG, migrate_database
+from app.db_models import Base
+
+
+def run(engine, operation, revision: str):
+    config = Config(ALEMBIC_CONFIG)
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        operation(config, revision)
+
+
+def current_revision(engine) -> str:
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+class TestMigrations:
+    """Test the migration chain."""
+
+    def test_matches_models(self, engine):
+        """Test that upgrading an empty database gives the models' schema."""
+        migrate_database(engine)
+
+        with engine.connect() as connection:
+            assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+        assert current_revision(engine) == "0003"
+
+    def test_query_indexes(self, engine):
+        """Test that the leaderboard has composite indexes for its queries."""
+        migrate_database(engine)
+
+        indexes = {index["name"]: index["column_names"] for index in inspect(engine).get_indexes("leaderboard")}
+        assert indexes == {
+            "ix_leaderboard_mode_score": ["mode", "score", "created_at", "id"],
+            "ix_leaderboard_score": ["score", "created_at", "id"],
+            "ix_leaderboard_user_mode_score": ["user_id", "mode", "score"],
+        }
+
+    def test_adopts_unversioned_database(self, engine):
+        """Test that tables made before migrations are stamped, upgraded and backfilled."""
+        run(engine, command.upgrade, "0001")
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE alembic_version"))
+            connection.execute(text(
+                "INSERT INTO leaderboard (id, user_id, username, score, mode) VALUES "
+                "('1', '1', 'player1', 120, 'walls'), ('2', '1', 'player1', 340, 'walls'), "
+                "('3', '2', 'speedrunner', 90, 'pass_through')"
+            ))
+
+        migrate_database(engine)
+
+        assert current_revision(engine) == "0003"
+        with engine.connect() as connection:
+            rows = connection.execute(text(
+                "SELECT user_id, mode, score, entry_id FROM best_scores ORDER BY user_id"
+            )).all()
+        assert rows == [("1", "walls", 340, "2"), ("2", "pass_through", 90, "3")]
+
+    def test_downgrade_to_base(self, engine):
+        """Test that every migration can be reverted."""
+        migrate_database(engine)
+
+        run(engine, command.downgrade, "base")
+
+        assert inspect(engine).get_table_names() == ["alembic_version"]
+        migrate_database(engine)
+        assert current_revision(engine) == "0003"
@@ -0,0 +1,115 @@
+"""
+Integration tests for password hashing.
+
+Tests that passwords are stored as salted scrypt hashes, and that logging
+in replaces legacy SHA-256 hashes and hashes with outdated cost settings.
+"""
+import asyncio
+from hashlib import sha256
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.db_models import DBUser
+from app.passwords import PASSWORD_SCRYPT_N, PasswordHasher, check_password, hash_password, needs_rehash
+
+
+def stored_hash(db: Session, email: str) -> str:
+    db.expire_all()
+    return db.query(DBUser).filter(DBUser.email == email).one().password_hash
+
+
+def set_hash(db: Session, email: str, password_hash: str):
+    db.query(DBUser).filter(DBUser.email == email).update({"password_hash": password_hash})
+    db.commit()
+
+
+def login(client: TestClient, password: str = "password123"):
+    return client.post(
+        "/auth/login",
+        json={
+            "email": "player1@example.com",
+            "password": password
+        }
+    )
+
+
+class TestPasswordStorage:
+    """Test how passwords are stored."""
+
+    def test_signup_stores_scrypt(self, client: TestClient, test_db: Session):
+        """Test that each account gets its own salted scrypt hash."""
+        for name in ("first", "second"):
+            client.post(
+                "/auth/signup",
+                json={"username": name, "email": f"{name}@example.com", "password": "same-password"}
+            )
+
+        first = stored_hash(test_db, "first@example.com")
+        second = stored_hash(test_db, "second@example.com")
+        assert first.startswith(f"scrypt${PASSWORD_SCRYPT_N}$8$1$")
+        assert first != second
+        assert check_password("same-password", first)
+        assert not check_password("other-password", first)
+
+    def test_seeded_users_use_scrypt(self, test_db: Session):
+        """Test that seeded accounts are not stored as legacy hashes."""
+        assert not needs_rehash(stored_hash(test_db, "player1@example.com"))
+
+    def test_malformed_hash(self):
+        """Test that an unreadable stored hash never matches."""
+        assert not check_password("password123", "scrypt$16$8$1$nope")
+        assert not check_password("password123", "")
+
+
+class TestRehashOnLogin:
+    """Test upgrading stored hashes when users log in."""
+
+    def test_legacy_sha256(self, client: TestClient, test_db: Session):
+        """Test that a legacy SHA-256 hash still logs in and is replaced."""
+        set_hash(test_db, "player1@example.com", sha256("password123".encode()).hexdigest())
+
+        assert login(client).status_code == 200
+
+        upgraded = stored_hash(test_db, "player1@example.com")
+        assert upgraded.startswith("scrypt$")
+        assert check_password("password123", upgraded)
+        assert login(client).status_code == 200
+
+    def test_wrong_password_keeps_legacy_hash(self, client: TestClient, test_db: Session):
+        """Test that a failed login leaves the legacy hash alone."""
+        legacy = sha256("password123".encode()).hexdigest()
+        set_hash(test_db, "player1@example.com", legacy)
+
+        assert login(client, "wrong").status_code == 401
+        assert stored_hash(test_db, "player1@example.com") == legacy
+
+    def test_outdated_cost(self, client: TestClient, test_db: Session):
+        """Test that a hash made with other cost settings is rehashed."""
+        set_hash(test_db, "player1@example.com", hash_password("password123", n=8))
+
+        assert login(client).status_code == 200
+        assert not needs_rehash(stored_hash(test_db, "player1@example.com"))
+
+    def test_legacy_through_async_session(self, async_client: TestClient, test_db: Session):
+        """Test the rehash when endpoints use an AsyncSession."""
+        set_hash(test_db, "player1@example.com", sha256("password123".encode()).hexdigest())
+
+        assert login(async_client).status_code == 200
+        assert stored_hash(test_db, "player1@example.com").startswith("scrypt$")
+
+
+class TestPasswordHasher:
+    """Test the hashing pool."""
+
+    def test_unknown_account(self):
+        """Test that checking against no stored hash fails after doing the same work."""
+        hasher = PasswordHasher(workers=2)
+
+        async def check():
+            return await hasher.check("password123", None), await hasher.check("password123", hash_password("password123"))
+
+        try:
+            assert asyncio.run(check()) == (False, True)
+        finally:
+            hasher.shutdown()
@@ -0,0 +1,150 @@
+"""
+Integration tests for rate limiting and admission control.
+
+Tests that score submissions are limited per user and auth attempts per
+client, that refused requests say when to retry, and that requests past
+the concurrency cap are shed with 503.
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.rate_limit import MemoryBucketStore, RateLimit, admission, parse_rate_limit, rate_limiter
+
+
+def login(client: TestClient, email: str = "player1@example.com", password: str = "password123"):
+    return client.post(
+        "/auth/login",
+        json={
+            "email": email,
+            "password": password
+        }
+    )
+
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    monkeypatch.setitem(rate_limiter.limits, "score", RateLimit(2, 60))
+    monkeypatch.setitem(rate_limiter.limits, "auth", RateLimit(3, 60))
+
+
+class TestScoreRateLimit:
+    """Test limiting score submissions."""
+
+    def test_limited_per_user(self, client: TestClient, small_limits):
+        """Test that a user past their burst gets 429 while another user does not."""
+        login(client)
+        other = TestClient(app)
+        login(other, "ninja@example.com")
+
+        statuses = [client.post("/leaderboard", json={"score": 10, "mode": "walls"}).status_code for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
+        assert other.post("/leaderboard", json={"score": 10, "mode": "walls"}).status_code == 200
+
+    def test_retry_after(self, client: TestClient, small_limits):
+        """Test that a refused submission says when to retry."""
+        login(client)
+        for _ in range(2):
+            client.post("/leaderboard", json={"score": 10, "mode": "walls"})
+
+        response = client.post("/leaderboard", json={"score": 10, "mode": "walls"})
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "30"
+
+    def test_logged_out_not_counted(self, client: TestClient, small_limits):
+        """Test that a logged-out client is refused as unauthenticated, not rate limited."""
+        for _ in range(3):
+            assert client.post("/leaderboard", json={"score": 10, "mode": "walls"}).status_code == 401
+
+
+class TestAuthRateLimit:
+    """Test limiting login and signup attempts."""
+
+    def test_login_attempts(self, client: TestClient, small_limits):
+        """Test that repeated failed logins from one client are cut off."""
+        statuses = [login(client, password="wrong").status_code for _ in range(4)]
+
+        assert statuses == [401, 401, 401, 429]
+        assert login(client).status_code == 429
+
+    def test_signup_shares_budget(self, client: TestClient, small_limits):
+        """Test that signups draw from the same per-client bucket as logins."""
+        for _ in range(3):
+            login(client, password="wrong")
+
+        response = client.post(
+            "/auth/signup",
+            json={"username": "newcomer", "email": "newcomer@example.com", "password": "password123"}
+        )
+
+        assert response.status_code == 429
+
+    def test_disabled(self, client: TestClient, small_limits, monkeypatch):
+        """Test that limits can be switched off."""
+        monkeypatch.setattr(rate_limiter, "enabled", False)
+
+        assert all(login(client, password="wrong").status_code == 401 for _ in range(5))
+
+
+class TestAdmissionControl:
+    """Test shedding load past the concurrency cap."""
+
+    def test_shed_when_full(self, client: TestClient, monkeypatch):
+        """Test that requests are refused with 503 while every slot is taken."""
+        login(client)
+        monkeypatch.setattr(admission, "active", admission.limit)
+
+        response = client.post("/leaderboard", json={"score": 10, "mode": "walls"})
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert login(TestClient(app)).status_code == 503
+
+    def test_slots_released(self, client: TestClient):
+        """Test that finished and failed requests give their slot back."""
+        login(client)
+        client.post("/leaderboard", json={"score": 10, "mode": "walls"})
+        login(client, password="wrong")
+
+        assert admission.active == 0
+
+
+class TestMemoryBucketStore:
+    """Test the in-process token buckets."""
+
+    def test_refill(self):
+        """Test that tokens come back at the limit's rate."""
+        now = [0.0]
+        store = MemoryBucketStore(clock=lambda: now[0])
+        limit = RateLimit(2, 10)
+
+        async def take():
+            return await store.take("key", limit)
+
+        assert [asyncio.run(take()) for _ in range(3)] == [0, 0, 5]
+        now[0] = 5
+        assert asyncio.run(take()) == 0
+        assert asyncio.run(take()) == 5
+
+    def test_evicts_oldest(self):
+        """Test that the store forgets the least recently used keys past its size."""
+        store = MemoryBucketStore(max_keys=2)
+        limit = RateLimit(1, 60)
+
+        async def take(key):
+            return await store.take(key, limit)
+
+        for key in ("a", "b", "c"):
+            asyncio.run(take(key))
+
+        assert asyncio.run(take("a")) == 0
+        assert asyncio.run(take("c")) > 0
+
+    def test_parse(self):
+        """Test reading a limit from configuration."""
+        assert parse_rate_limit("30/60") == RateLimit(30, 60.0)
+        assert parse_rate_limit("30/60").rate == 0.5
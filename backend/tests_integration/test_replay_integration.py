@@ -0,0 +1,157 @@
+"""
+Integration tests for replay-verified score submission.
+
+Tests that replays are re-simulated with the server engine and that only the
+score the replay actually reaches is recorded.
+"""
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.engine import SnakeEngine
+from app.models import Direction, GameMode
+from app.replay import MAX_TURNS_PER_TICK, ReplayError, ReplayTimeout, replay_verifier, simulate_replay
+
+
+def record_game(mode: GameMode, seed: int, max_ticks: int = 2000):
+    """Play a game that chases the food and return its replay and score."""
+    engine = SnakeEngine(mode, seed)
+    engine.start()
+    inputs = []
+    ticks = 0
+    while ticks < max_ticks:
+        head_x, head_y = engine.head_cell % 20, engine.head_cell // 20
+        food_x, food_y = engine.food % 20, engine.food // 20
+        if food_x > head_x:
+            wanted = Direction.RIGHT
+        elif food_x < head_x:
+            wanted = Direction.LEFT
+        elif food_y > head_y:
+            wanted = Direction.DOWN
+        else:
+            wanted = Direction.UP
+        if wanted != engine.direction:
+            engine.change_direction(wanted)
+            inputs.append([ticks, wanted.value])
+        ticks += 1
+        if not engine.step():
+            break
+    return {"mode": mode.value, "seed": seed, "ticks": ticks, "inputs": inputs}, engine.score
+
+
+def login(client: TestClient):
+    client.post(
+        "/auth/login",
+        json={
+            "email": "player1@example.com",
+            "password": "password123"
+        }
+    )
+
+
+class TestSimulateReplay:
+    """Test the replay simulation itself."""
+
+    def test_replay_reaches_recorded_score(self):
+        """Test that replaying the inputs reproduces the game's score."""
+        replay, score = record_game(GameMode.walls, seed=42)
+        inputs = [(tick, Direction(direction)) for tick, direction in replay["inputs"]]
+
+        assert score > 0
+        assert simulate_replay(GameMode.walls, 42, replay["ticks"], inputs) == score
+
+    def test_different_seed_changes_score(self):
+        """Test that a replay only verifies against the seed it was played with."""
+        replay, score = record_game(GameMode.pass_through, seed=7)
+        inputs = [(tick, Direction(direction)) for tick, direction in replay["inputs"]]
+
+        assert simulate_replay(GameMode.pass_through, 8, replay["ticks"], inputs) != score
+
+    def test_inputs_out_of_order_rejected(self):
+        """Test that inputs must be in tick order and inside the game."""
+        with pytest.raises(ReplayError):
+            simulate_replay(GameMode.walls, 1, 10, [(5, Direction.UP), (2, Direction.LEFT)])
+        with pytest.raises(ReplayError):
+            simulate_replay(GameMode.walls, 1, 10, [(10, Direction.UP)])
+        with pytest.raises(ReplayError):
+            simulate_replay(GameMode.walls, 1, -1, [])
+
+    def test_too_many_inputs_rejected(self):
+        """Test that a replay may not have more inputs than its ticks could use."""
+        inputs = [(0, Direction.UP)] * (MAX_TURNS_PER_TICK + 1)
+        with pytest.raises(ReplayError):
+            simulate_replay(GameMode.walls, 1, 1, inputs)
+
+    def test_time_budget_enforced(self):
+        """Test that a replay running past its budget is abandoned."""
+        with pytest.raises(ReplayTimeout):
+            simulate_replay(GameMode.pass_through, 3, 90000, [], time_budget=0)
+
+
+class TestReplaySubmission:
+    """Test the replay submission endpoint."""
+
+    def test_submit_replay_records_verified_score(self, client: TestClient):
+        """Test that the recorded score is the one the replay reaches."""
+        login(client)
+        replay, score = record_game(GameMode.walls, seed=1234)
+
+        response = client.post("/leaderboard/replay", json=replay)
+
+        assert response.status_code == 200
+        entry = response.json()["entry"]
+        assert entry["score"] == score
+        assert entry["username"] == "player1"
+        assert entry["mode"] == "walls"
+
+        response = client.get("/leaderboard?mode=walls")
+        assert entry["id"] in [e["id"] for e in response.json()]
+
+    def test_submit_invalid_replay(self, client: TestClient):
+        """Test that a malformed replay is rejected."""
+        login(client)
+
+        response = client.post(
+            "/leaderboard/replay",
+            json={"mode": "walls", "seed": 1, "ticks": 10, "inputs": [[5, "UP"], [2, "LEFT"]]}
+        )
+
+        assert response.status_code == 400
+
+    def test_submit_oversized_replay(self, client: TestClient, monkeypatch):
+        """Test that a replay with too many inputs is rejected without reaching a worker."""
+        login(client)
+        monkeypatch.setattr(replay_verifier, "_pool", None)
+        monkeypatch.setattr(replay_verifier, "start", lambda: pytest.fail("replay reached the pool"))
+
+        response = client.post(
+            "/leaderboard/replay",
+            json={"mode": "walls", "seed": 1, "ticks": 10, "inputs": [[0, "UP"]] * 100000}
+        )
+
+        assert response.status_code == 400
+
+    def test_worker_crash_recovers(self, client: TestClient):
+        """Test that a replay whose worker died gets a 503 and later replays still verify."""
+        login(client)
+        replay, score = record_game(GameMode.walls, seed=1234)
+        with pytest.raises(BrokenProcessPool):
+            replay_verifier._pool.submit(os._exit, 1).result()
+
+        response = client.post("/leaderboard/replay", json=replay)
+        assert response.status_code == 503
+
+        response = client.post("/leaderboard/replay", json=replay)
+        assert response.status_code == 200
+        assert response.json()["entry"]["score"] == score
+
+    def test_submit_replay_unauthenticated(self, client: TestClient):
+        """Test that submitting a replay requires authentication."""
+        response = client.post(
+            "/leaderboard/replay",
+            json={"mode": "walls", "seed": 1, "ticks": 10, "inputs": []}
+        )
+
+        assert response.status_code == 401
@@ -0,0 +1,124 @@
+"""
+Integration tests for cached leaderboard responses.
+
+Tests that leaderboard reads carry strong ETags, that matching
+If-None-Match requests get an empty 304 without rebuilding the body, and
+that recording a score invalidates the cached bodies.
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.response_cache import ResponseCache, etag_matches, leaderboard_cache
+
+
+def login(client: TestClient):
+    client.post(
+        "/auth/login",
+        json={
+            "email": "player1@example.com",
+            "password": "password123"
+        }
+    )
+
+
+class TestLeaderboardETags:
+    """Test conditional leaderboard requests."""
+
+    def test_not_modified(self, client: TestClient):
+        """Test that a matching If-None-Match gets a 304 with no body or rebuild."""
+        response = client.get("/leaderboard?mode=walls")
+        etag = response.headers["etag"]
+        builds = leaderboard_cache.builds
+
+        repeat = client.get("/leaderboard?mode=walls", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert etag.startswith('"') and not etag.startswith('W/')
+        assert repeat.status_code == 304
+        assert repeat.content == b""
+        assert repeat.headers["etag"] == etag
+        assert leaderboard_cache.builds == builds
+
+    def test_cached_body_matches(self, client: TestClient):
+        """Test that the cached body is the same JSON the endpoint returned before caching."""
+        entries = client.get("/leaderboard").json()
+
+        assert entries == client.get("/leaderboard").json()
+        assert [e["score"] for e in entries] == [505, 450, 410, 380, 340, 320, 290, 275, 260, 150]
+
+    def test_new_score_changes_etag(self, client: TestClient):
+        """Test that recording a score invalidates the cached leaderboard."""
+        etag = client.get("/leaderboard?mode=walls").headers["etag"]
+        login(client)
+        client.post("/leaderboard", json={"score": 999, "mode": "walls"})
+
+        response = client.get("/leaderboard?mode=walls", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()[0]["score"] == 999
+
+    def test_unchanged_body_keeps_etag(self, client: TestClient):
+        """Test that a rebuild producing the same bytes still answers 304."""
+        etag = client.get("/leaderboard?mode=walls").headers["etag"]
+        login(client)
+        client.post("/leaderboard", json={"score": 5, "mode": "pass-through"})
+
+        response = client.get("/leaderboard?mode=walls", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+
+    def test_keys_are_separate(self, client: TestClient):
+        """Test that each mode, window and page is cached on its own."""
+        etags = {
+            client.get(url).headers["etag"]
+            for url in (
+                "/leaderboard",
+                "/leaderboard?mode=walls",
+                "/leaderboard?unique=true",
+                "/leaderboard/page?limit=3",
+                "/leaderboard/page?limit=3&start=4",
+            )
+        }
+
+        assert len(etags) == 5
+
+    def test_page_not_modified(self, client: TestClient):
+        """Test conditional requests for cursor pages."""
+        cursor = client.get("/leaderboard/page?limit=3").json()["next_cursor"]
+        url = f"/leaderboard/page?limit=3&cursor={cursor}"
+        etag = client.get(url).headers["etag"]
+
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+class TestResponseCache:
+    """Test the response cache itself."""
+
+    def test_if_none_match_forms(self):
+        """Test lists, weak validators and the wildcard in If-None-Match."""
+        assert etag_matches('"a", "b"', '"b"')
+        assert etag_matches('W/"b"', '"b"')
+        assert etag_matches("*", '"b"')
+        assert not etag_matches('"a"', '"b"')
+        assert not etag_matches(None, '"b"')
+
+    def test_least_recently_used_evicted(self):
+        """Test that the cache keeps at most its size, dropping the oldest read."""
+        cache = ResponseCache(max_entries=2)
+
+        async def body() -> bytes:
+            return b"[]"
+
+        async def fill():
+            await cache.get("a", body)
+            await cache.get("b", body)
+            await cache.get("a", body)
+            await cache.get("c", body)
+            await cache.get("a", body)
+            await cache.get("b", body)
+
+        asyncio.run(fill())
+
+        assert cache.builds == 4
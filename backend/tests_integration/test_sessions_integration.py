@@ -0,0 +1,99 @@
+"""
+Integration tests for signed session tokens.
+
+Tests that each client carries its own session, that tokens work as
+cookies or bearer headers, and that forged or expired tokens are refused.
+"""
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import User
+from app.sessions import create_session_token, read_session_token
+from tests_integration.test_spectator_integration import make_game_state
+
+
+def login(client: TestClient, email: str) -> dict:
+    return client.post(
+        "/auth/login",
+        json={
+            "email": email,
+            "password": "password123"
+        }
+    ).json()
+
+
+class TestSessions:
+    """Test session tokens through the API."""
+
+    def test_concurrent_users(self, client: TestClient):
+        """Test that two clients stay logged in as different users."""
+        other = TestClient(app)
+        login(client, "player1@example.com")
+        login(other, "ninja@example.com")
+
+        assert client.get("/auth/me").json()["username"] == "player1"
+        assert other.get("/auth/me").json()["username"] == "ninja"
+
+        entry = other.post("/leaderboard", json={"score": 640, "mode": "walls"}).json()["entry"]
+        assert entry["username"] == "ninja"
+
+    def test_bearer_token(self, client: TestClient):
+        """Test that the token from the login response works as a bearer header."""
+        token = login(client, "player1@example.com")["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = TestClient(app).get("/auth/me", headers=headers)
+
+        assert response.status_code == 200
+        assert response.json()["email"] == "player1@example.com"
+
+    def test_cookie_flags(self, client: TestClient):
+        """Test that the session cookie is hidden from scripts."""
+        response = client.post("/auth/login", json={"email": "player1@example.com", "password": "password123"})
+
+        cookie = response.headers["set-cookie"]
+        assert cookie.startswith("session=")
+        assert "HttpOnly" in cookie
+        assert "SameSite=lax" in cookie
+
+    def test_forged_token(self, client: TestClient):
+        """Test that a token with an altered payload is refused."""
+        token = login(client, "player1@example.com")["token"]
+        forged = create_session_token(User(id="7", username="champion", email="champion@example.com"))
+        tampered = f"{forged.split('.')[0]}.{token.split('.')[1]}"
+
+        response = TestClient(app).get("/auth/me", headers={"Authorization": f"Bearer {tampered}"})
+
+        assert response.status_code == 401
+
+    def test_expired_token(self, client: TestClient):
+        """Test that an expired token is refused."""
+        token = create_session_token(User(id="1", username="player1", email="player1@example.com"), max_age=-1)
+
+        response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+        assert response.status_code == 401
+
+    def test_websocket_bearer(self, client: TestClient):
+        """Test that a player can stream a game with a bearer token."""
+        token = login(TestClient(app), "player1@example.com")["token"]
+
+        with client.websocket_connect("/spectator/play", headers={"Authorization": f"Bearer {token}"}) as player:
+            player.send_json(make_game_state())
+            assert "gameId" in player.receive_json()
+
+
+class TestSessionTokens:
+    """Test reading session tokens directly."""
+
+    def test_round_trip(self):
+        """Test that a token identifies its user without a database."""
+        user = User(id="42", username="someone", email="someone@example.com")
+
+        assert read_session_token(create_session_token(user)) == user
+
+    def test_malformed(self):
+        """Test that garbage is not a token."""
+        assert read_session_token("") is None
+        assert read_session_token("not.a-token") is None
+        assert read_session_token("a.b.c") is None
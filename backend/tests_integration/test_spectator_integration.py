@@ -5,6 +5,11 @@ Tests the spectator functionality for viewing active game sessions.
 """
 import pytest
 from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.frame_codec import FrameCodec
+from app.live_games import BroadcastChannel
+from app.models import GameState
 
 
 class TestSpectator:
@@ -61,3 +66,196 @@ class TestSpectator:
                 assert "id" in player
                 assert "username" in player
                 assert "gameState" in player
+
+
+def make_game_state(score: int = 0, status: str = "playing") -> dict:
+    """Build a GameState payload for the live game WebSocket."""
+    return {
+        "snake": {
+            "body": [{"x": 10, "y": 10}, {"x": 9, "y": 10}, {"x": 8, "y": 10}],
+            "direction": "RIGHT"
+        },
+        "food": {"x": 15, "y": 10},
+        "score": score,
+        "status": status,
+        "mode": "walls"
+    }
+
+
+class TestLiveGames:
+    """Test live game streaming over WebSockets."""
+    
+    def login(self, client: TestClient):
+        client.post(
+            "/auth/login",
+            json={
+                "email": "player1@example.com",
+                "password": "password123"
+            }
+        )
+    
+    def test_play_requires_auth(self, client: TestClient):
+        """Test that streaming a game requires authentication."""
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect("/spectator/play") as websocket:
+                websocket.receive_json()
+    
+    def test_live_game_listed_as_active(self, client: TestClient):
+        """Test that a streamed game shows up in the active players list."""
+        self.login(client)
+        
+        with client.websocket_connect("/spectator/play") as player:
+            player.send_json(make_game_state())
+            game_id = player.receive_json()["gameId"]
+            
+            players = client.get("/spectator/active").json()
+            assert len(players) == 1
+            assert players[0]["id"] == game_id
+            assert players[0]["username"] == "player1"
+            assert players[0]["gameState"]["snake"]["body"][0] == {"x": 10, "y": 10}
+        
+        # Disconnecting ends the game
+        assert client.get("/spectator/active").json() == []
+    
+    def test_spectator_receives_updates(self, client: TestClient):
+        """Test that spectators receive the current state and later updates."""
+        self.login(client)
+        
+        with client.websocket_connect("/spectator/play") as player:
+            player.send_json(make_game_state())
+            game_id = player.receive_json()["gameId"]
+            
+            with client.websocket_connect(f"/spectator/watch/{game_id}") as spectator:
+                assert spectator.receive_json()["score"] == 0
+                
+                # Updates only need the changed fields
+                player.send_json({"score": 10})
+                frame = spectator.receive_json()
+                assert frame["score"] == 10
+                assert frame["food"] == {"x": 15, "y": 10}
+                
+                player.send_json({"status": "game-over"})
+                assert spectator.receive_json()["status"] == "game-over"
+                with pytest.raises(WebSocketDisconnect):
+                    spectator.receive_json()
+        
+        assert client.get("/spectator/active").json() == []
+    
+    def test_binary_spectator_stream(self, client: TestClient):
+        """Test that binary spectators can rebuild the streamed states."""
+        self.login(client)
+        
+        with client.websocket_connect("/spectator/play") as player:
+            player.send_json(make_game_state())
+            game_id = player.receive_json()["gameId"]
+            
+            with client.websocket_connect(f"/spectator/watch/{game_id}?format=binary") as spectator:
+                codec = FrameCodec()
+                codec.decode(spectator.receive_bytes())
+                assert codec.to_game_state().score == 0
+                
+                moved = make_game_state(score=10)
+                moved["snake"]["body"] = [{"x": 11, "y": 10}] + moved["snake"]["body"]
+                player.send_json(moved)
+                
+                frame = spectator.receive_bytes()
+                assert frame[0] == ord("D")
+                codec.decode(frame)
+                assert codec.to_game_state().model_dump(mode="json") == moved
+    
+    def test_player_streams_binary_frames(self, client: TestClient):
+        """Test that players can push binary frames that spectators decode."""
+        self.login(client)
+        sender = FrameCodec()
+        state = GameState.model_validate(make_game_state())
+        
+        with client.websocket_connect("/spectator/play") as player:
+            player.send_bytes(sender.encode(state))
+            game_id = player.receive_json()["gameId"]
+            
+            with client.websocket_connect(f"/spectator/watch/{game_id}") as spectator:
+                assert spectator.receive_json() == state.model_dump(mode="json")
+                
+                state.score = 10
+                player.send_bytes(sender.encode(state))
+                assert spectator.receive_json()["score"] == 10
+            
+            players = client.get("/spectator/active").json()
+            assert players[0]["score"] == 10
+    
+    def test_binary_stream_must_start_with_keyframe(self, client: TestClient):
+        """Test that a binary stream starting with a delta is rejected."""
+        self.login(client)
+        sender = FrameCodec()
+        state = GameState.model_validate(make_game_state())
+        sender.encode(state)
+        
+        with client.websocket_connect("/spectator/play") as player:
+            player.send_bytes(sender.encode(state))
+            with pytest.raises(WebSocketDisconnect):
+                player.receive_json()
+    
+    def test_watch_unknown_game(self, client: TestClient):
+        """Test that watching a game that does not exist is rejected."""
+        with client.websocket_connect("/spectator/watch/missing") as spectator:
+            with pytest.raises(WebSocketDisconnect):
+                spectator.receive_json()
+    
+    def test_invalid_state_closes_stream(self, client: TestClient):
+        """Test that an invalid game state ends the stream."""
+        self.login(client)
+        
+        with client.websocket_connect("/spectator/play") as player:
+            player.send_json({"score": "lots"})
+            with pytest.raises(WebSocketDisconnect):
+                player.receive_json()
+        
+        assert client.get("/spectator/active").json() == []
+
+
+class TestBroadcastChannel:
+    """Test spectator fan-out behaviour."""
+    
+    def test_slow_json_subscriber_drops_oldest_frames(self):
+        """Test that a full queue drops stale frames instead of blocking."""
+        channel = BroadcastChannel(max_queue=2)
+        subscription = channel.subscribe()
+        
+        for document in ["1", "2", "3", "4"]:
+            channel.publish(b"", lambda: b"", lambda document=document: document)
+        
+        assert subscription.dropped == 2
+        assert subscription.queue.get_nowait() == "3"
+        assert subscription.queue.get_nowait() == "4"
+    
+    def test_slow_binary_subscriber_resyncs_with_keyframe(self):
+        """Test that a binary subscriber that falls behind gets a keyframe."""
+        channel = BroadcastChannel(max_queue=2)
+        subscription = channel.subscribe(binary=True)
+        
+        for frame in [b"D1", b"D2", b"D3"]:
+            channel.publish(frame, lambda frame=frame: b"K" + frame[1:], lambda: "")
+        
+        assert subscription.dropped == 2
+        assert subscription.queue.get_nowait() == b"K3"
+        assert subscription.queue.empty()
+    
+    def test_frames_encoded_once_for_all_subscribers(self):
+        """Test that every subscriber receives the same encoded frame."""
+        channel = BroadcastChannel()
+        json_subscriptions = [channel.subscribe() for _ in range(3)]
+        binary_subscriptions = [channel.subscribe(binary=True) for _ in range(3)]
+        
+        calls = []
+        def document():
+            calls.append(1)
+            return '{"score": 10}'
+        
+        frame = b"D"
+        channel.publish(frame, lambda: b"K", document)
+        
+        assert len(calls) == 1
+        documents = [s.queue.get_nowait() for s in json_subscriptions]
+        assert all(d is documents[0] for d in documents)
+        for subscription in binary_subscriptions:
+            assert subscription.queue.get_nowait() is frame
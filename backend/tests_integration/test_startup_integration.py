@@ -0,0 +1,90 @@
+"""
+Integration tests for the startup modes.
+
+Tests that production startup checks the schema version instead of
+migrating, does not seed, and that importing the app creates no engine.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from fastapi.testclient import TestClient
+
+from app import db_config, main
+from app.db_config import ALEMBIC_CONFIG, SCHEMA_REVISION, SchemaVersionError, migrate_database, verify_schema
+from app.db_models import DBLeaderboardEntry, DBUser
+from app.leaderboard_index import leaderboard_index
+from tests_integration.test_migrations_integration import run
+
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def production(monkeypatch, engine):
+    """Start the app in production mode against the temporary database."""
+    monkeypatch.setattr(main, "PRODUCTION", True)
+    monkeypatch.setattr(db_config, "_engine", engine)
+    yield engine
+    leaderboard_index.clear()
+
+
+class TestSchemaCheck:
+    """Test the cheap schema version check."""
+
+    def test_revision_is_latest_migration(self):
+        heads = ScriptDirectory.from_config(Config(ALEMBIC_CONFIG)).get_heads()
+        assert heads == [SCHEMA_REVISION]
+
+    def test_migrated(self, engine):
+        migrate_database(engine)
+        verify_schema(engine)
+
+    def test_never_migrated(self, engine):
+        with pytest.raises(SchemaVersionError, match="revision none"):
+            verify_schema(engine)
+
+    def test_behind(self, engine):
+        run(engine, command.upgrade, "0002")
+        with pytest.raises(SchemaVersionError, match="revision 0002"):
+            verify_schema(engine)
+
+
+class TestProductionStartup:
+    """Test starting the app with STARTUP_MODE=production."""
+
+    def test_skips_seeding(self, production):
+        migrate_database(production)
+        with TestClient(main.app) as client:
+            assert client.get("/leaderboard").json() == []
+        with production.connect() as connection:
+            assert connection.execute(DBUser.__table__.select()).first() is None
+
+    def test_loads_existing_scores(self, production):
+        migrate_database(production)
+        with production.begin() as connection:
+            connection.execute(DBLeaderboardEntry.__table__.insert(), {
+                "id": "kept-1", "user_id": "1", "username": "player1", "score": 10, "mode": "walls",
+            })
+        with TestClient(main.app):
+            assert leaderboard_index.loaded
+
+    def test_refuses_unmigrated_database(self, production):
+        with pytest.raises(SchemaVersionError):
+            with TestClient(main.app):
+                pass
+
+
+class TestImportTime:
+    """Test that importing the app does no database work."""
+
+    def test_no_engine_until_used(self):
+        code = "import app.main, app.db_config as c; print(c._engine is None, c.async_engine is None)"
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        )
+        assert result.stdout.splitlines()[-1] == "True True"
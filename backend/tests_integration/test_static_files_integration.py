@@ -0,0 +1,180 @@
+"""
+Integration tests for serving the built frontend.
+
+Tests the manifest's routing, cache headers, conditional requests and the
+choice between precompressed variants, on a small frontend built in a
+temporary directory.
+"""
+import gzip
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.static_files import IMMUTABLE, REVALIDATE, StaticFrontend, compress_directory
+
+
+INDEX = b"<!doctype html><html><body><div id=root></div></body></html>"
+SCRIPT = b"console.log('snake arena');\n" * 200
+ASSET = "assets/index-3f2a9c1b.js"
+
+
+def build_frontend(directory: Path):
+    (directory / "assets").mkdir()
+    (directory / "index.html").write_bytes(INDEX)
+    (directory / ASSET).write_bytes(SCRIPT)
+    (directory / "favicon.ico").write_bytes(b"\x00\x00\x01\x00" * 400)
+    compress_directory(directory)
+
+
+def serve(frontend: StaticFrontend) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/{full_path:path}")
+    async def serve_frontend(request: Request, full_path: str):
+        return frontend.response(request, full_path)
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def frontend(tmp_path: Path) -> StaticFrontend:
+    build_frontend(tmp_path)
+    frontend = StaticFrontend(tmp_path)
+    frontend.load()
+    return frontend
+
+
+@pytest.fixture
+def client(frontend: StaticFrontend) -> TestClient:
+    return serve(frontend)
+
+
+class TestRouting:
+    """Test which file a path is answered with."""
+
+    def test_index(self, client: TestClient):
+        response = client.get("/")
+        assert response.status_code == 200
+        assert response.content == INDEX
+        assert response.headers["content-type"].startswith("text/html")
+        assert response.headers["cache-control"] == REVALIDATE
+
+    def test_client_side_route(self, client: TestClient):
+        response = client.get("/leaderboard/weekly")
+        assert response.content == INDEX
+
+    def test_asset(self, client: TestClient):
+        response = client.get(f"/{ASSET}", headers={"Accept-Encoding": "identity"})
+        assert response.content == SCRIPT
+        assert response.headers["cache-control"] == IMMUTABLE
+        assert "javascript" in response.headers["content-type"]
+
+    def test_missing_asset(self, client: TestClient):
+        assert client.get("/assets/index-00000000.js").status_code == 404
+
+    def test_outside_directory(self, client: TestClient):
+        assert client.get("/..%2f..%2fetc%2fpasswd").content == INDEX
+
+    def test_not_built(self, tmp_path: Path):
+        client = serve(StaticFrontend(tmp_path / "missing"))
+        response = client.get("/")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Frontend not built. API only mode."
+
+    def test_compressed_asset_without_original(self, tmp_path: Path):
+        """Test that a .gz file with no uncompressed sibling is an asset of its own."""
+        build_frontend(tmp_path)
+        data = gzip.compress(SCRIPT)
+        (tmp_path / "data.gz").write_bytes(data)
+        frontend = StaticFrontend(tmp_path)
+        frontend.load()
+        client = serve(frontend)
+
+        response = client.get("/data.gz", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.content == data
+        # Siblings of other files are only served as their variants
+        assert client.get(f"/{ASSET}.gz").status_code == 404
+
+    def test_served_from_memory(self, client: TestClient, frontend: StaticFrontend):
+        (frontend.directory / ASSET).unlink()
+        response = client.get(f"/{ASSET}", headers={"Accept-Encoding": "identity"})
+        assert response.content == SCRIPT
+
+
+class TestCompression:
+    """Test choosing between precompressed variants."""
+
+    def test_brotli_preferred(self, client: TestClient):
+        pytest.importorskip("brotli")
+        response = client.get(f"/{ASSET}", headers={"Accept-Encoding": "gzip, br"})
+        assert response.headers["content-encoding"] == "br"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.content == SCRIPT
+
+    def test_gzip(self, client: TestClient):
+        response = client.get(f"/{ASSET}", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert int(response.headers["content-length"]) < len(SCRIPT)
+        assert response.content == SCRIPT
+
+    def test_refused_encoding(self, client: TestClient):
+        pytest.importorskip("brotli")
+        response = client.get(f"/{ASSET}", headers={"Accept-Encoding": "br;q=0, gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+
+    def test_identity(self, client: TestClient):
+        response = client.get(f"/{ASSET}", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+
+    def test_small_and_binary_files_left_alone(self, frontend: StaticFrontend):
+        directory = frontend.directory
+        assert not (directory / "index.html.gz").exists()
+        assert not (directory / "favicon.ico.gz").exists()
+        assert gzip.decompress((directory / f"{ASSET}.gz").read_bytes()) == SCRIPT
+
+
+class TestConditionalRequests:
+    """Test answering revalidation with 304."""
+
+    def test_if_none_match(self, client: TestClient):
+        etag = client.get("/", headers={"Accept-Encoding": "identity"}).headers["etag"]
+        response = client.get("/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_etag_per_encoding(self, client: TestClient):
+        etag = client.get(f"/{ASSET}", headers={"Accept-Encoding": "identity"}).headers["etag"]
+        response = client.get(f"/{ASSET}", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert response.status_code == 200
+
+    def test_if_modified_since(self, client: TestClient):
+        last_modified = client.get("/").headers["last-modified"]
+        assert client.get("/", headers={"If-Modified-Since": last_modified}).status_code == 304
+        old = "Mon, 01 Jan 2001 00:00:00 GMT"
+        assert client.get("/", headers={"If-Modified-Since": old}).status_code == 200
+
+    def test_if_none_match_wins(self, client: TestClient):
+        last_modified = client.get("/").headers["last-modified"]
+        response = client.get("/", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+        assert response.status_code == 200
+
+
+class TestLargeFiles:
+    """Test files over the memory limit, which are streamed from disk."""
+
+    def test_streamed(self, tmp_path: Path):
+        build_frontend(tmp_path)
+        frontend = StaticFrontend(tmp_path, memory_limit=0)
+        client = serve(frontend)
+        response = client.get(f"/{ASSET}", headers={"Accept-Encoding": "identity"})
+        assert response.content == SCRIPT
+        assert frontend.assets[ASSET].variants["identity"].body is None
+        etag = response.headers["etag"]
+        response = client.get(f"/{ASSET}", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+        assert response.status_code == 304
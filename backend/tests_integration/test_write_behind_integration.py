@@ -0,0 +1,119 @@
+"""
+Integration tests for write-behind leaderboard inserts.
+
+Tests that queued scores are ranked immediately, written in batches, and
+all written out when the writer stops, and that scores which cannot be
+written are unranked again.
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db_models import DBLeaderboardEntry
+from app.leaderboard_index import leaderboard_index
+from app import write_behind
+from app.write_behind import leaderboard_writer
+
+
+@pytest.fixture
+def writer_client(client: TestClient, test_db: Session, monkeypatch):
+    """A test client with the write-behind writer running against the test database."""
+    monkeypatch.setattr(leaderboard_writer, "batch_size", 100)
+    monkeypatch.setattr(leaderboard_writer, "interval", 60.0)
+    monkeypatch.setattr(leaderboard_writer, "batches", 0)
+    monkeypatch.setattr(leaderboard_writer, "written", 0)
+    monkeypatch.setattr(leaderboard_writer, "dropped", 0)
+    client.portal.call(leaderboard_writer.start, sessionmaker(bind=test_db.get_bind()))
+    client.post(
+        "/auth/login",
+        json={
+            "email": "player1@example.com",
+            "password": "password123"
+        }
+    )
+    try:
+        yield client
+    finally:
+        client.portal.call(leaderboard_writer.stop)
+
+
+def stored(db: Session, entry_id: str) -> bool:
+    return db.query(DBLeaderboardEntry).filter(DBLeaderboardEntry.id == entry_id).count() == 1
+
+
+class TestWriteBehind:
+    """Test queued leaderboard inserts."""
+
+    def test_score_ranked_before_written(self, writer_client: TestClient, test_db: Session):
+        """Test that an acknowledged score is readable before it reaches the table."""
+        response = writer_client.post("/leaderboard", json={"score": 950, "mode": "walls"})
+
+        assert response.status_code == 200
+        entry = response.json()["entry"]
+        assert not stored(test_db, entry["id"])
+
+        top = writer_client.get("/leaderboard?mode=walls").json()[0]
+        assert top["id"] == entry["id"]
+        assert writer_client.get("/leaderboard/rank?score=950&mode=walls").json()["total"] == 7
+
+        writer_client.portal.call(leaderboard_writer.stop)
+        assert stored(test_db, entry["id"])
+        assert leaderboard_writer.pending_items() == []
+
+    def test_reload_includes_pending_scores(self, writer_client: TestClient):
+        """Test that rebuilding the index keeps scores not yet written."""
+        entry = writer_client.post("/leaderboard", json={"score": 960, "mode": "pass-through"}).json()["entry"]
+
+        leaderboard_index.clear()
+        entries = writer_client.get("/leaderboard?mode=pass-through").json()
+
+        assert entries[0]["id"] == entry["id"]
+        assert [e["id"] for e in entries].count(entry["id"]) == 1
+
+    def test_batches_by_size(self, writer_client: TestClient, test_db: Session):
+        """Test that full batches are written together and the rest on stop."""
+        leaderboard_writer.batch_size = 3
+        ids = [
+            writer_client.post("/leaderboard", json={"score": score, "mode": "walls"}).json()["entry"]["id"]
+            for score in range(700, 707)
+        ]
+
+        writer_client.portal.call(leaderboard_writer.stop)
+
+        assert leaderboard_writer.batches == 3
+        assert leaderboard_writer.written == 7
+        assert all(stored(test_db, entry_id) for entry_id in ids)
+
+    def test_batches_by_time(self, writer_client: TestClient, test_db: Session):
+        """Test that a lone score is written once the interval passes."""
+        leaderboard_writer.interval = 0.05
+        entry_id = writer_client.post("/leaderboard", json={"score": 710, "mode": "walls"}).json()["entry"]["id"]
+
+        deadline = time.monotonic() + 5
+        while not stored(test_db, entry_id) and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        assert stored(test_db, entry_id)
+        assert leaderboard_writer.batches == 1
+
+    def test_failed_batch_unranked(self, writer_client: TestClient, test_db: Session, monkeypatch):
+        """Test that scores whose batch never commits are taken off the leaderboard."""
+        def fail(rows):
+            raise RuntimeError("database unavailable")
+
+        monkeypatch.setattr(leaderboard_writer, "_write", fail)
+        monkeypatch.setattr(write_behind, "WRITE_BEHIND_RETRIES", 2)
+        leaderboard_writer.interval = 0.01
+        entry = writer_client.post("/leaderboard", json={"score": 970, "mode": "walls"}).json()["entry"]
+        assert writer_client.get("/leaderboard?mode=walls").json()[0]["id"] == entry["id"]
+
+        writer_client.portal.call(leaderboard_writer.stop)
+
+        assert leaderboard_writer.dropped == 1
+        assert leaderboard_writer.pending_items() == []
+        assert not stored(test_db, entry["id"])
+        entries = writer_client.get("/leaderboard?mode=walls").json()
+        assert entry["id"] not in [e["id"] for e in entries]
+        assert writer_client.get("/leaderboard/rank?score=970&mode=walls").json()["total"] == 6
@@ -20,6 +20,7 @@ export default defineConfig(({ mode }) => ({
       '/spectator': {
         target: 'http://localhost:8000',
         changeOrigin: true,
+        ws: true,
       },
     },
   },